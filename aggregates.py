@@ -0,0 +1,295 @@
+import json
+import os
+
+# Provide a description of the 5 mana differential buckets, in display order.
+MANA_DIFFERENTIAL_KEYS = ['big disadvantage:          -8+',
+                          'slight disadvantage: -7 to -3',
+                          'about even:          -2 to  2',
+                          'slight advantage:     3 to  7',
+                          'big advantage:              8+']
+
+
+def mana_differential_key(mana_differential: int):
+    """Return the mana differential bucket description for the given differential."""
+    if mana_differential < -7:
+        return MANA_DIFFERENTIAL_KEYS[0]
+    elif mana_differential < -2:
+        return MANA_DIFFERENTIAL_KEYS[1]
+    elif mana_differential < 2:
+        return MANA_DIFFERENTIAL_KEYS[2]
+    elif mana_differential < 8:
+        return MANA_DIFFERENTIAL_KEYS[3]
+    return MANA_DIFFERENTIAL_KEYS[4]
+
+
+# The count fields that make up the win/loss data, everything else is derived from them.
+COUNT_FIELDS = ('games', 'wins', 'losses')
+
+
+def _tally(counts: dict, key, won: bool, **extra):
+    """Count a game in the win/loss data kept in counts under the given key, creating it if needed."""
+    data = counts.get(key)
+    if data is None:
+        data = counts[key] = dict({'games': 0, 'wins': 0, 'losses': 0}, **extra)
+    data['games'] += 1
+    if won:
+        data['wins'] += 1
+    else:
+        data['losses'] += 1
+    return data
+
+
+def _combine(counts: dict, other_counts: dict, sign: int, nested=None):
+    """Add (sign 1) or subtract (sign -1) the win/loss data in other_counts to the data in counts.
+        Entries left without any games are removed. The nested key names a nested dictionary of win/loss data to combine too.
+    """
+    for key, other_data in other_counts.items():
+        data = counts.get(key)
+        if data is None:
+            data = counts[key] = {'games': 0, 'wins': 0, 'losses': 0}
+            if nested:
+                data[nested] = {}
+        for field in COUNT_FIELDS:
+            data[field] += sign * other_data[field]
+        if nested:
+            _combine(data[nested], other_data[nested], sign)
+        if not data['games']:
+            del counts[key]
+
+
+def _counts(data: dict):
+    """Return just the count fields of some win/loss data."""
+    return dict((field, data[field]) for field in COUNT_FIELDS)
+
+
+class Aggregates(object):
+    """The win/loss accumulators behind all of the Hero analyses.
+        Each game's card history is walked exactly once, filling every accumulator in that pass,
+        so the total work is linear in the number of card plays.
+        All the accumulators use the same {'games', 'wins', 'losses'} dictionaries the reports are built from.
+
+        Aggregates are mergeable: two sets of accumulators, e.g. for different days, can be combined with merge(),
+        and a subset can be taken back out with subtract(). They can be saved as json and loaded again,
+        so new games can be folded into a saved state instead of recomputing everything.
+    """
+
+    def __init__(self, games=()):
+        """Create a new set of accumulators, optionally adding an iterable of games."""
+        self.wins = 0
+        self.losses = 0
+
+        # Opponent dictionary keyed by opponent hero name.
+        self.opponents = {}
+        # Card dictionary keyed by card name, each card also has an opponents dictionary keyed by opponent hero name.
+        self.cards = {}
+        # Turns dictionary keyed by the turn number e.g. 1, 2, 3, each turn has a cards dictionary keyed by card name.
+        self.turns = {}
+        # Openings dictionary keyed by a tuple of the frozensets of cards played on the first 2 turns.
+        self.openings = {}
+        # Mana differential dictionary keyed by the MANA_DIFFERENTIAL_KEYS buckets.
+        self.mana_differentials = {}
+        # Ranks dictionary keyed by ladder rank.
+        self.ranks = {}
+
+        # The date of the newest game added, e.g. to know which games are new since these were saved.
+        self.newest = None
+
+        # Whether the derived card and turn win percentages are up to date with the counts.
+        self.win_rates_calculated = False
+
+        for game in games:
+            self.add_game(game)
+
+    @property
+    def game_count(self):
+        return self.wins + self.losses
+
+    def add_game(self, game):
+        """Fold a single game into all of the accumulators.
+            Everything is read from the game first, so a game missing a field raises before any accumulator changes.
+        """
+        won = game.won()
+        opponent = game.opponent
+        date = game.date
+        rank = game.rank
+        # Everything the per card analyses need comes from the game's features, computed from its card history once.
+        features = game.features()
+        cards_by_turn = features.cards_by_turn
+
+        self.win_rates_calculated = False
+        if self.newest is None or date > self.newest:
+            self.newest = date
+        if won:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+        _tally(self.opponents, opponent, won)
+        _tally(self.ranks, rank, won)
+
+        for card in features.cards:
+            card_data = _tally(self.cards, card, won, opponents={})
+            _tally(card_data['opponents'], opponent, won)
+
+        # The last turn is left out since the game ended during it.
+        for turn in range(1, features.last_turn):
+            turn_cards = self.turns.setdefault(turn, {'cards': {}})['cards']
+            for card in cards_by_turn.get(turn) or {'pass'}:
+                _tally(turn_cards, card, won)
+
+        _tally(self.openings, features.opening, won)
+
+        _tally(self.mana_differentials, mana_differential_key(features.mana_differential), won)
+
+    def calculate_win_rates(self):
+        """Calculate the win percentages for the card and turn accumulators,
+            including the unplayed wins/losses for each card and each card vs. opponent.
+            Does nothing if they are already up to date.
+        """
+        if self.win_rates_calculated:
+            return
+
+        for card_data in self.cards.values():
+            card_data['win percentage'] = (card_data['wins'] / card_data['games']) * 100
+            card_data['unplayed wins'] = self.wins - card_data['wins']
+            card_data['unplayed losses'] = self.losses - card_data['losses']
+            unplayed_games = card_data['unplayed wins'] + card_data['unplayed losses']
+            card_data['unplayed percentage'] = 0 if unplayed_games == 0 else (card_data['unplayed wins'] / unplayed_games) * 100
+
+            for opponent, opponent_data in card_data['opponents'].items():
+                opponent_data['win percentage'] = (opponent_data['wins'] / opponent_data['games']) * 100
+                opponent_data['unplayed wins'] = self.opponents[opponent]['wins'] - opponent_data['wins']
+                opponent_data['unplayed losses'] = self.opponents[opponent]['losses'] - opponent_data['losses']
+                unplayed_games = opponent_data['unplayed wins'] + opponent_data['unplayed losses']
+                opponent_data['unplayed percentage'] = 0 if unplayed_games == 0 else (opponent_data['unplayed wins'] / unplayed_games) * 100
+
+        for turn_data in self.turns.values():
+            for card_data in turn_data['cards'].values():
+                card_data['win percentage'] = (card_data['wins'] / card_data['games']) * 100
+
+        self.win_rates_calculated = True
+
+    def _combine(self, other, sign: int):
+        self.wins += sign * other.wins
+        self.losses += sign * other.losses
+        _combine(self.opponents, other.opponents, sign)
+        _combine(self.cards, other.cards, sign, nested='opponents')
+        for turn, turn_data in other.turns.items():
+            _combine(self.turns.setdefault(turn, {'cards': {}})['cards'], turn_data['cards'], sign)
+            if not self.turns[turn]['cards']:
+                del self.turns[turn]
+        _combine(self.openings, other.openings, sign)
+        _combine(self.mana_differentials, other.mana_differentials, sign)
+        _combine(self.ranks, other.ranks, sign)
+        self.win_rates_calculated = False
+
+    def merge(self, other):
+        """Add the counts from another set of accumulators to these. Returns self, so merges can be chained."""
+        self._combine(other, 1)
+        if other.newest is not None and (self.newest is None or other.newest > self.newest):
+            self.newest = other.newest
+        return self
+
+    def subtract(self, other):
+        """Take the counts from another set of accumulators, which must cover a subset of these games, back out of these.
+            Returns self. The newest date is left alone.
+        """
+        self._combine(other, -1)
+        return self
+
+    def to_dict(self):
+        """Return a json serializable dictionary holding the counts. The derived win percentages are left out."""
+        return {'wins': self.wins,
+                'losses': self.losses,
+                'newest': self.newest,
+                'opponents': dict((opponent, _counts(data)) for opponent, data in self.opponents.items()),
+                'cards': dict((card, dict(_counts(data), opponents=dict((opponent, _counts(opponent_data))
+                                                                         for opponent, opponent_data in data['opponents'].items())))
+                              for card, data in self.cards.items()),
+                'turns': dict((str(turn), dict((card, _counts(data)) for card, data in turn_data['cards'].items()))
+                              for turn, turn_data in self.turns.items()),
+                'openings': [[sorted(opening[0]), sorted(opening[1]), _counts(data)] for opening, data in self.openings.items()],
+                'mana_differentials': dict((key, _counts(data)) for key, data in self.mana_differentials.items()),
+                'ranks': dict((str(rank), _counts(data)) for rank, data in self.ranks.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a set of accumulators from a dictionary returned by to_dict()."""
+        aggregates = cls()
+        aggregates.wins = data['wins']
+        aggregates.losses = data['losses']
+        aggregates.newest = data['newest']
+        aggregates.opponents = data['opponents']
+        aggregates.cards = data['cards']
+        aggregates.turns = dict((int(turn), {'cards': cards}) for turn, cards in data['turns'].items())
+        aggregates.openings = dict(((frozenset(turn_1), frozenset(turn_2)), counts) for turn_1, turn_2, counts in data['openings'])
+        aggregates.mana_differentials = data['mana_differentials']
+        aggregates.ranks = dict((int(rank), counts) for rank, counts in data['ranks'].items())
+        return aggregates
+
+
+class DailyAggregates(object):
+    """Aggregates kept as per day partials alongside a running total of all of them.
+        New games are folded into both, so the total never has to be recomputed.
+        A rolling window, e.g. the last 30 days, is kept by expiring the old days,
+        which subtracts their partials from the total.
+        The state can be saved as json and loaded again, so continuous reporting only costs the new games.
+    """
+
+    def __init__(self, key=None):
+        """Create an empty state. The key describes what the games are, e.g. a hero and deck, so a state isn't mixed up with another."""
+        self.key = key
+        self.total = Aggregates()
+        # Per day aggregates keyed by the ISO date, e.g. '2017-11-20'.
+        self.days = {}
+        # How far into the source file the games have been read, so the next run can pick up from there.
+        self.source = None
+        self.offset = 0
+
+    @property
+    def newest(self):
+        return self.total.newest
+
+    def add_game(self, game):
+        """Fold a single game into its day and the total."""
+        self.total.add_game(game)
+        day = game.date[:10]
+        if day not in self.days:
+            self.days[day] = Aggregates()
+        self.days[day].add_game(game)
+
+    def merge(self, other):
+        """Add another set of daily aggregates, for different games, to this one. Returns self."""
+        self.total.merge(other.total)
+        for day, aggregates in other.days.items():
+            self.days.setdefault(day, Aggregates()).merge(aggregates)
+        return self
+
+    def expire(self, before: str):
+        """Drop the days before the given ISO date, subtracting them from the total."""
+        for day in sorted(self.days):
+            if day >= before:
+                break
+            self.total.subtract(self.days.pop(day))
+
+    def save(self, path: str):
+        """Save the state to a json file."""
+        with open(path + '.tmp', 'w') as fp:
+            json.dump({'key': self.key,
+                       'total': self.total.to_dict(),
+                       'days': dict((day, aggregates.to_dict()) for day, aggregates in self.days.items()),
+                       'source': self.source,
+                       'offset': self.offset}, fp)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a state saved with save()."""
+        with open(path) as fp:
+            data = json.load(fp)
+        daily = cls(data['key'])
+        daily.total = Aggregates.from_dict(data['total'])
+        daily.days = dict((day, Aggregates.from_dict(aggregates)) for day, aggregates in data['days'].items())
+        daily.source = data['source']
+        daily.offset = data['offset']
+        return daily
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import json
+import os
+import re
+
+from game import Game
+
+# How much of a file to read at a time when streaming games from it.
+CHUNK_SIZE = 1 << 16
+
+# How many games write_sorted_run() sorts in memory at a time.
+RUN_SIZE = 100000
+
+# Whitespace and commas separating the games in a json array.
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _json_array_items(fp):
+    """Generate the items of a json array one at a time, without loading the whole file.
+        Used for the legacy format, a single json array of games like the one track-o-bot returns.
+    """
+    decoder = json.JSONDecoder()
+    buffer = fp.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Expected a json array of games in ' + fp.name)
+    position = 1
+
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The next item isn't complete yet, read more of the file.
+            chunk = fp.read(CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def _json_lines_items(fp):
+    """Generate the items of a JSON Lines file one at a time."""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def load_games(path: str, hero=None, deck=None, since=None, until=None, offset=0):
+    """Return an iterator of Game objects for the games stored in a file, without loading the whole file into memory.
+        Handles both the JSON Lines archive format and the legacy json array format.
+        Optionally only returns the games for a hero and deck, or added on or after since and before until.
+        The dates are ISO format strings, e.g. '2017-11-20'.
+        For JSON Lines files, reading can start at a byte offset, e.g. the size of the file the last time it was read,
+        to only read the games appended since. The offset is ignored for the legacy format.
+    """
+    with open(path) as fp:
+        first = fp.read(CHUNK_SIZE).lstrip()[:1]
+        if first == '[':
+            fp.seek(0)
+            items = _json_array_items(fp)
+        else:
+            fp.seek(offset)
+            items = _json_lines_items(fp)
+
+        for g in items:
+            game = Game(g)
+            if game.matches(hero, deck, since, until):
+                yield game
+
+
+def _run_key(line: str):
+    """Return the (date, id) sort key of a line in a sorted run file."""
+    added, game_id, _ = line.split('\t', 2)
+    return added, int(game_id)
+
+
+def _unique_games(lines):
+    """Generate the run file lines for the games not seen before, dropping later copies of a game.
+        Copies of a game can have different dates, so they're matched on the game id alone.
+        Only the ids are held in memory, not the games.
+    """
+    seen = set()
+    for line in lines:
+        game_id = int(line.split('\t', 2)[1])
+        if game_id not in seen:
+            seen.add(game_id)
+            yield line
+
+
+def write_sorted_run(path: str, run_path: str, hero=None, deck=None):
+    """Write the games in a file, optionally only the ones for a hero and deck, to a sorted run file for merge_runs().
+        A run holds one game per line, newest first, each line prefixed with the game's date and id.
+        The games are sorted RUN_SIZE at a time into temporary files next to the run, which are then merged into it,
+        so a file bigger than memory can be sorted. Copies of a game within the file are dropped,
+        the newest copy is kept. Returns the number of games written.
+    """
+    lines = (game.date + '\t' + repr(game.id) + '\t' + json.dumps(game.game_data) + '\n'
+             for game in load_games(path, hero=hero, deck=deck))
+    chunk_paths = []
+    try:
+        while True:
+            chunk = sorted(itertools.islice(lines, RUN_SIZE), key=_run_key, reverse=True)
+            if not chunk:
+                break
+            chunk_paths.append(run_path + '.' + repr(len(chunk_paths)))
+            with open(chunk_paths[-1], 'w') as fp:
+                fp.writelines(chunk)
+            del chunk
+
+        chunks = [open(chunk_path) for chunk_path in chunk_paths]
+        try:
+            count = 0
+            with open(run_path, 'w') as fp:
+                for line in _unique_games(heapq.merge(*chunks, key=_run_key, reverse=True)):
+                    fp.write(line)
+                    count += 1
+            return count
+        finally:
+            for chunk in chunks:
+                chunk.close()
+    finally:
+        for chunk_path in chunk_paths:
+            os.remove(chunk_path)
+
+
+def merge_runs(run_paths):
+    """Merge sorted run files written by write_sorted_run() into one stream of game json strings, newest first.
+        Only a line per run, and the ids of the games already merged, are held in memory at a time.
+        Copies of a game in different runs are dropped, the newest copy is kept.
+    """
+    files = [open(run_path) for run_path in run_paths]
+    try:
+        for line in _unique_games(heapq.merge(*files, key=_run_key, reverse=True)):
+            yield line.split('\t', 2)[2].rstrip('\n')
+    finally:
+        for fp in files:
+            fp.close()
+
+
+class Archive(object):
+    """A persistent archive of track-o-bot games, used to keep history beyond track-o-bot's 10 days.
+        Games are stored one json dictionary per line (JSON Lines), oldest game first,
+        so new games are appended to the end without rewriting the games already stored.
+    """
+
+    def __init__(self, path: str):
+        """Create an archive backed by the given file. The file is created when games are first appended."""
+        self.path = path
+
+    def newest(self):
+        """Return the game dictionary for the newest game in the archive, or None if it's empty."""
+        if not os.path.exists(self.path):
+            return None
+
+        # Read backwards from the end of the file until we have the whole last line.
+        with open(self.path, 'rb') as fp:
+            fp.seek(0, os.SEEK_END)
+            position = fp.tell()
+            tail = b''
+            while position > 0 and tail.strip().count(b'\n') == 0:
+                read_size = min(4096, position)
+                position -= read_size
+                fp.seek(position)
+                tail = fp.read(read_size) + tail
+
+        lines = tail.strip().splitlines()
+        return json.loads(lines[-1].decode('utf-8')) if lines else None
+
+    def append(self, games_json: list):
+        """Append a list of game dictionaries to the archive, they must be ordered oldest first."""
+        with open(self.path, 'a') as fp:
+            for g in games_json:
+                fp.write(json.dumps(g) + '\n')
+
+    def games(self, **filters):
+        """Return an iterator of Game objects for the games in the archive, oldest first.
+            Takes the same optional filters as load_games.
+        """
+        if not os.path.exists(self.path):
+            return iter(())
+        return load_games(self.path, **filters)
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from tabulate import tabulate
+
+from archive import load_games
+from hero import Hero
+from store import GameStore
+from synthetic import generate_games, write_games
+from vectorized import np
+from writers import MarkdownWriter
+
+parser = argparse.ArgumentParser(description='Benchmark loading, filtering and analyzing synthetic track-o-bot games. Runs offline.')
+parser.add_argument('-n', '--games', type=int, nargs='+', default=[2000, 20000],
+                    help='The numbers of games to benchmark with, each size is benchmarked separately.')
+parser.add_argument('--seed', type=int, default=0,
+                    help='The random seed for the synthetic games, the same seed always generates the same games.')
+parser.add_argument('-c', '--hero', type=str, default='Mage',
+                    help='The hero class to analyze.')
+parser.add_argument('-k', '--deck', type=str,
+                    help='The deck name to analyze. If not specified all the hero\'s decks are analyzed.')
+parser.add_argument('--backend', choices=['python', 'numpy'], default='python',
+                    help='How to compute the hero analyses.')
+parser.add_argument('--compact', action='store_true',
+                    help='Load the games into a compact columnar store.')
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help='How many times to time each stage, the fastest time is reported.')
+parser.add_argument('--baseline', type=str,
+                    help='A baseline file to compare the timings and results against.')
+parser.add_argument('--save-baseline', action='store_true',
+                    help='Save the timings and results to the --baseline file instead of comparing against it.')
+parser.add_argument('--tolerance', type=float, default=0.25,
+                    help='How much slower than the baseline a stage can be before it is reported as a regression, e.g. 0.25 is 25%%.')
+parser.add_argument('--startup-budget', type=float, default=0.25,
+                    help='The most seconds running hs-deck-analyzer.py and smoosh.py on a handful of games can take. '
+                    + 'Scripts call them over and over, so their startup is checked against this budget.')
+parser.add_argument('--data-dir', type=str,
+                    help='A directory to write the synthetic game files to. Defaults to a temporary directory.')
+
+args = parser.parse_args()
+
+MEGABYTE = 1024 * 1024
+
+# Stages this much slower than the baseline or less are timing noise, not regressions.
+NOISE_SECONDS = 0.01
+
+# The number of games the startup of the scripts is timed with, few enough that the time is all interpreter and import startup.
+STARTUP_GAMES = 10
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The analyses that need numpy, which is optional, they're skipped without it.
+NUMPY_ANALYSES = ['analyze_tempo']
+
+
+def best_time(function, repeat: int, setup=None):
+    """Return the fastest of repeat runs of function, in seconds, along with the last result.
+        setup is called before each run, untimed.
+    """
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(function):
+    """Return the peak memory allocated while running function, in MB."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / MEGABYTE
+    finally:
+        tracemalloc.stop()
+
+
+def digest(output: str):
+    """Fingerprint an analysis' output. Ties can print in any order, so the lines are sorted first."""
+    return hashlib.sha256('\n'.join(sorted(output.splitlines())).encode('utf-8')).hexdigest()
+
+
+def load(path: str):
+    games = GameStore() if args.compact else []
+    for game in load_games(path):
+        if args.compact:
+            games.add(game.game_data)
+        else:
+            games.append(game)
+    return games
+
+
+def hero_games(games):
+    return [game for game in games if game.matches(args.hero, args.deck) and game.had_played_cards()]
+
+
+def analyze(hero: Hero, method: str):
+    output = io.StringIO()
+    MarkdownWriter(output).write_all(getattr(hero, method)())
+    return output.getvalue()
+
+
+def run_script(script: str, arguments: list):
+    subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, script)] + arguments, check=True, stdout=subprocess.DEVNULL)
+
+
+def smoosh(paths: list, outfile: str):
+    run_script('smoosh.py', ['-i'] + paths + ['-o', outfile])
+
+
+def startup(data_dir: str):
+    """Time running the scripts on a handful of games, the way scripts call them. Returns the seconds keyed by script."""
+    path = os.path.join(data_dir, 'games-startup.json')
+    write_games(path, generate_games(STARTUP_GAMES, args.seed))
+    runs = {'hs-deck-analyzer.py': ['-i', path],
+            'smoosh.py': ['-i', path, '-o', os.path.join(data_dir, 'smooshed-startup.json')]}
+    return dict((script, best_time(lambda: run_script(script, arguments), args.repeat)[0]) for script, arguments in runs.items())
+
+
+def benchmark(size: int, data_dir: str):
+    """Benchmark every stage for the given number of games.
+        Returns the stage results, keyed by stage name, and the digests of the analyses' output.
+    """
+    games_json = generate_games(size, args.seed)
+    path = os.path.join(data_dir, 'games-' + repr(size) + '.json')
+    write_games(path, games_json)
+
+    # Two overlapping halves for smoosh to de-dupe.
+    halves = [os.path.join(data_dir, 'games-' + repr(size) + '-' + half + '.json') for half in ('new', 'old')]
+    write_games(halves[0], games_json[:size * 2 // 3])
+    write_games(halves[1], games_json[size // 3:])
+    del games_json
+
+    stages = {}
+    digests = {}
+
+    def stage(name, function, repeat=args.repeat, setup=None):
+        seconds, result = best_time(function, repeat, setup)
+        if setup:
+            setup()
+        stages[name] = {'seconds': seconds, 'peak memory': peak_memory(function)}
+        return result
+
+    def clear_features():
+        """Drop the features the games cache, so every aggregate run computes them, like a run of hs-deck-analyzer.py does."""
+        for game in filtered:
+            game.set_features(None)
+
+    games = stage('load', lambda: load(path))
+    filtered = stage('filter', lambda: hero_games(games))
+    hero = stage('aggregate', lambda: Hero(filtered, args.hero, args.deck, backend=args.backend), setup=clear_features)
+    for method in sorted(name for name in dir(Hero) if name.startswith('analyze_') and (np is not None or name not in NUMPY_ANALYSES)):
+        digests[method] = digest(stage(method, lambda: analyze(hero, method)))
+    stage('smoosh', lambda: smoosh(halves, os.path.join(data_dir, 'smooshed-' + repr(size) + '.json')), repeat=1)
+
+    digests['summary'] = digest(repr((len(games), sum(1 for game in games if game.won()), len(filtered), hero.wins)))
+    return stages, digests
+
+
+if args.save_baseline and not args.baseline:
+    parser.error('--save-baseline requires a --baseline file.')
+
+config = {'seed': args.seed, 'hero': args.hero, 'deck': args.deck, 'backend': args.backend, 'compact': args.compact}
+baseline = None
+if args.baseline and not args.save_baseline:
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    if baseline['config'] != config:
+        parser.error(args.baseline + ' was run with ' + repr(baseline['config']) + ', not ' + repr(config) + '.')
+
+if np is None:
+    print('Skipping the analyses that need numpy, ' + ', '.join(NUMPY_ANALYSES) + '. Install it with: pip install numpy')
+
+results = {}
+with tempfile.TemporaryDirectory() as temporary_dir:
+    data_dir = args.data_dir or temporary_dir
+    os.makedirs(data_dir, exist_ok=True)
+    startup_seconds = startup(data_dir)
+    for size in args.games:
+        stages, digests = benchmark(size, data_dir)
+        results[repr(size)] = {'stages': stages, 'digests': digests}
+
+# Report the startup times against the budget, then each size's stages, against the baseline if there is one.
+failed = False
+print()
+print('--- startup with ' + repr(STARTUP_GAMES) + ' games, best of ' + repr(args.repeat) + ' ---')
+table = []
+for script, seconds in startup_seconds.items():
+    over = seconds > args.startup_budget
+    table.append([script, seconds, args.startup_budget, 'OVER BUDGET' if over else 'ok'])
+    failed = failed or over
+print(tabulate(table, headers=['Script', 'Seconds', 'Budget', ''], floatfmt='.4f'))
+
+for size, result in results.items():
+    print()
+    print('--- ' + size + ' games, best of ' + repr(args.repeat) + ' ---')
+    baseline_result = baseline['sizes'].get(size) if baseline else None
+    table = []
+    for name, data in result['stages'].items():
+        row = [name, data['seconds'], data['peak memory']]
+        if baseline_result and name in baseline_result['stages']:
+            baseline_seconds = baseline_result['stages'][name]['seconds']
+            change = data['seconds'] / baseline_seconds - 1 if baseline_seconds else 0
+            slower = change > args.tolerance and data['seconds'] - baseline_seconds > NOISE_SECONDS
+            row += [baseline_seconds, '{:+.1%}'.format(change) + (' SLOWER' if slower else '')]
+            failed = failed or slower
+        table.append(row)
+    headers = ['Stage', 'Seconds', 'Peak MB']
+    if baseline_result:
+        headers += ['Baseline seconds', 'Change']
+    print(tabulate(table, headers=headers, floatfmt='.4f'))
+
+    if baseline_result:
+        changed = sorted(name for name, value in result['digests'].items() if baseline_result['digests'].get(name) != value)
+        if changed:
+            print('RESULTS CHANGED: ' + ', '.join(changed))
+            failed = True
+        else:
+            print('Results match the baseline.')
+
+if args.save_baseline:
+    with open(args.baseline, 'w') as fp:
+        json.dump({'config': config, 'python': platform.python_version(), 'startup': startup_seconds, 'sizes': results}, fp, indent=2)
+    print()
+    print('Saved the baseline to ' + args.baseline)
+
+sys.exit(1 if failed else 0)
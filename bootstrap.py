@@ -0,0 +1,202 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import vectorized
+from vectorized import np, require_numpy
+
+# How many replicates each thread resamples at a time, bounds the memory used by the draw count matrices.
+BLOCK_SIZE = 64
+
+# The most draw counts gathered for summing at a time, bounds the memory used while summing the rows.
+MAX_GATHERED = 1 << 24
+
+# The most cells an incidence is multiplied as a dense game x key matrix with, 64MB of float32.
+MAX_DENSE = 1 << 24
+
+
+class _Incidence(object):
+    """The games covered by each of a set of keys, from (key, game) pairs, kept as the pairs' games grouped by key.
+        Small incidences are also kept as a dense game x key 0/1 matrix, for BLAS matrix products, which are much
+        faster than gathering the games. Big ones, e.g. thousands of turn x card rows over hundreds of thousands of games,
+        would take gigabytes as a matrix, so their games' draw counts are gathered and summed instead.
+    """
+
+    def __init__(self, keys, games, game_count):
+        order = np.argsort(keys, kind='stable')
+        self.keys, starts = np.unique(keys[order], return_index=True)
+        self.games = games[order]
+        # The range of each key's games.
+        self.bounds = np.append(starts, len(self.games))
+        self.matrix = None
+        if game_count * len(self.keys) <= MAX_DENSE:
+            # Float32 holds draw count sums exactly.
+            self.matrix = np.zeros((game_count, len(self.keys)), dtype=np.float32)
+            self.matrix[self.games, np.repeat(np.arange(len(self.keys)), np.diff(self.bounds))] = 1
+
+    def sums(self, draws):
+        """Sum the draw counts of each key's games, from a game x replicate matrix of draw counts.
+            Returns a replicate x key matrix.
+        """
+        if self.matrix is not None:
+            return (draws.T @ self.matrix).astype(np.float64)
+
+        sums = np.zeros((len(self.keys), draws.shape[1]))
+        # The games are gathered as whole rows of draw counts, a run of keys at a time.
+        pairs_per_run = max(MAX_GATHERED // max(draws.shape[1], 1), 1)
+        bounds = self.bounds
+        first = 0
+        while first < len(self.keys):
+            last = min(max(int(np.searchsorted(bounds, bounds[first] + pairs_per_run)), first + 1), len(self.keys))
+            sums[first:last] = np.add.reduceat(draws[self.games[bounds[first]:bounds[last]]], bounds[first:last] - bounds[first], axis=0)
+            first = last
+        return sums.T
+
+
+class _Rows(object):
+    """The games covered by a set of table rows, e.g. the games each card was played in, keyed by row id.
+        Each row is compared against a baseline group of games, which includes the row's own games, e.g. all the games
+        for a card, or all the games against the opponent for a card vs. opponent row. The row's unplayed games are
+        the baseline games it doesn't cover. Compared maps each row id to the key of its baseline.
+    """
+
+    def __init__(self, rows, games, baseline_keys, baseline_games, compared, game_count):
+        self.incidence = _Incidence(rows, games, game_count)
+        self.rows = self.incidence.keys
+        self.baseline_incidence = _Incidence(baseline_keys, baseline_games, game_count)
+        # The position of each row's baseline in the baseline sums.
+        self.baselines = np.searchsorted(self.baseline_incidence.keys, compared(self.rows))
+
+    def win_percentages(self, draws, won_draws):
+        """Return the replicates' win percentages for every row, and the deltas from the rows' unplayed games."""
+        games = self.incidence.sums(draws)
+        wins = self.incidence.sums(won_draws)
+        unplayed_games = self.baseline_incidence.sums(draws)[:, self.baselines] - games
+        unplayed_wins = self.baseline_incidence.sums(won_draws)[:, self.baselines] - wins
+        win_percentages = _win_percentages(wins, games)
+        return win_percentages, win_percentages - _win_percentages(unplayed_wins, unplayed_games)
+
+
+def _win_percentages(wins, games):
+    result = np.full(np.shape(games), np.nan)
+    np.divide(wins, games, out=result, where=games != 0)
+    return result * 100
+
+
+def _card_rows(arrays):
+    """Card rows and card vs. opponent rows. A card counts once per game no matter how many times it was played."""
+    card_count = len(arrays.card_names)
+    opponent_count = len(arrays.opponent_names)
+    mine = arrays.players == 0
+    pairs = np.unique(arrays.games[mine] * card_count + arrays.cards[mine])
+    pair_games, pair_cards = np.divmod(pairs, card_count)
+    game_indices = np.arange(len(arrays))
+
+    # Cards are compared with all the games, card vs. opponent rows with the games against the opponent.
+    cards = _Rows(pair_cards, pair_games, np.zeros(len(arrays), dtype=np.int64), game_indices, np.zeros_like, len(arrays))
+    opponents = _Rows(pair_cards * opponent_count + arrays.opponents[pair_games], pair_games, arrays.opponents, game_indices,
+                      lambda rows: rows % opponent_count, len(arrays))
+    return cards, opponents
+
+
+def _turn_rows(arrays):
+    """Turn x card rows, the same rows Aggregates.turns counts: every turn before the last turn the hero played a card on,
+        with 'pass' for the turns where nothing was played. Each row is compared with the games that reached its turn.
+    """
+    card_count = len(arrays.card_names) + 1
+    mine = arrays.players == 0
+    last_turns = np.zeros(len(arrays), dtype=np.int64)
+    np.maximum.at(last_turns, arrays.games[mine], arrays.turns[mine])
+
+    # Every (game, turn) the game reached, excluding the last turn since the game ended during it.
+    reached = np.maximum(last_turns - 1, 0)
+    reached_games = np.repeat(np.arange(len(arrays)), reached)
+    reached_turns = np.arange(reached.sum()) - np.repeat(np.cumsum(reached) - reached, reached) + 1
+    max_turn = int(last_turns.max(initial=0)) + 1
+
+    played = mine & (arrays.turns >= 1) & (arrays.turns < last_turns[arrays.games])
+    triples = np.unique((arrays.games[played] * max_turn + arrays.turns[played]) * card_count + arrays.cards[played])
+    game_turns, cards = np.divmod(triples, card_count)
+
+    # The turns reached where nothing was played are passes, the last card id.
+    passed = ~np.isin(reached_games * max_turn + reached_turns, game_turns)
+    game_turns = np.concatenate([game_turns, reached_games[passed] * max_turn + reached_turns[passed]])
+    cards = np.concatenate([cards, np.full(passed.sum(), card_count - 1)])
+    games, turns = np.divmod(game_turns, max_turn)
+
+    return (_Rows(turns * card_count + cards, games, reached_turns, reached_games, lambda rows: rows // card_count, len(arrays)),
+            card_count)
+
+
+def _replicate_block(arrays, row_sets, replicates, seed):
+    """Resample replicates sets of games, returning the win percentages and the played vs. unplayed deltas of every row."""
+    game_count = len(arrays)
+    rng = np.random.default_rng(seed)
+    # An index matrix of the games drawn for each replicate, converted to a game x replicate matrix of how many times
+    # each game was drawn, game major so a row's games are gathered as whole rows.
+    indices = rng.integers(0, game_count, size=(replicates, game_count))
+    draws = np.bincount((indices * replicates + np.arange(replicates)[:, None]).ravel(),
+                        minlength=replicates * game_count).reshape(game_count, replicates).astype(np.float32)
+    won_draws = draws * arrays.won[:, None]
+    return [rows.win_percentages(draws, won_draws) for rows in row_sets]
+
+
+def _interval(values, confidence):
+    """Return the (low, high) percentile interval of each column of replicate values, ignoring replicates without games."""
+    tail = (1 - confidence) / 2 * 100
+    if not values.shape[1]:
+        return [], []
+    # Rows that never have unplayed games, e.g. a card played every game, have no interval.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanpercentile(values, [tail, 100 - tail], axis=0)
+    return low.tolist(), high.tolist()
+
+
+def bootstrap(games: list, replicates=1000, confidence=0.95, seed=0, jobs=None):
+    """Compute bootstrap confidence intervals for the win rates of every card, card vs. opponent and turn x card row,
+        and for the difference between each row's win rate and the win rate of the games it doesn't cover,
+        e.g. the games where the card wasn't played.
+        Returns a dictionary shaped like the Aggregates, with the cards, the cards' opponents and the turns' cards
+        each holding 'low', 'high', 'delta low' and 'delta high' percentages.
+        The same seed always gives the same intervals. The replicates are resampled in blocks split over jobs threads,
+        defaults to the number of CPUs, NumPy releases the GIL while it works.
+    """
+    require_numpy('Bootstrapping')
+
+    intervals = {'cards': {}, 'turns': {}}
+    arrays = vectorized.encode(games)
+    if not len(arrays):
+        return intervals
+
+    card_rows, opponent_rows = _card_rows(arrays)
+    turn_rows, turn_card_count = _turn_rows(arrays)
+    row_sets = [card_rows, opponent_rows, turn_rows]
+
+    # Independent seeds for each block of replicates, so the results don't depend on the number of threads.
+    block_sizes = [min(BLOCK_SIZE, replicates - start) for start in range(0, replicates, BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        blocks = list(executor.map(lambda block: _replicate_block(arrays, row_sets, *block), zip(block_sizes, seeds)))
+
+    columns = []
+    for i, rows in enumerate(row_sets):
+        win_percentages = np.concatenate([block[i][0] for block in blocks])
+        deltas = np.concatenate([block[i][1] for block in blocks])
+        columns.append((rows.rows.tolist(),) + tuple(_interval(win_percentages, confidence)) + tuple(_interval(deltas, confidence)))
+
+    def interval(low, high, delta_low, delta_high):
+        return {'low': low, 'high': high, 'delta low': delta_low, 'delta high': delta_high}
+
+    card_names = arrays.card_names
+    opponent_count = len(arrays.opponent_names)
+    for card, *values in zip(*columns[0]):
+        intervals['cards'][card_names[card]] = dict(interval(*values), opponents={})
+    for row, *values in zip(*columns[1]):
+        card, opponent = divmod(row, opponent_count)
+        intervals['cards'][card_names[card]]['opponents'][arrays.opponent_names[opponent]] = interval(*values)
+    turn_card_names = card_names + ['pass']
+    for row, *values in zip(*columns[2]):
+        turn, card = divmod(row, turn_card_count)
+        intervals['turns'].setdefault(turn, {})[turn_card_names[card]] = interval(*values)
+    return intervals
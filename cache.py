@@ -0,0 +1,90 @@
+import hashlib
+import os
+import pickle
+
+# Bump this whenever the shape of the cached data changes, so stale entries are never used.
+# Aggregates are cached as Aggregates.to_dict(), so bump it when the fields of to_dict() change.
+CACHE_VERSION = 2
+
+# How much of the start and end of a file goes into its fingerprint.
+FINGERPRINT_SAMPLE_SIZE = 1 << 16
+
+
+def fingerprint_file(path: str):
+    """Return a fingerprint for the contents of a file, without reading the whole file.
+        Uses the size and modification time plus a hash of the start and end of the file,
+        so appending games to an archive always changes the fingerprint.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode('utf-8'))
+    with open(path, 'rb') as fp:
+        digest.update(fp.read(FINGERPRINT_SAMPLE_SIZE))
+        fp.seek(max(stat.st_size - FINGERPRINT_SAMPLE_SIZE, 0))
+        digest.update(fp.read(FINGERPRINT_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def fingerprint_games(games):
+    """Return a fingerprint for a collection of games, based on their ids and dates."""
+    digest = hashlib.sha256()
+    for game in games:
+        digest.update(repr((game.id, game.date)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AggregateCache(object):
+    """An on-disk cache for computed analysis results, e.g. a hero's Aggregates.to_dict().
+        Entries are keyed by a fingerprint of the input data plus whatever else the results depend on,
+        like the hero and deck. Display only options, like the min sample size, should be left out of the key
+        so they reuse the same entry. When the cache grows past its max size, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_size=256 * 1024 * 1024):
+        """Create a cache in the given directory, holding at most max_size bytes."""
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Build a cache key from the input fingerprint and anything else the cached results depend on."""
+        return hashlib.sha256(repr((CACHE_VERSION,) + parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key: str):
+        """Return the cached value for the key, or None if it isn't cached."""
+        try:
+            with open(self._path(key), 'rb') as fp:
+                value = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Mark the entry as recently used.
+        os.utime(self._path(key))
+        return value
+
+    def put(self, key: str, value):
+        """Cache a value under the key, then evict old entries if the cache is too big."""
+        # Write then rename so a reader never sees a partial entry.
+        temporary_path = self._path(key) + '.' + repr(os.getpid()) + '.tmp'
+        with open(temporary_path, 'wb') as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits in its max size."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
@@ -0,0 +1,221 @@
+import sqlite3
+
+from aggregates import Aggregates, MANA_DIFFERENTIAL_KEYS
+from game import Game
+from store import PLAYERS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    mode TEXT,
+    hero TEXT NOT NULL,
+    deck TEXT NOT NULL,
+    opponent TEXT NOT NULL,
+    opponent_deck TEXT NOT NULL,
+    result TEXT,
+    rank INTEGER,
+    coin INTEGER,
+    duration INTEGER,
+    added TEXT NOT NULL,
+    player TEXT
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS card_plays (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    turn INTEGER,
+    player INTEGER NOT NULL,
+    card_id INTEGER NOT NULL REFERENCES cards(id),
+    mana INTEGER
+);
+CREATE INDEX IF NOT EXISTS games_hero_deck ON games(hero, deck, added);
+CREATE INDEX IF NOT EXISTS games_opponent ON games(opponent, added);
+CREATE INDEX IF NOT EXISTS games_mode ON games(mode);
+CREATE INDEX IF NOT EXISTS games_rank ON games(rank);
+CREATE INDEX IF NOT EXISTS games_added ON games(added);
+CREATE INDEX IF NOT EXISTS card_plays_game ON card_plays(game_id, player, turn);
+'''
+
+# Columns added to the games table since it was first released, added to older databases when they're opened.
+ADDED_COLUMNS = [('player', 'TEXT')]
+
+# The games considered by the hero analyses, the same games Hero picks: matching games where cards were played.
+HERO_GAMES = '''
+WITH hero_games AS (
+    SELECT g.id, g.opponent, g.rank, g.added, g.result = 'win' AS won FROM games g
+    WHERE {where} AND EXISTS (SELECT 1 FROM card_plays p WHERE p.game_id = g.id)
+),
+me_plays AS (
+    SELECT DISTINCT p.game_id, p.turn, p.card_id FROM card_plays p JOIN hero_games h ON h.id = p.game_id WHERE p.player = 0
+)
+'''
+
+
+class GameDatabase(object):
+    """An embedded SQLite index of track-o-bot games.
+        Games are normalized into games, cards and card_plays tables, indexed on hero, deck, opponent,
+        mode, rank and date, so pulling one deck's games out of a long history only reads that deck's rows.
+        The hero analysis counts can also be computed in the database, see aggregates().
+    """
+
+    def __init__(self, path: str):
+        """Open the database stored in the given file, creating it if needed."""
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(games)')]
+        with self.connection:
+            for name, column_type in ADDED_COLUMNS:
+                if name not in columns:
+                    self.connection.execute('ALTER TABLE games ADD COLUMN ' + name + ' ' + column_type)
+        self._card_ids = dict((name, card_id) for card_id, name in self.connection.execute('SELECT id, name FROM cards'))
+
+    def close(self):
+        self.connection.close()
+
+    def _card_id(self, name: str):
+        card_id = self._card_ids.get(name)
+        if card_id is None:
+            card_id = self.connection.execute('INSERT INTO cards (name) VALUES (?)', (name,)).lastrowid
+            self._card_ids[name] = card_id
+        return card_id
+
+    def ingest(self, games):
+        """Add an iterable of games to the database, skipping any games that are already stored.
+            Takes any Game, including the StoredGames of a GameStore, fields a game doesn't have are stored as null.
+            Returns the number of games added.
+        """
+        added = 0
+        with self.connection:
+            for game in games:
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO games (id, mode, hero, deck, opponent, opponent_deck, result, rank, coin, duration, added, player) '
+                    + 'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (game.id, game.mode, game.hero, game.deck, game.opponent, game.opponent_deck,
+                     'win' if game.won() else 'loss', game.rank, game.coin, game.duration, game.date, game.player))
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                self.connection.executemany(
+                    'INSERT INTO card_plays (game_id, turn, player, card_id, mana) VALUES (?, ?, ?, ?, ?)',
+                    [(game.id, turn, PLAYERS.index(player), self._card_id(card), mana) for turn, player, card, mana in game.plays()])
+        return added
+
+    @staticmethod
+    def _where(hero=None, deck=None, opponent=None, mode=None, max_rank=None, since=None, until=None, player=None):
+        """Build the where clause and parameters for the games table, aliased as g, matching the given filters.
+            max_rank keeps games played at that ladder rank or better, legend is rank 0.
+            player keeps a team player's games, see Game.player.
+        """
+        clauses = ['1']
+        parameters = []
+        for clause, value in (('g.hero = ?', hero), ('g.deck = ?', deck), ('g.opponent = ?', opponent), ('g.mode = ?', mode),
+                              ('g.rank <= ?', max_rank), ('g.added >= ?', since), ('g.added < ?', until), ('g.player = ?', player)):
+            if value is not None:
+                clauses.append(clause)
+                parameters.append(value)
+        return ' AND '.join(clauses), parameters
+
+    def count(self, **filters):
+        """Return a (games, wins) tuple for the games matching the filters."""
+        where, parameters = self._where(**filters)
+        games, wins = self.connection.execute(
+            "SELECT COUNT(*), SUM(g.result = 'win') FROM games g WHERE " + where, parameters).fetchone()
+        return games, wins or 0
+
+    def games(self, **filters):
+        """Return an iterator of Game objects for the games matching the filters, oldest first.
+            Takes hero, deck, opponent, mode, max_rank, since, until and player filters.
+        """
+        where, parameters = self._where(**filters)
+        game_rows = self.connection.execute(
+            'SELECT g.id, g.mode, g.hero, g.deck, g.opponent, g.opponent_deck, g.result, g.rank, g.coin, g.duration, g.added, g.player '
+            + 'FROM games g WHERE ' + where + ' ORDER BY g.added, g.id', parameters)
+        play_rows = self.connection.execute(
+            'SELECT p.game_id, p.turn, p.player, c.name, p.mana FROM card_plays p JOIN games g ON g.id = p.game_id '
+            + 'JOIN cards c ON c.id = p.card_id WHERE ' + where + ' ORDER BY g.added, g.id, p.rowid', parameters)
+
+        # Both queries are in the same order, so the plays are merged into their games as we go.
+        play = next(play_rows, None)
+        for game_id, mode, hero, deck, opponent, opponent_deck, result, rank, coin, duration, added, player in game_rows:
+            card_history = []
+            while play is not None and play[0] == game_id:
+                card_history.append({'player': PLAYERS[play[2]], 'turn': play[1], 'card': {'name': play[3], 'mana': play[4]}})
+                play = next(play_rows, None)
+            game_data = {'id': game_id, 'mode': mode, 'hero': hero, 'hero_deck': deck, 'opponent': opponent,
+                         'opponent_deck': opponent_deck, 'result': result, 'rank': rank, 'legend': mode == 'ranked' and rank == 0,
+                         'coin': None if coin is None else bool(coin), 'duration': duration, 'added': added, 'card_history': card_history}
+            if player is not None:
+                game_data['player'] = player
+            yield Game(game_data)
+
+    def _hero_query(self, sql: str, filters: dict):
+        where, parameters = self._where(**filters)
+        return self.connection.execute(HERO_GAMES.format(where=where) + sql, parameters)
+
+    def aggregates(self, **filters):
+        """Compute the Aggregates for the hero analyses in the database with GROUP BY queries,
+            without loading any games. Takes the same filters as games(),
+            the results match what Hero computes for the games returned by games().
+        """
+        aggregates = Aggregates()
+        aggregates.newest = self._hero_query('SELECT MAX(added) FROM hero_games', filters).fetchone()[0]
+
+        for opponent, games, wins in self._hero_query(
+                'SELECT opponent, COUNT(*), SUM(won) FROM hero_games GROUP BY opponent ORDER BY MIN(added)', filters):
+            aggregates.opponents[opponent] = {'games': games, 'wins': wins, 'losses': games - wins}
+            aggregates.wins += wins
+            aggregates.losses += games - wins
+
+        for rank, games, wins in self._hero_query(
+                'SELECT rank, COUNT(*), SUM(won) FROM hero_games GROUP BY rank ORDER BY MIN(added)', filters):
+            aggregates.ranks[rank] = {'games': games, 'wins': wins, 'losses': games - wins}
+
+        # A card counts once per game no matter how many times it was played.
+        for card, opponent, games, wins in self._hero_query(
+                'SELECT c.name, h.opponent, COUNT(*), SUM(h.won) FROM (SELECT DISTINCT game_id, card_id FROM me_plays) m '
+                + 'JOIN hero_games h ON h.id = m.game_id JOIN cards c ON c.id = m.card_id '
+                + 'GROUP BY m.card_id, h.opponent ORDER BY MIN(h.added)', filters):
+            card_data = aggregates.cards.setdefault(card, {'games': 0, 'wins': 0, 'losses': 0, 'opponents': {}})
+            card_data['games'] += games
+            card_data['wins'] += wins
+            card_data['losses'] += games - wins
+            card_data['opponents'][opponent] = {'games': games, 'wins': wins, 'losses': games - wins}
+
+        # The last turn is left out since the game ended during it, turns where nothing was played count as a 'pass'.
+        for turn, card, games, wins in self._hero_query(
+                ', last_turns AS (SELECT h.id, h.won, h.added, MAX(m.turn) AS last_turn FROM hero_games h '
+                + 'JOIN me_plays m ON m.game_id = h.id GROUP BY h.id), '
+                + 'game_turns AS (SELECT id, won, added, 1 AS turn, last_turn FROM last_turns WHERE last_turn > 1 '
+                + 'UNION ALL SELECT id, won, added, turn + 1, last_turn FROM game_turns WHERE turn + 1 < last_turn) '
+                + "SELECT t.turn, COALESCE(c.name, 'pass') AS card, COUNT(*), SUM(t.won) FROM game_turns t "
+                + 'LEFT JOIN me_plays m ON m.game_id = t.id AND m.turn = t.turn LEFT JOIN cards c ON c.id = m.card_id '
+                + 'GROUP BY t.turn, card ORDER BY t.turn, MIN(t.added)', filters):
+            turn_cards = aggregates.turns.setdefault(turn, {'cards': {}})['cards']
+            turn_cards[card] = {'games': games, 'wins': wins, 'losses': games - wins}
+
+        for bucket, games, wins in self._hero_query(
+                'SELECT CASE WHEN diff < -7 THEN 0 WHEN diff < -2 THEN 1 WHEN diff < 2 THEN 2 WHEN diff < 8 THEN 3 ELSE 4 END AS bucket, '
+                + 'COUNT(*), SUM(won) FROM (SELECT h.won, SUM(CASE WHEN p.player = 0 THEN p.mana ELSE -p.mana END) AS diff '
+                + 'FROM hero_games h JOIN card_plays p ON p.game_id = h.id GROUP BY h.id) GROUP BY bucket', filters):
+            aggregates.mana_differentials[MANA_DIFFERENTIAL_KEYS[bucket]] = {'games': games, 'wins': wins, 'losses': games - wins}
+
+        # Openings are keyed by sets of cards, so they're grouped here, but only the first 2 turns are read.
+        openings = {}
+        for game_id, won, turn, card in self._hero_query(
+                'SELECT h.id, h.won, m.turn, c.name FROM hero_games h LEFT JOIN me_plays m ON m.game_id = h.id AND m.turn IN (1, 2) '
+                + 'LEFT JOIN cards c ON c.id = m.card_id ORDER BY h.added, h.id', filters):
+            opening = openings.setdefault(game_id, (won, set(), set()))
+            if card is not None:
+                opening[turn].add(card)
+        for won, turn_1, turn_2 in openings.values():
+            opening_data = aggregates.openings.setdefault((frozenset(turn_1), frozenset(turn_2)), {'games': 0, 'wins': 0, 'losses': 0})
+            opening_data['games'] += 1
+            if won:
+                opening_data['wins'] += 1
+            else:
+                opening_data['losses'] += 1
+
+        return aggregates
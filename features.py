@@ -0,0 +1,117 @@
+import gc
+import os
+import pickle
+import sys
+
+# The features computed from the card history, with the version of the code computing each one.
+# Bump a feature's version when its computation changes, only that feature is recomputed for the cached games.
+FEATURE_VERSIONS = {'cards_by_turn': 1, 'mana_spent': 1, 'opponent_mana_spent': 1}
+
+
+def compute_features(game, names=tuple(FEATURE_VERSIONS)):
+    """Compute the named features of a game in a single walk over its plays. Returns a dictionary keyed by feature name."""
+    cards_by_turn = {}
+    mana = {'me': 0, 'opponent': 0}
+    for turn, player, card, card_mana in game.plays():
+        if player == 'me':
+            # Interned, so the cache file holds each card name once.
+            cards_by_turn.setdefault(turn, set()).add(sys.intern(card))
+        mana[player] += card_mana
+
+    features = {'cards_by_turn': dict((turn, frozenset(cards)) for turn, cards in cards_by_turn.items()),
+                'mana_spent': mana['me'],
+                'opponent_mana_spent': mana['opponent']}
+    return dict((name, features[name]) for name in names)
+
+
+class GameFeatures(object):
+    """The derived features of a single game, e.g. the cards played each turn and the mana spent, computed once and
+        shared by every analysis, see Game.features(). Only the features in FEATURE_VERSIONS are computed from the
+        card history, the rest are derived from them when the record is created.
+    """
+
+    __slots__ = ('cards_by_turn', 'mana_spent', 'opponent_mana_spent', 'cards', 'last_turn', 'opening', 'mana_differential')
+
+    def __init__(self, cards_by_turn: dict, mana_spent: int, opponent_mana_spent: int):
+        # Frozensets of the cards the hero played keyed by turn, only for the turns they played cards on.
+        self.cards_by_turn = cards_by_turn
+        self.mana_spent = mana_spent
+        self.opponent_mana_spent = opponent_mana_spent
+
+        self.cards = frozenset().union(*cards_by_turn.values())
+        self.last_turn = max(cards_by_turn, default=0)
+        self.opening = (cards_by_turn.get(1, frozenset()), cards_by_turn.get(2, frozenset()))
+        self.mana_differential = mana_spent - opponent_mana_spent
+
+    @classmethod
+    def from_game(cls, game, cached=None):
+        """Create the features of a game, reusing any features already computed, e.g. from a FeatureCache."""
+        features = dict(cached or {})
+        missing = [name for name in FEATURE_VERSIONS if name not in features]
+        if missing:
+            features.update(compute_features(game, missing))
+        return cls(**features)
+
+
+class FeatureCache(object):
+    """A file of the computed features of every game seen, keyed by game id, so later runs don't walk the card histories again.
+        Each feature is kept in its own column along with its version, a column saved by an older version of a feature
+        is dropped when the cache is loaded and the others are kept, so adding or changing a feature only costs
+        computing that feature.
+    """
+
+    def __init__(self, path: str):
+        """Load the cache from the given file, if it exists."""
+        self.path = path
+        # Dictionaries of feature values keyed by game id, keyed by feature name.
+        self.columns = dict((name, {}) for name in FEATURE_VERSIONS)
+        self.hits = 0
+        self.misses = 0
+        self._changed = False
+
+        if os.path.exists(path):
+            # The cache holds millions of small objects, collecting garbage while they're created would triple the load time.
+            gc.disable()
+            try:
+                with open(path, 'rb') as fp:
+                    cache_data = pickle.load(fp)
+            finally:
+                gc.enable()
+            for name, column in cache_data['columns'].items():
+                if cache_data['versions'].get(name) == FEATURE_VERSIONS.get(name):
+                    self.columns[name] = column
+                else:
+                    self._changed = True
+
+    def attach(self, games):
+        """Generate the games with their features attached, taken from the cache where they're in it.
+            Missing features are computed and added to the cache.
+        """
+        columns = list(self.columns.items())
+        for game in games:
+            cached = {}
+            for name, column in columns:
+                value = column.get(game.id)
+                if value is not None:
+                    cached[name] = value
+
+            if len(cached) == len(columns):
+                game.set_features(GameFeatures(**cached))
+                self.hits += 1
+            else:
+                features = GameFeatures.from_game(game, cached)
+                for name, column in columns:
+                    column[game.id] = getattr(features, name)
+                game.set_features(features)
+                self.misses += 1
+                self._changed = True
+            yield game
+
+    def save(self):
+        """Save the cache, if anything changed since it was loaded."""
+        if not self._changed:
+            return
+        with open(self.path + '.tmp', 'wb') as fp:
+            pickle.dump({'versions': FEATURE_VERSIONS, 'columns': self.columns}, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+        self._changed = False
@@ -1,9 +1,19 @@
+from features import GameFeatures
+
+
 class Game(object):
     """A class to encapsulate game data returned from track-o-bot."""
 
+    __slots__ = ('game_data', '_features')
+
     def __init__(self, game_data: dict):
         """Create a new game given a track-o-bot dictionary representing a single game."""
         self.game_data = game_data
+        self._features = None
+
+    @property
+    def id(self):
+        return self.game_data['id']
 
     @property
     def hero(self):
@@ -27,6 +37,25 @@ class Game(object):
     def date(self):
         return self.game_data['added']
 
+    # Games read for a team are tagged with the player whose account they came from, see team.py.
+    @property
+    def player(self):
+        return self.game_data.get('player')
+
+    @property
+    def mode(self):
+        return self.game_data.get('mode')
+
+    # Whether the hero went second and had the coin, None if track-o-bot doesn't know.
+    @property
+    def coin(self):
+        return self.game_data.get('coin')
+
+    # The length of the game in seconds, None if track-o-bot doesn't know.
+    @property
+    def duration(self):
+        return self.game_data.get('duration')
+
     @property
     def rank(self):
         """Return the rank that this game was played at. If the game was not played in ranked mode,
@@ -58,6 +87,13 @@ class Game(object):
     def ranked(self):
         return self.game_data['mode'] == 'ranked'
 
+    def matches(self, hero=None, deck=None, since=None, until=None):
+        """Test whether this game is for the specified hero and deck, and was added on or after since and before until.
+            The dates are ISO format strings, e.g. '2017-11-20'. Unspecified criteria always match.
+        """
+        return ((not hero or self.hero == hero) and (not deck or self.deck == deck) and
+                (not since or self.date >= since) and (not until or self.date < until))
+
     def had_played_cards(self):
         return bool(self.game_data['card_history'])
 
@@ -67,33 +103,47 @@ class Game(object):
         """
         return filter(lambda x : x['player'] == player, self.game_data['card_history'])
     
+    def plays(self):
+        """Return an iterator of (turn, player, card name, mana) tuples for every card played this game, by either player."""
+        return ((x['turn'], x['player'], x['card']['name'], x['card']['mana']) for x in self.game_data['card_history'])
+
+    def features(self):
+        """Return the GameFeatures of this game, computed from its card history the first time they're asked for."""
+        if self._features is None:
+            self._features = GameFeatures.from_game(self)
+        return self._features
+
+    def set_features(self, features: GameFeatures):
+        """Use features computed elsewhere, e.g. loaded from a FeatureCache."""
+        self._features = features
+
     def cards(self):
         """Return the set of card names that the hero (not the opponent) played this game."""
-        return set(map(lambda y : y['card']['name'], self.card_history()))
+        return set(self.features().cards)
 
     def cards_on_turn(self, turn: int):
         """Return a frozenset of cards that the hero played on the specified turn. The first turn is 1."""
-        return frozenset(map(lambda y : y['card']['name'],
-                             filter(lambda x : x['player'] == 'me' and x['turn'] == turn, self.game_data['card_history'])))
+        return self.features().cards_by_turn.get(turn, frozenset())
 
     def opening(self):
         """Return a tuple of frozensets of the cards played each turn on the first 2 turns of this game.
             e.g. (frozenset({'Mana Wyrm'}), frozenset({'Arcanologist'}), frozenset({'Mirror Entity', 'Kirin Tor Mage'}))
         """
-        return (self.cards_on_turn(1), self.cards_on_turn(2))
+        return self.features().opening
 
     def last_turn(self):
         """Find the last turn taken by the hero in this game."""
-        return max(map(lambda x: x['turn'], self.card_history()), default=0)
+        return self.features().last_turn
 
     def mana_spent(self, player='me'):
         """Get the total mana spent by the specified player across all the turns in the game.
             Defaults to the hero, 'me', specify 'opponent' for the opponent's mana spent.
         """
-        return sum(map(lambda x: x['card']['mana'], self.card_history(player)))
+        features = self.features()
+        return features.mana_spent if player == 'me' else features.opponent_mana_spent
 
     def mana_differential(self):
         """Get the differential between the mana spent by the hero and the opponent over the course of the game.
             A negative number means the opponent spent more mana.
         """
-        return self.mana_spent() - self.mana_spent('opponent')
+        return self.features().mana_differential
@@ -1,51 +1,89 @@
-from tabulate import tabulate
-from pprint import pprint
-
-FLOAT_FORMAT = '.1f'
+from aggregates import Aggregates, MANA_DIFFERENTIAL_KEYS
+from openings import OpeningIndex
+from synergy import synergies
+from writers import DeltaInterval, Interval, Table
 
 class Hero(object):
     """Analyze how a specific hero performs.
-        Output is preformatted for reddit.
+        The analyses return Tables, which are written out by the writers in writers.py. The markdown report is preformatted for reddit.
         For reddit formatting tips see: https://www.reddit.com/r/reddit.com/comments/6ewgt/reddit_markdown_primer_or_how_do_you_do_all_that/c03nik6/
     """
 
-    def __init__(self, games: list, hero: str, deck: str, min_sample_size=0):
+    def __init__(self, games: list, hero: str, deck: str, min_sample_size=0, backend='python', aggregates=None):
         """Create a new hero given a list of games, a hero and an optional deck name.
             Games only count if they are ranked and some cards were played.
             If a minimum sample size is added, the card related analyses will only show data if there
             are at least that many results in the sample.
+            The backend is either 'python' or 'numpy', numpy computes the accumulators with vectorized
+            batch operations, which is much faster for large game archives.
+            Aggregates that were already computed for this hero's games, e.g. by GameDatabase.aggregates(),
+            can be passed in instead of being computed from the games.
         """
-        self.games = []
         self.hero = hero
         self.deck = deck
         self.min_sample_size = min_sample_size
-        self.wins = 0
-        self.losses = 0
-
-        # Opponent dictionary keyed by opponent hero name, value is a dict of win/loss data.
-        self.opponents = {}
 
-        # Perform initial calculations that get used by multiple analyses.
         # Only look at games where cards were played.
         # TODO: Only look at ranked games. Unfortunately Track-o-bot bugs sometimes and doesn't record ranked games as ranked.
         # TODO: To filter standard vs. wild you have to look at the cards.
-        for game in filter(lambda x: x.hero == hero and x.had_played_cards() and (not deck or (x.deck == deck)), games):
-            self.games.append(game)
-            if game.won():
-                self.wins += 1
-            else:
-                self.losses += 1
-
-            opponent = game.opponent
-            self.opponents[opponent] = self.opponents.get(opponent, {'games': 0, 'wins': 0, 'losses': 0})
-            self.opponents[opponent]['games'] += 1
-            if game.won():
-                self.opponents[opponent]['wins'] += 1
-            else:
-                self.opponents[opponent]['losses'] += 1
+        self.games = list(filter(lambda x: x.hero == hero and x.had_played_cards() and (not deck or (x.deck == deck)), games))
+
+        # All the analyses share one set of accumulators, filled in a single pass over the games.
+        if aggregates is not None:
+            self.aggregates = aggregates
+        elif backend == 'numpy':
+            import vectorized
+            self.aggregates = vectorized.aggregate(self.games)
+        elif backend == 'python':
+            self.aggregates = Aggregates(self.games)
+        else:
+            raise ValueError('Unknown backend: ' + backend)
+
+        self.wins = self.aggregates.wins
+        self.losses = self.aggregates.losses
+
+        # Opponent dictionary keyed by opponent hero name, value is a dict of win/loss data.
+        self.opponents = self.aggregates.opponents
 
         self.game_count = self.wins + self.losses
-        self.win_percentage = (self.wins / self.game_count) * 100
+        self.win_percentage = (self.wins / self.game_count) * 100 if self.game_count else 0
+
+        # The opening index is built the first time it's needed, see opening_index().
+        self._opening_index = None
+
+        # Confidence intervals for the card tables, only computed when asked for, see bootstrap().
+        self.intervals = None
+        self.confidence = None
+
+    def bootstrap(self, replicates=1000, confidence=0.95, seed=0, jobs=None):
+        """Compute bootstrap confidence intervals for the card, card vs. opponent and turn x card win rates,
+            and for how much better or worse each does than the games where it wasn't played.
+            The analyses add the intervals to their tables once computed. Requires numpy, and the games.
+        """
+        import bootstrap
+        self.intervals = bootstrap.bootstrap(self.games, replicates, confidence, seed, jobs)
+        self.confidence = confidence
+
+    def _interval_headers(self):
+        """The extra table headers for the confidence intervals, if there are any."""
+        if self.intervals is None:
+            return []
+        confidence = format(self.confidence * 100, 'g') + '%'
+        return ['win % ' + confidence + ' CI', 'vs. unplayed ' + confidence + ' CI']
+
+    def _interval_columns(self):
+        """The extra table columns for the confidence intervals, if there are any."""
+        if self.intervals is None:
+            return []
+        return ['win percentage interval', 'unplayed delta interval']
+
+    def _interval_cells(self, interval):
+        """The extra table cells for a row's confidence intervals, if there are any."""
+        if self.intervals is None:
+            return []
+        if interval is None:
+            return [None, None]
+        return [Interval(interval['low'], interval['high']), DeltaInterval(interval['delta low'], interval['delta high'])]
 
     def _valid(self):
         """Test whether or not it's valid to perform an analysis for this hero."""
@@ -54,14 +92,15 @@ class Hero(object):
     def analyze_matchups(self):
         """Analyze how this hero fared against all opponents.
             Summarize the deck's winrate as a whole and against each opponent hero encountered.
+            Returns a list of Tables, empty if there are no games to analyze.
         """
 
         if not self._valid():
-            print("Can't analyze " + self.hero)
-            return
+            return []
 
         # All necessary calculations have already been done.
-        # Print the matchup win rates.
+        # Tabulate the matchup win rates.
+        columns = ['opponent', 'games', 'wins', 'losses', 'win percentage']
         headers = ['opponent', 'games', 'wins', 'losses', 'win %']
         table = [['All', self.game_count, self.wins, self.losses, self.win_percentage]]
 
@@ -70,13 +109,42 @@ class Hero(object):
             table.append([opponent, opponent_data['games'], opponent_data['wins'], opponent_data['losses'],
                           (opponent_data['wins'] / opponent_data['games']) * 100])
 
-        print()
-        print('## ' + self.hero + ' Matchup Win Rates')
-        print('Opponents are ordered by frequency, making it easy to see performance against the most common matchups.')
-        print("This data helps answer questions about how well your hero is performing against the meta you're facing ")
-        print("and how well you're performing against the opponents you are targeting.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+        return [Table('matchups', columns, table, headers, self.hero + ' Matchup Win Rates', [
+            'Opponents are ordered by frequency, making it easy to see performance against the most common matchups.',
+            "This data helps answer questions about how well your hero is performing against the meta you're facing ",
+            "and how well you're performing against the opponents you are targeting."])]
+
+    def analyze_players(self):
+        """Analyze how each player on a team fared with this hero, for games tagged with their player by a Team.
+            Summarize each player's win rate as a whole and against their most common opponent.
+            Returns a list of Tables, empty unless the games came from a team.
+        """
+
+        # Player dictionary keyed by player name, value is a dict of win/loss data, with the games against each opponent.
+        players = {}
+        for game in self.games:
+            if game.player is None:
+                continue
+            player_data = players.setdefault(game.player, {'games': 0, 'wins': 0, 'opponents': {}})
+            player_data['games'] += 1
+            player_data['wins'] += game.won()
+            player_data['opponents'][game.opponent] = player_data['opponents'].get(game.opponent, 0) + 1
+
+        if not players:
+            return []
+
+        columns = ['player', 'games', 'wins', 'losses', 'win percentage', 'most common opponent']
+        headers = ['player', 'games', 'wins', 'losses', 'win %', 'most common opponent']
+        table = []
+
+        # Sort players by how many games they played.
+        for player, player_data in sorted(players.items(), key=lambda k_v: k_v[1]['games'], reverse=True):
+            opponent = max(player_data['opponents'].items(), key=lambda k_v: k_v[1])[0]
+            table.append([player, player_data['games'], player_data['wins'], player_data['games'] - player_data['wins'],
+                          (player_data['wins'] / player_data['games']) * 100, opponent])
+
+        return [Table('players', columns, table, headers, self.hero + ' Player Win Rates', [
+            "Players are ordered by how many games they played, the rest of the report combines all the players' games."])]
 
     def analyze_cards(self):
         """Analyze how the cards played by hero fared against all opponents.
@@ -84,49 +152,18 @@ class Hero(object):
             especially if you are playing a deck that can pull in random cards.
             The output uses the hero's min sample size.
             Also performs per opponent analyses for opponents that were at least 10% of your games.
+            Returns a list of Tables, the summary table's rows are generated as they're written.
         """
 
         if not self._valid():
-            return
+            return []
 
         # Card dictionary keyed by card name, value is a dict of win/loss data.
-        cards = {}
-
-        # Calculate the per card win rates against the various opponents.
-        for game in self.games:
-            opponent = game.opponent
-
-            for card_name in game.cards():
-                cards[card_name] = cards.get(card_name, {'games': 0, 'wins': 0, 'losses': 0, 'opponents': {}})
-                cards[card_name]['games'] += 1
-                if game.won():
-                    cards[card_name]['wins'] += 1
-                else:
-                    cards[card_name]['losses'] += 1
+        self.aggregates.calculate_win_rates()
+        cards = self.aggregates.cards
 
-                cards[card_name]['opponents'][opponent] = cards[card_name]['opponents'].get(opponent, {'games': 0, 'wins': 0, 'losses': 0})
-                cards[card_name]['opponents'][opponent]['games'] += 1
-                if game.won():
-                    cards[card_name]['opponents'][opponent]['wins'] += 1
-                else:
-                    cards[card_name]['opponents'][opponent]['losses'] += 1
-
-        # Calculate the various win percentages.
-        for card, card_data in cards.items():
-            card_data['win percentage'] = (card_data['wins'] / card_data['games']) * 100
-            card_data['unplayed wins'] = self.wins - card_data['wins']
-            card_data['unplayed losses'] = self.losses - card_data['losses']
-            unplayed_games = card_data['unplayed wins'] + card_data['unplayed losses']
-            card_data['unplayed percentage'] = 0 if unplayed_games == 0 else (card_data['unplayed wins'] / unplayed_games) * 100
-
-            for opponent, opponent_data in card_data['opponents'].items():
-                opponent_data['win percentage'] = (opponent_data['wins'] / opponent_data['games']) * 100
-                opponent_data['unplayed wins'] = self.opponents[opponent]['wins'] - opponent_data['wins']
-                opponent_data['unplayed losses'] = self.opponents[opponent]['losses'] - opponent_data['losses']
-                unplayed_games = opponent_data['unplayed wins'] + opponent_data['unplayed losses']
-                opponent_data['unplayed percentage'] = 0 if unplayed_games == 0 else (opponent_data['unplayed wins'] / (unplayed_games)) * 100
-            
-        card_headers = ['card vs. All', 'games', 'wins', 'losses', 'win %']
+        card_columns = ['card', 'games', 'wins', 'losses', 'win percentage'] + self._interval_columns()
+        card_headers = ['card vs. All', 'games', 'wins', 'losses', 'win %'] + self._interval_headers()
         card_table = []
         # Sort cards by best win percentage.
         cards_by_win_percent = []
@@ -143,19 +180,16 @@ class Hero(object):
                 card_table.append(['-- deck --', self.game_count, self.wins, self.losses, self.win_percentage])
 
             cards_by_win_percent.append(card)
-            card_table.append([card, card_data['games'], card_data['wins'], card_data['losses'], card_data['win percentage']])
-
+            card_table.append([card, card_data['games'], card_data['wins'], card_data['losses'], card_data['win percentage']] +
+                              self._interval_cells(self.intervals and self.intervals['cards'].get(card)))
 
-        print()
-        print('## Card Win Rates')
-        print("Cards are ordered by win rate. Played % shows the percentage of games where you played the card.")
-        print("Track-o-bot only has data for the cards played, so the unplayed columns are ")
-        print("attempting to help answer questions about how the deck performs when you don't draw that card or it sits in your hand.")
-        print("Note that data is only shown when a card is played on a turn at least " + repr(self.min_sample_size) + " times.")
-        print()
-        print(tabulate(card_table, headers=card_headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+        tables = [Table('cards', card_columns, card_table, card_headers, 'Card Win Rates', [
+            "Cards are ordered by win rate. Played % shows the percentage of games where you played the card.",
+            "Track-o-bot only has data for the cards played, so the unplayed columns are ",
+            "attempting to help answer questions about how the deck performs when you don't draw that card or it sits in your hand.",
+            "Note that data is only shown when a card is played on a turn at least " + repr(self.min_sample_size) + " times."])]
 
-        # Print the card vs. specific opponent analysis.
+        # The card vs. specific opponent analysis.
         # Note that this data really starts to suffer from sparse data.
         # For now, just show data for opponents that showed up in more than 10% of the games.
         for opponent in self.opponents.keys():
@@ -163,7 +197,7 @@ class Hero(object):
             if opponent_game_count < self.game_count * .1:
                 continue
 
-            card_headers = [repr(opponent_game_count) + ' games vs. ' + opponent, 'games', 'wins', 'losses', 'win %']
+            card_headers = [repr(opponent_game_count) + ' games vs. ' + opponent, 'games', 'wins', 'losses', 'win %'] + self._interval_headers()
             card_table = []
             for card in cards_by_win_percent:
                 # Not every card will have been played against every opponent.
@@ -172,20 +206,29 @@ class Hero(object):
                 card_opponent_data = cards[card]['opponents'][opponent]
                 if card_opponent_data is None:
                     continue
-                card_table.append([card, card_opponent_data['games'], card_opponent_data['wins'], card_opponent_data['losses'], card_opponent_data['win percentage']])
+                card_interval = self.intervals and self.intervals['cards'].get(card, {}).get('opponents', {}).get(opponent)
+                card_table.append([card, card_opponent_data['games'], card_opponent_data['wins'], card_opponent_data['losses'], card_opponent_data['win percentage']] +
+                                  self._interval_cells(card_interval))
 
-            print()
-            print(tabulate(card_table, headers=card_headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+            tables.append(Table('cards vs. ' + opponent, card_columns, card_table, card_headers))
 
-        # Print a win rate summary of all cards against all opponents.
+        # A win rate summary of all cards against all opponents.
         # Generate the headers, ordered by opponent frequency.
-        headers = ['Card', 'All (' + repr(self.game_count) + ')']
-        opponents_by_frequency = []
-        for opponent, opponent_data in sorted(self.opponents.items(), key=lambda k_v: k_v[1]['games'], reverse=True):
-            opponents_by_frequency.append(opponent)
-            headers.append(opponent + ' (' + repr(self.opponents[opponent]['games']) + ')')
-
-        table = []
+        opponents_by_frequency = [opponent for opponent, opponent_data
+                                  in sorted(self.opponents.items(), key=lambda k_v: k_v[1]['games'], reverse=True)]
+        columns = ['card', 'All'] + opponents_by_frequency
+        headers = ['Card', 'All (' + repr(self.game_count) + ')'] + [opponent + ' (' + repr(self.opponents[opponent]['games']) + ')'
+                                                                     for opponent in opponents_by_frequency]
+
+        tables.append(Table('card summary', columns, self._card_summary_rows(cards_by_win_percent, opponents_by_frequency), headers,
+                            'Card Win Rate Summary', [
+            'Summarize the win rates of the cards against all opponents.',
+            "Cards are ordered by their overall win rate, opponents are ordered by frequency and show the game count in parentheses."]))
+        return tables
+
+    def _card_summary_rows(self, cards_by_win_percent: list, opponents_by_frequency: list):
+        """Generate the rows of the card vs. every opponent win rate summary."""
+        cards = self.aggregates.cards
         deck_percentage_inserted = False
 
         for card in cards_by_win_percent:
@@ -199,7 +242,7 @@ class Hero(object):
                         deck_row.append(None)
                     else:
                         deck_row.append((self.opponents[opponent]['wins'] / self.opponents[opponent]['games']) * 100)
-                table.append(deck_row)
+                yield deck_row
 
             card_row = [card, cards[card]['win percentage']]
 
@@ -209,93 +252,105 @@ class Hero(object):
                     card_row.append(None)
                 else:
                     card_row.append(cards[card]['opponents'][opponent]['win percentage'])
-            table.append(card_row)
+            yield card_row
+
+    def opening_index(self, depth=2):
+        """Return an OpeningIndex of this hero's openings, at least depth turns deep.
+            The index is built from the games the first time it's needed, then reused by later queries.
+        """
+        if self._opening_index is None or self._opening_index.depth < depth:
+            self._opening_index = OpeningIndex(self.games, depth)
+        return self._opening_index
 
-        print()
-        print('## Card Win Rate Summary')
-        print('Summarize the win rates of the cards against all opponents.')
-        print("Cards are ordered by their overall win rate, opponents are ordered by frequency and show the game count in parentheses.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+    def opening_win_rate(self, *turns):
+        """Return the win/loss data for the games that opened with the given plays, see OpeningIndex.query.
+            Needs the games, openings can't be queried from aggregates passed in.
+        """
+        return self.opening_index(max(len(turns), 2)).query(*turns)
 
-    def analyze_openings(self):
-        """Analyze how the various first 2 turn openings fared.
+    def analyze_openings(self, depth=2):
+        """Analyze how the various openings, the plays for the first depth turns, fared.
             Summarize the various opening win rates, ordered by the plays rather than win rates.
+            The output uses the hero's min sample size. Returns a list of Tables.
         """
 
         if not self._valid():
-            return
-
-        # Openings dictionary keyed by a turn 1-3 tuple of the cards played on those turn, value is a dict of win/loss data.
-        openings = {}
-
-        # Calculate the winrates of various openings.
-        for game in self.games:
-            opening = game.opening()
-            openings[opening] = openings.get(opening, {'games': 0, 'wins': 0, 'losses': 0})
-            openings[opening]['games'] += 1
-            if game.won():
-                openings[opening]['wins'] += 1
-            else:
-                openings[opening]['losses'] += 1
-
-        for opening_data in openings.values():
-            opening_data['win percentage'] = (opening_data['wins'] / opening_data['games']) * 100
-
-        # Print the analysis of the openings.
-        headers = ['turn 1', 'turn 2', 'games', 'wins', 'losses', 'win %']
+            return []
+
+        # Openings keyed by a tuple of the cards played on each turn, value is a dict of win/loss data.
+        # The 2 turn openings are already counted in the aggregates, deeper openings need the games.
+        if depth == 2 and not self.games:
+            openings = self.aggregates.openings
+            for opening_data in openings.values():
+                opening_data['win percentage'] = (opening_data['wins'] / opening_data['games']) * 100
+        elif self.games:
+            openings = dict(self.opening_index(depth).openings(depth))
+        else:
+            raise ValueError("Can't analyze " + repr(depth) + ' turn openings without the games.')
+
+        # Tabulate the openings.
+        columns = ['turn ' + repr(turn) for turn in range(1, depth + 1)] + ['games', 'wins', 'losses', 'win percentage']
+        headers = ['turn ' + repr(turn) for turn in range(1, depth + 1)] + ['games', 'wins', 'losses', 'win %']
         table = []
 
         # Sort openings by the turn 1, 2, 3 plays.
-        for opening, opening_data in sorted(openings.items(), key=lambda k_v: (sorted(k_v[0][0]), sorted(k_v[0][1]))):
-            table.append([sorted(opening[0]), sorted(opening[1]),
-                          opening_data['games'], opening_data['wins'], opening_data['losses'], opening_data['win percentage']])
-
-        print()
-        print('## Opening Sequence Win Rates')
-        print("Openings are your plays for the first 2 turns.")
-        print("This data attempts to help answer questions about what cards you should mulligan for and which play sequences are strongest.")
-        print("Unfortunately, this data is usually quite sparse.")
-        print()
-        print('Found ' + repr(len(openings)) + ' different openings in ' + repr(self.game_count) + ' games:')
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+        for opening, opening_data in sorted(openings.items(), key=lambda k_v: [sorted(cards) for cards in k_v[0]]):
+            # Ignore small samples.
+            if opening_data['games'] < self.min_sample_size:
+                continue
+            table.append([sorted(cards) for cards in opening] +
+                         [opening_data['games'], opening_data['wins'], opening_data['losses'], opening_data['win percentage']])
+
+        return [Table('openings', columns, table, headers, 'Opening Sequence Win Rates', [
+            "Openings are your plays for the first " + repr(depth) + " turns.",
+            "This data attempts to help answer questions about what cards you should mulligan for and which play sequences are strongest.",
+            "Unfortunately, this data is usually quite sparse.",
+            '',
+            'Found ' + repr(len(openings)) + ' different openings in ' + repr(self.game_count) + ' games:'],
+            types=dict(('turn ' + repr(turn), 'strings') for turn in range(1, depth + 1)))]
+
+    def analyze_synergies(self, limit=10, max_size=3):
+        """Analyze which sets of cards, pairs up to max size, win more when played in the same game than their cards do on their own.
+            Shows the limit sets with the highest synergy for each size, the difference between the set's win rate
+            and the best win rate of the sets one card smaller. Sets played together fewer than the hero's min sample size
+            times are ignored. Returns a list of Tables. Needs the games, synergies can't be found from aggregates passed in.
+        """
+
+        if not self._valid():
+            return []
+        if not self.games:
+            raise ValueError("Can't analyze synergies without the games.")
+
+        kinds = {2: 'pair', 3: 'triple'}
+        tables = []
+        for size, card_sets in synergies(self.games, max(self.min_sample_size, 1), max_size).items():
+            kind = kinds.get(size, repr(size) + ' card set')
+            columns = ['cards', 'games', 'wins', 'losses', 'win percentage', 'best subset win percentage', 'synergy']
+            headers = ['cards', 'games', 'wins', 'losses', 'win %', 'best ' + ('card' if size == 2 else kinds.get(size - 1, 'subset')) + ' win %',
+                       'synergy']
+            table = [[data[column] for column in columns] for data in card_sets[:limit]]
+            tables.append(Table('card ' + kind + 's', columns, table, headers, 'Card ' + kind.capitalize() + ' Synergies', [
+                'The card ' + kind + 's whose games won the most compared to the best of their cards on their own, '
+                + 'out of ' + repr(len(card_sets)) + ' played together in at least ' + repr(max(self.min_sample_size, 1)) + ' games.',
+                'Synergy is how many points higher the win rate was when all the cards were played.']))
+        return tables
 
     def analyze_cards_by_turn(self):
         """Analyze the win rates for the cards played on specific turns.
             This also suffers from sparse data and uses the hero's min sample size.
+            Returns a list of Tables, ordered by turn then by card.
         """
 
         if not self._valid():
-            return
+            return []
 
         # Turns dictionary keyed by the turn number e.g. 1, 2, 3.
-        turns = {}
-
-        # Calculate the win rates of cards played on specific turns.
-        for game in self.games:
-            last_turn = game.last_turn()
-            if not last_turn:
-                continue
-
-            for turn in range(1, last_turn):
-                cards = game.cards_on_turn(turn) or {'pass'}
-                turns[turn] = turns.get(turn, {'cards': {}})
-
-                for card in cards:
-                    turns[turn]['cards'][card] = turns[turn]['cards'].get(card, {'games': 0, 'wins': 0, 'losses': 0})
-                    turns[turn]['cards'][card]['games'] += 1
-                    if game.won():
-                        turns[turn]['cards'][card]['wins'] += 1
-                    else:
-                        turns[turn]['cards'][card]['losses'] += 1
+        self.aggregates.calculate_win_rates()
+        turns = self.aggregates.turns
 
-        for turn, turn_data in turns.items():
-            for card_data in turn_data['cards'].values():
-                card_data['win percentage'] = (card_data['wins'] / card_data['games']) * 100
-
-        # Print the analysis of the turns and cards played.
-        headers = ['turn', 'play', 'games', 'wins', 'losses', 'win %']
+        # Tabulate the turns and cards played.
+        columns = ['turn', 'play', 'games', 'wins', 'losses', 'win percentage'] + self._interval_columns()
+        headers = ['turn', 'play', 'games', 'wins', 'losses', 'win %'] + self._interval_headers()
         table = []
 
         # A dictionary keyed by card name, holding the lists of turn data so we can do a view grouping the cards.
@@ -307,76 +362,48 @@ class Hero(object):
                 # Ignore small samples.
                 if card_data['games'] < self.min_sample_size:
                     continue
-                table.append([turn, card, card_data['games'], card_data['wins'], card_data['losses'], card_data['win percentage']])
+                row = ([turn, card, card_data['games'], card_data['wins'], card_data['losses'], card_data['win percentage']] +
+                       self._interval_cells(self.intervals and self.intervals['turns'].get(turn, {}).get(card)))
+                table.append(row)
 
                 # Seed the table data for the card based view.
                 card_view[card] = card_view.get(card, [])
-                card_view[card].append([turn, card, card_data['games'], card_data['wins'], card_data['losses'], card_data['win percentage']])
+                card_view[card].append(row)
 
-        print()
-        print('## Win Rates When Playing Cards on Specific Turns')
-        print("Note that data is only shown when a card is played on a turn at least " + repr(self.min_sample_size) + " times.")
-        print("This data attempts to help answer questions about what cards you should mulligan for and which plays are strongest.")
-        print("Furthermore, it can help validate whether your playstyle and plan for the deck is working.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+        tables = [Table('cards by turn', columns, table, headers, 'Win Rates When Playing Cards on Specific Turns', [
+            "Note that data is only shown when a card is played on a turn at least " + repr(self.min_sample_size) + " times.",
+            "This data attempts to help answer questions about what cards you should mulligan for and which plays are strongest.",
+            "Furthermore, it can help validate whether your playstyle and plan for the deck is working."])]
 
         table = []
 
         for card in sorted(card_view):
             for table_row in card_view[card]:
                 table.append(table_row)
-                
-        print()
-        print('## Win Rates When Playing Cards on Specific Turns')
-        print("Same data ordered by cards instead of turns.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe'))
+
+        tables.append(Table('turns by card', columns, table, headers, 'Win Rates When Playing Cards on Specific Turns', [
+            "Same data ordered by cards instead of turns."]))
+        return tables
 
     def analyze_mana(self):
         """Analyze the win rates for mana differential between what the hero spent and what
             the opponent spent each game. A negative differential means the opponent spent more mana.
+            Returns a list of Tables.
         """
 
         if not self._valid():
-            return
+            return []
 
         # mana differential dictionary keyed by differential buckets.
-        mana_differentials = {}
-
-        # Provide a description of the 5 differential buckets.
-        keys = ['big disadvantage:          -8+',
-                'slight disadvantage: -7 to -3',
-                'about even:          -2 to  2',
-                'slight advantage:     3 to  7',
-                'big advantage:              8+']
+        mana_differentials = self.aggregates.mana_differentials
 
-        # Calculate the win rates for the mana differentials.
-        for game in self.games:
-            mana_differential = game.mana_differential()
-            key = keys[4]
-            if mana_differential < -7:
-                key = keys[0]
-            elif mana_differential < -2:
-                key = keys[1]
-            elif mana_differential < 2:
-                key = keys[2]
-            elif mana_differential < 8:
-                key = keys[3]
-
-            mana_differentials[key] = mana_differentials.get(key, {'games': 0, 'wins': 0, 'losses': 0})
-            mana_differentials[key]['games'] += 1
-            if game.won():
-                mana_differentials[key]['wins'] += 1
-            else:
-                mana_differentials[key]['losses'] += 1
-
-        # Print the analysis.
+        # Tabulate the analysis.
+        columns = ['mana differential', 'games', 'games percentage', 'wins', 'losses', 'win percentage']
         headers = ['mana differential', 'games', 'games %', 'wins', 'losses', 'win %']
         table = []
 
         # The differential bucket list is in display order.
-        for key in keys:
+        for key in MANA_DIFFERENTIAL_KEYS:
             if key not in mana_differentials:
                 continue
 
@@ -384,38 +411,71 @@ class Hero(object):
                           mana_differentials[key]['wins'], mana_differentials[key]['losses'],
                           (mana_differentials[key]['wins'] / mana_differentials[key]['games']) * 100])
 
-        print()
-        print('## Mana Differential Win Rates')
-        print("This is the difference in mana spent between you and your opponent.")
-        print("Game % shows the percentage of games where this mana differential occurred.")
-        print("Note that the game winner will usually take the last turn, which probably helps pad the mana spent in their favor.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt="pipe"))
+        return [Table('mana differentials', columns, table, headers, 'Mana Differential Win Rates', [
+            "This is the difference in mana spent between you and your opponent.",
+            "Game % shows the percentage of games where this mana differential occurred.",
+            "Note that the game winner will usually take the last turn, which probably helps pad the mana spent in their favor."])]
+
+    def analyze_tempo(self, max_turn=10):
+        """Analyze the win rates for the mana gap after each of the first max_turn turns, how much more mana the hero
+            had spent so far than the opponent, and for the hero's curve efficiency, how much of the mana they had
+            they spent. Gaps seen fewer than the min sample size times on a turn are left out.
+            Returns a list of Tables. Requires numpy, and the games.
+        """
+
+        if not self._valid():
+            return []
+        if not self.games:
+            raise ValueError("Can't analyze tempo without the games.")
+
+        import tempo
+        games_tempo = tempo.Tempo(self.games, max_turn)
+
+        games, wins, turn_games, win_gaps, loss_gaps = (x.tolist() for x in games_tempo.mana_gaps())
+        columns = ['turn', 'games', 'average win gap', 'average loss gap'] + tempo.MANA_GAP_KEYS
+        headers = ['turn', 'games', 'avg gap in wins', 'avg gap in losses'] + tempo.MANA_GAP_KEYS
+        table = []
+        for turn in range(1, max_turn + 1):
+            if not turn_games[turn]:
+                break
+            row = [turn, turn_games[turn], win_gaps[turn], loss_gaps[turn]]
+            for bucket_games, bucket_wins in zip(games[turn], wins[turn]):
+                row.append((bucket_wins / bucket_games) * 100 if bucket_games and bucket_games >= self.min_sample_size else None)
+            table.append(row)
+        tables = [Table('mana gaps', columns, table, headers, 'Mana Gap Win Rates by Turn', [
+            "The mana gap is how much more mana you had spent than your opponent by the end of a turn, "
+            + "negative when they had spent more.",
+            "Each gap column is the win % of the games with that gap after the turn, games only count on the turns they reached.",
+            "Note that data is only shown when a gap is seen on a turn at least " + repr(self.min_sample_size) + " times."])]
+
+        games, wins = (x.tolist() for x in games_tempo.curve_efficiency())
+        played = sum(games)
+        columns = ['curve efficiency', 'games', 'games percentage', 'wins', 'losses', 'win percentage']
+        headers = ['curve efficiency', 'games', 'games %', 'wins', 'losses', 'win %']
+        table = [[key, bucket_games, (bucket_games / played) * 100, bucket_wins, bucket_games - bucket_wins,
+                  (bucket_wins / bucket_games) * 100]
+                 for key, bucket_games, bucket_wins in zip(tempo.CURVE_EFFICIENCY_KEYS, games, wins) if bucket_games]
+        tables.append(Table('curve efficiency', columns, table, headers, 'Curve Efficiency Win Rates', [
+            "Curve efficiency is the mana you spent as a percentage of the mana crystals you had, up to your last turn.",
+            "Game % shows the percentage of games with that efficiency.",
+            "Note that the coin and other mana effects aren't counted, so efficiency can go over 100%."]))
+        return tables
 
     def analyze_games_by_rank(self):
         """Analyze the win rates for the deck at the different levels of ranked ladder play.
+            Returns a list of Tables.
             TODO: Validate how legend games show up.
             TODO: Make it possible to ignore games above certain ranks.
         """
 
         if not self._valid():
-            return
+            return []
 
         # Ranks dictionary keyed by ladder rank.
-        ranks = {}
-
-        # Calculate the win rates for the various ranks.
-        for game in self.games:
-            rank = game.rank
-
-            ranks[rank] = ranks.get(rank, {'games': 0, 'wins': 0, 'losses': 0})
-            ranks[rank]['games'] += 1
-            if game.won():
-                ranks[rank]['wins'] += 1
-            else:
-                ranks[rank]['losses'] += 1
+        ranks = self.aggregates.ranks
 
-        # Print the analysis.
+        # Tabulate the analysis.
+        columns = ['ladder rank', 'games', 'wins', 'losses', 'win percentage']
         headers = ['ladder rank', 'games', 'wins', 'losses', 'win %']
         table = []
 
@@ -424,9 +484,6 @@ class Hero(object):
             table.append([rank, rank_data['games'], rank_data['wins'], rank_data['losses'],
                           (rank_data['wins'] / rank_data['games']) * 100])
 
-        print()
-        print('## Ladder Rank Win Rates')
-        print("This shows how the hero performed at the different ladder ranks.")
-        print("This should help you gauge whether or not games at easier ranks are affecting the stats.")
-        print()
-        print(tabulate(table, headers=headers, floatfmt=FLOAT_FORMAT, tablefmt="pipe"))
+        return [Table('ranks', columns, table, headers, 'Ladder Rank Win Rates', [
+            "This shows how the hero performed at the different ladder ranks.",
+            "This should help you gauge whether or not games at easier ranks are affecting the stats."])]
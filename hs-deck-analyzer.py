@@ -1,9 +1,16 @@
 import argparse
-import json
+import datetime
+import os
+import tracemalloc
 
-from game import Game
-from hero import Hero
-from trackobot import Trackobot
+from aggregates import Aggregates, DailyAggregates
+from archive import Archive, load_games
+from openings import ANY, Including
+from store import GameStore, is_packed
+from timings import Timings
+
+# The modules with heavy dependencies, requests for fetching, tabulate and numpy for the analyses and sqlite3 for the database,
+# are imported on the code paths that use them, so quick runs like a summary of a file don't pay for them.
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-u', '--username', type=str,
@@ -11,66 +18,501 @@ parser.add_argument('-u', '--username', type=str,
 parser.add_argument('-t', '--token', type=str,
                     help='Your track-o-bot API token')
 parser.add_argument('-i', '--infile', type=str,
-                    help='The name of a file containing json data for the games you want to analyze. '
+                    help='The name of a file containing json data for the games you want to analyze, either a json array '
+                    + 'of games or an archive with one game per line, or a packed file written with --pack. '
                     + 'If a file is specified, it will be used instead of fetching data.')
 parser.add_argument('-o', '--outfile', type=str, default='trackobot_games.json',
                     help='The name of a file to store the json data for the games fetched from track-o-bot. '
                     + 'When run in fetch mode, always writes the data fetched.')
+parser.add_argument('-a', '--archive', type=str,
+                    help='The name of a file to keep all your games in, beyond the 10 days track-o-bot keeps. '
+                    + 'When run in fetch mode, only the games newer than the archive are fetched and appended to it. '
+                    + 'All the games in the archive are analyzed.')
+parser.add_argument('--database', type=str,
+                    help='The name of a SQLite database file to index your games in. Any games loaded or fetched are added to it, '
+                    + 'then only the games being analyzed are read back out of it. Can be used on its own once it has games.')
 parser.add_argument('-c', '--hero', type=str,
                     help='The hero class you want to analyze, e.g. Mage. If not specified all games will be analyzed with a simple summary.')
 parser.add_argument('-k', '--deck', type=str,
                     help='The deck name you want to analyze, e.g. Other. If not specified all decks will be analyzed with a simple summary.')
+parser.add_argument('--only-hero', action='store_true',
+                    help='Only load the games for the --hero and --deck being analyzed, skipping the other games while reading them. '
+                    + 'The overall W/L summary then only covers those games.')
+parser.add_argument('--since', type=str,
+                    help='Only analyze games added on or after this date, e.g. 2017-11-20.')
+parser.add_argument('--until', type=str,
+                    help='Only analyze games added before this date, e.g. 2017-11-27.')
+parser.add_argument('--openings', type=int,
+                    help='Add the win rates of the --hero\'s openings, the cards played on each of the first N turns, to the report.')
+parser.add_argument('--opening', type=str, nargs='+',
+                    help='Print the win rate for the --hero\'s games that opened with these plays, one argument per turn '
+                    + 'starting with turn 1. Separate the cards played on a turn with commas, use - for a turn where nothing '
+                    + 'was played, * for any plays, and end the cards with ,* to also match turns where other cards were played, '
+                    + 'e.g. --opening - "Frostbolt,*"')
+parser.add_argument('--bootstrap', type=int,
+                    help='Add bootstrap confidence intervals to the card tables, resampling the --hero\'s games this many times, '
+                    + 'e.g. 1000. Shows the interval for each win rate, and for how much better or worse it is than the games where '
+                    + 'the card wasn\'t played. Requires numpy.')
+parser.add_argument('--confidence', type=float, default=0.95,
+                    help='The confidence level of the --bootstrap intervals.')
+parser.add_argument('--all-heroes', action='store_true',
+                    help='Write a report for every hero class found in the games, one file per hero in the --report-dir.')
+parser.add_argument('--all-decks', action='store_true',
+                    help='Write a report for every hero and deck found in the games, one file per deck in the --report-dir.')
+parser.add_argument('--report-dir', type=str, default='reports',
+                    help='The directory to write the --all-heroes or --all-decks reports to.')
+parser.add_argument('--synergies', type=int,
+                    help='Add the card pairs and triples with the most synergy, the ones that won the most more when played in the same game '
+                    + 'than on their own, to the --hero report. Shows this many of each. Uses the --sample-size.')
+parser.add_argument('--tempo', action='store_true',
+                    help='Add the tempo analysis to the --hero report, the win rates for how far ahead or behind on mana spent '
+                    + 'you were after each turn, and for how much of your mana you used. Requires numpy.')
+parser.add_argument('--trend', choices=['day', 'week', 'patch'],
+                    help='Add trends to the --hero report, showing how the matchup and card win rates moved from day to day, '
+                    + 'week to week or patch to patch.')
+parser.add_argument('--trend-window', type=int, default=1,
+                    help='The number of days, weeks or patches each --trend window covers. The windows slide one at a time, '
+                    + 'e.g. 4 with weeks shows a rolling 4 week win rate for every week.')
+parser.add_argument('--patches', type=str,
+                    help='A json file listing the patches for --trend patch: [{"patch": "10.0", "date": "2017-12-07"}, ...].')
+parser.add_argument('--format', choices=['markdown', 'jsonl', 'csv', 'parquet'], default='markdown',
+                    help='The report format. Markdown is preformatted for reddit, the others are for other programs to read: '
+                    + 'jsonl writes a json object per table row, csv and parquet write a directory with a file per table. '
+                    + 'Parquet requires pyarrow.')
+parser.add_argument('--report-file', type=str,
+                    help='Write the --hero report to this file, or directory for csv and parquet, instead of printing it. '
+                    + 'Required for formats other than markdown.')
+parser.add_argument('-j', '--jobs', type=int,
+                    help='The number of processes used to run the --all-heroes or --all-decks reports, or threads used to run '
+                    + 'the --bootstrap. Defaults to the number of CPUs.')
 parser.add_argument('-s', '--sample-size', type=int, default=0,
                     help='The minimum sample size to require when displaying results for card related analyses. ' +
                     'If not specified all data will be shown.')
 parser.add_argument('-d', '--days', type=int, default=10,
                     help='The maximum number of days worth of data to fetch. Will not fetch more than 10 days.')
+parser.add_argument('-w', '--workers', type=int, default=4,
+                    help='The number of track-o-bot history pages to fetch concurrently.')
+parser.add_argument('--checkpoint-dir', type=str,
+                    help='A directory to save fetched track-o-bot history pages in, so an interrupted fetch resumes where it left off.')
+parser.add_argument('--rate-limit', type=float,
+                    help='The most track-o-bot requests to send per second for each account, e.g. 2. Unlimited if not specified.')
+parser.add_argument('--history-url', type=str,
+                    help='The track-o-bot history url to fetch games from, e.g. a local stub for testing. Defaults to track-o-bot\'s.')
+parser.add_argument('--team', type=str,
+                    help='A json roster of the players on a team: [{"player": name, "username": username, "token": token}, ...]. '
+                    + 'Every account is synced at the same time into its own archive in the --team-dir, then all the players\' '
+                    + 'games are analyzed together, with a win rate breakdown by player. Players without a token are only read.')
+parser.add_argument('--team-dir', type=str, default='team',
+                    help='The directory to keep the --team players\' archives in.')
+parser.add_argument('--player', type=str,
+                    help='With --team, only analyze the games of this player.')
+parser.add_argument('--compact', action='store_true',
+                    help='Load the games into a compact columnar store. Uses much less memory for large game archives.')
+parser.add_argument('--pack', type=str,
+                    help='Save the games loaded to a compact binary file. Later runs can use it as the --infile, '
+                    + 'it opens near-instantly however many games it holds, and only the games analyzed are read.')
+parser.add_argument('--backend', choices=['python', 'numpy', 'sqlite'], default='python',
+                    help='How to compute the hero analyses. The numpy backend is much faster for large game archives, '
+                    + 'it requires numpy to be installed. Works best combined with --compact. '
+                    + 'The sqlite backend computes them in the --database without loading any games.')
+parser.add_argument('--cache-dir', type=str,
+                    help='A directory to cache the hero analysis results in. Re-running the same analysis on unchanged input, '
+                    + 'e.g. with a different --sample-size, reuses the cached results instead of reloading and recomputing them.')
+parser.add_argument('--cache-size', type=int, default=256,
+                    help='The maximum size of the --cache-dir in MB. The least recently used results are evicted first.')
+parser.add_argument('--feature-cache', type=str,
+                    help='A file to keep each game\'s features in, e.g. the cards played each turn and the mana spent, '
+                    + 'usually next to the archive. They\'re computed from the card histories once, later runs read them back.')
+parser.add_argument('--state', type=str,
+                    help='A file to keep the --hero analysis in between runs. Only the games newer than the state are analyzed '
+                    + 'and folded into it, so regular reports on a growing archive only cost the new games.')
+parser.add_argument('--last-days', type=int,
+                    help='With --state, only report on the games from the last N days before the newest game, '
+                    + 'older days are dropped from the state.')
+parser.add_argument('--watch', type=float,
+                    help='Keep the --hero report up to date, checking for new games every this many seconds. '
+                    + 'Syncs from track-o-bot into the --archive or the --team archives, or just reads the games added to '
+                    + 'the --infile or --archive. Waits longer between checks while no games are coming in.')
+parser.add_argument('-v', '--verbose', action='store_true',
+                    help='Print every game as it is loaded.')
+parser.add_argument('--timings', type=str,
+                    help='Write a json timing report to this file, with the wall time and call count of each stage of the run, '
+                    + 'e.g. loading, aggregating, each analysis and rendering the tables.')
+parser.add_argument('--profile', type=str,
+                    help='Profile the run with cProfile and write the stats to this file. '
+                    + 'The slowest functions are also added to the --timings report.')
+parser.add_argument('--trace-memory', type=str,
+                    help='Trace memory allocations with tracemalloc and write a snapshot to this file. '
+                    + 'The memory allocated by each stage is also added to the --timings report. Slows the run down a lot.')
 
 args = parser.parse_args()
 
-# Get the game data to analyze.
-games = []
 
-if args.infile:
-    with open(args.infile) as game_data:    
-        for g in json.load(game_data):
-            games.append(Game(g))
-            print(games[-1])
+# Instrument the run if asked to. The stages are always marked, they cost nothing when the timings are off.
+timings = Timings(bool(args.timings or args.trace_memory), bool(args.trace_memory))
+profiler = None
+if args.profile:
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+
+def echo(games):
+    """Print every game as it goes by."""
+    for game in games:
+        print(game)
+        yield game
+
+
+def trackobot_client():
+    """Create the track-o-bot client for fetching games."""
+    from trackobot import HISTORY_URL, Trackobot
+    return Trackobot(args.username, args.token, args.days, args.history_url or HISTORY_URL, workers=args.workers,
+                     checkpoint_dir=args.checkpoint_dir, rate_limit=args.rate_limit)
+
+
+def opening_turn(turn: str):
+    """Convert an --opening turn argument to an OpeningIndex query turn."""
+    if turn == '*':
+        return ANY
+    cards = [card.strip() for card in turn.split(',')] if turn != '-' else []
+    if cards and cards[-1] == '*':
+        return Including(cards[:-1])
+    return frozenset(cards)
+
+
+def sync_team():
+    """Sync the --team players' archives from track-o-bot, reporting the players that failed."""
+    for player, result in team.sync().items():
+        if isinstance(result, Exception):
+            print('Failed to sync ' + player + ': ' + str(result))
+
+
+# Filters applied to the games while they're being read.
+filters = {'since': args.since, 'until': args.until}
+if args.only_hero:
+    filters.update(hero=args.hero, deck=args.deck)
+
+# Get the game data to analyze. Files are streamed a game at a time rather than loaded whole.
+fetched_games = None
+packed = None
+if args.team:
+    from team import Team, load_roster
+    if args.infile or args.archive or args.username:
+        parser.error('--team can\'t be used with --infile, --archive or a --username, the players are in the roster.')
+    team = Team(load_roster(args.team), args.team_dir, args.days, args.rate_limit)
+    if args.history_url:
+        team.history_url = args.history_url
+    if args.player and args.player not in [player.name for player in team.players]:
+        parser.error(args.player + ' isn\'t on the ' + args.team + ' roster.')
+    accounts = [player for player in team.players if player.username and player.token]
+    if accounts:
+        print('Syncing game data from Track-o-bot for ' + repr(len(accounts)) + ' players to ' + args.team_dir)
+    with timings.stage('fetch'):
+        sync_team()
+    loaded_games = team.games(args.player, **filters)
+elif args.infile and is_packed(args.infile):
+    # Packed files are memory mapped rather than read, see GameStore.open.
+    packed = GameStore.open(args.infile)
+    loaded_games = filter(lambda x: x.matches(**filters), packed)
+elif args.infile:
+    loaded_games = load_games(args.infile, **filters)
+elif args.archive:
+    if args.username and args.token:
+        print('Syncing game data from Track-o-bot for ' + args.username + ' to ' + args.archive)
+        trackobot = trackobot_client()
+        with timings.stage('fetch'):
+            trackobot.sync(Archive(args.archive))
+    loaded_games = Archive(args.archive).games(**filters)
 elif args.username and args.token:
     print('Fetching game data from Track-o-bot for ' + args.username)
-    trackobot = Trackobot(args.username, args.token, args.days)
-    games = trackobot.get_game_history(args.outfile)
+    trackobot = trackobot_client()
+    with timings.stage('fetch'):
+        fetched_games = trackobot.get_game_history(args.outfile)
+    loaded_games = filter(lambda x: x.matches(**filters), fetched_games)
+elif args.database:
+    loaded_games = []
 else:
     parser.print_help()
-    parser.error('You must specify either your username and token or an input file.')
+    parser.error('You must specify either your username and token, an archive, an input file or a database.')
+
+if args.backend == 'sqlite' and not args.database:
+    parser.error('The sqlite backend requires a --database.')
+if args.backend == 'sqlite' and (args.all_heroes or args.all_decks):
+    parser.error("The sqlite backend can't be used with --all-heroes or --all-decks.")
+if args.state and (not args.hero or args.all_heroes or args.all_decks):
+    parser.error('--state requires a --hero, and can\'t be used with --all-heroes or --all-decks.')
+if args.last_days and not args.state:
+    parser.error('--last-days requires a --state.')
+if packed is not None and args.state:
+    parser.error('A packed --infile can\'t be used with --state.')
+if args.pack and args.state:
+    parser.error('--pack can\'t be used with --state.')
+if (args.opening or args.openings not in (None, 2)) and (args.state or args.backend == 'sqlite'):
+    parser.error('--opening and --openings other than 2 need the games, they can\'t be used with --state or the sqlite backend.')
+if args.format != 'markdown' and args.hero and not (args.report_file or args.all_heroes or args.all_decks):
+    parser.error('--format ' + args.format + ' requires a --report-file.')
+if args.team and (args.compact or args.pack):
+    parser.error('--team games are tagged with their player, which --compact and --pack don\'t keep.')
+if args.player and not args.team:
+    parser.error('--player requires a --team.')
+if args.trend and (not args.hero or args.all_heroes or args.all_decks or args.backend == 'sqlite'):
+    parser.error('--trend requires a --hero, and can\'t be used with --all-heroes, --all-decks or the sqlite backend.')
+if args.synergies and (args.state or args.backend == 'sqlite'):
+    parser.error('--synergies needs the games, it can\'t be used with --state or the sqlite backend.')
+if args.tempo and (args.state or args.backend == 'sqlite'):
+    parser.error('--tempo needs the games, it can\'t be used with --state or the sqlite backend.')
+if args.trend == 'patch' and not args.patches:
+    parser.error('--trend patch requires a --patches file.')
+if args.trend_window < 1:
+    parser.error('--trend-window must be at least 1.')
+if args.bootstrap and (args.state or args.backend == 'sqlite'):
+    parser.error('--bootstrap needs the games, it can\'t be used with --state or the sqlite backend.')
+if args.feature_cache and (args.compact or args.pack or packed is not None or args.backend == 'sqlite'):
+    parser.error('--feature-cache can\'t be used with --compact, --pack, a packed --infile or the sqlite backend.')
+
+feature_cache = None
+if args.feature_cache:
+    from features import FeatureCache
+    with timings.stage('load features'):
+        feature_cache = FeatureCache(args.feature_cache)
+
+if args.watch is not None:
+    if not (args.hero and (args.team or args.archive or args.infile)) or args.all_heroes or args.all_decks or packed is not None:
+        parser.error('--watch requires a --hero and games in a --team, --archive or JSON Lines --infile.')
+    if args.infile and args.archive:
+        parser.error('--watch tails either an --infile or the --archive track-o-bot games are synced into, not both.')
+    if args.state or args.database or args.compact or args.pack or args.cache_dir or args.feature_cache or args.backend != 'python':
+        parser.error('--watch keeps its analysis in memory, it can\'t be used with --state, --database, --compact, --pack, '
+                     + '--cache-dir, --feature-cache or another backend.')
+    if args.bootstrap or args.synergies or args.tempo or args.trend or args.opening or args.openings not in (None, 2):
+        parser.error('--watch only keeps the standard report up to date, it can\'t be used with the analyses that need the games, '
+                     + '--bootstrap, --synergies, --tempo, --trend, --opening and --openings other than 2.')
+    if args.watch <= 0:
+        parser.error('--watch must be a positive number of seconds.')
 
+    # Watching replaces the usual run, the games are folded in as they're read rather than loaded first.
+    from hero import Hero
+    from report import print_report, save_report
+    from watch import ArchiveTail, Watcher
+    if args.team:
+        tails = [ArchiveTail(team.archive(player).path, player.name) for player in team.players
+                 if not args.player or player.name == args.player]
+        sync = sync_team
+    else:
+        tails = [ArchiveTail(args.infile or args.archive)]
+        sync = (lambda: trackobot.sync(Archive(args.archive))) if args.archive and args.username and args.token else None
+    watcher = Watcher(tails, args.hero, args.deck, args.since, args.until, sync, args.watch)
 
-# Give a quick W/L summary for all the games
-total_games = len(games)
-wins = sum(1 for _ in filter(lambda x: x.won(), games))
+    def refresh(added):
+        """Render the report from the watcher's aggregates."""
+        hero = Hero([], args.hero, args.deck, args.sample_size, aggregates=watcher.aggregates)
+        print()
+        print(datetime.datetime.now().strftime('%H:%M:%S') + ' ' + repr(added) + ' new games, ' + repr(hero.game_count) + ' in total.')
+        if args.report_file:
+            save_report(args.report_file, hero, args.openings, args.format)
+            print('Wrote ' + args.report_file)
+        else:
+            print_report(hero, args.openings)
+
+    print('Watching for new games every ' + format(args.watch, 'g') + ' seconds, press Ctrl+C to stop.')
+    try:
+        watcher.run(refresh)
+    except KeyboardInterrupt:
+        pass
+    parser.exit()
+
+# Reuse the cached summary and hero analysis if the input hasn't changed since they were computed.
+# The min sample size only affects what gets displayed, so it isn't part of the key.
+cache = None
+cached = None
+if args.cache_dir and args.hero and not (args.all_heroes or args.all_decks or args.state or args.pack or args.opening or args.openings or args.bootstrap or args.team or args.trend or args.synergies or args.tempo):
+    from cache import AggregateCache, fingerprint_file, fingerprint_games
+    cache = AggregateCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    fingerprints = [fingerprint_file(path) for path in (args.infile, args.archive, args.database) if path and os.path.exists(path)]
+    if fetched_games is not None:
+        fingerprints.append(fingerprint_games(fetched_games))
+    cache_key = cache.key(fingerprints, args.hero, args.deck, args.only_hero, args.since, args.until)
+    cached = cache.get(cache_key)
+
+if args.state:
+    # Fold only the games newer than the saved state into it, the summary covers all the games in the state.
+    key = [args.hero, args.deck, args.since, args.until]
+    state = DailyAggregates.load(args.state) if os.path.exists(args.state) else DailyAggregates(key)
+    if state.key != key:
+        parser.error(args.state + ' holds the analysis for ' + repr(state.key) + ', not ' + repr(key) + '.')
+    hero_filters = dict(filters, hero=args.hero, deck=args.deck)
+    if state.newest:
+        hero_filters['since'] = max(filter(None, (args.since, state.newest[:10])))
+
+    # Archives only grow, so reading can pick up where the last run left off.
+    source = args.infile or args.archive
+    if source and os.path.exists(source):
+        offset = state.offset if state.source == os.path.abspath(source) and os.path.getsize(source) >= state.offset else 0
+        state.source, state.offset = os.path.abspath(source), os.path.getsize(source)
+        loaded_games = load_games(source, offset=offset, **hero_filters)
+    loaded_games = timings.iterate('load', loaded_games)
+    if args.verbose:
+        loaded_games = echo(loaded_games)
+    if args.database:
+        from database import GameDatabase
+        database = GameDatabase(args.database)
+        with timings.stage('ingest'):
+            print('Added ' + repr(database.ingest(loaded_games)) + ' new games to ' + args.database)
+        loaded_games = timings.iterate('query', database.games(player=args.player, **hero_filters))
+    if feature_cache:
+        loaded_games = feature_cache.attach(loaded_games)
+
+    newest = state.newest
+    new_games = 0
+    with timings.stage('aggregate'):
+        for game in loaded_games:
+            if game.matches(args.hero, args.deck) and game.had_played_cards() and (newest is None or game.date > newest):
+                state.add_game(game)
+                new_games += 1
+    print('Added ' + repr(new_games) + ' new games to ' + args.state)
+
+    if args.last_days and state.newest:
+        cutoff = datetime.date.fromisoformat(state.newest[:10]) - datetime.timedelta(days=args.last_days - 1)
+        state.expire(cutoff.isoformat())
+    with timings.stage('save state'):
+        state.save(args.state)
+
+    aggregates = state.total
+    total_games, wins = aggregates.game_count, aggregates.wins
+    games = []
+elif cached is not None:
+    print('Using the cached analysis from ' + args.cache_dir)
+    total_games, wins, aggregates = cached
+    aggregates = Aggregates.from_dict(aggregates)
+    games = []
+else:
+    aggregates = None
+    loaded_games = timings.iterate('load', loaded_games)
+    if args.verbose:
+        loaded_games = echo(loaded_games)
+
+    if args.database:
+        # Index any new games, then pull only the games being analyzed back out of the database.
+        from database import GameDatabase
+        database = GameDatabase(args.database)
+        with timings.stage('ingest'):
+            print('Added ' + repr(database.ingest(loaded_games)) + ' new games to ' + args.database)
+        total_games, wins = database.count(player=args.player, **filters)
+        hero_filters = dict(filters, player=args.player)
+        if not (args.all_heroes or args.all_decks):
+            hero_filters.update(hero=args.hero, deck=args.deck)
+        # The games come back out of the database, not the packed file.
+        packed = None
+        loaded_games = timings.iterate('query', database.games(**hero_filters)) if args.backend != 'sqlite' else []
+        if args.backend == 'sqlite' and args.hero:
+            with timings.stage('aggregate'):
+                aggregates = database.aggregates(**hero_filters)
+    else:
+        total_games = None
+    if feature_cache:
+        loaded_games = feature_cache.attach(loaded_games)
+
+    if packed is not None:
+        # A packed file is already a compact store, only the games that match the filters are copied out of it.
+        games = packed if not any(filters.values()) else packed.select([game.index for game in loaded_games])
+    else:
+        # The compact store is built once at load time, the raw dictionaries are dropped as we go.
+        games = GameStore() if args.compact or args.pack else []
+        for game in loaded_games:
+            if args.compact or args.pack:
+                games.add(game.game_data)
+            else:
+                games.append(game)
+
+    if args.pack:
+        with timings.stage('pack'):
+            games.save(args.pack)
+        print('Packed ' + repr(len(games)) + ' games into ' + args.pack)
+
+    # Give a quick W/L summary for all the games
+    if total_games is None:
+        with timings.stage('summary'):
+            total_games = len(games)
+            wins = sum(1 for _ in filter(lambda x: x.won(), games))
 losses = total_games - wins
 
 print()
 print('Analyzing ' + repr(total_games) + ' games.')
 print(repr(wins) + ' wins')
 print(repr(losses) + ' losses')
-print('{:.2%} win percentage'.format(wins/(wins + losses)))
+if total_games:
+    print('{:.2%} win percentage'.format(wins/(wins + losses)))
 
-# Perform a more detailed analysis for the specified hero class.
+# Perform a more detailed analysis for the specified hero class, or for every hero class or deck.
 # TODO: Make it easy to turn on/off the various analyses. What's the right way to do that with argparse?
-if args.hero:
-    analysis_description = args.hero
-    if args.deck:
-        analysis_description = args.deck + ' ' + args.hero
+if not total_games:
+    # e.g. the filters left nothing, there's nothing to analyze.
+    print('No games match.')
+elif args.all_heroes or args.all_decks:
+    from report import write_reports
+    print()
+    with timings.stage('write_reports'):
+        for report_file in write_reports(games, args.report_dir, args.all_decks, args.sample_size, args.backend, args.jobs, args.format):
+            print('Wrote ' + report_file)
+elif args.hero:
+    import writers
+    from hero import Hero
+    from report import print_report, save_report
+    with timings.stage('aggregate'):
+        hero = Hero(games, args.hero, args.deck, args.sample_size, args.backend, aggregates)
+    if args.bootstrap:
+        with timings.stage('bootstrap'):
+            hero.bootstrap(args.bootstrap, args.confidence, jobs=args.jobs)
+    # Time each analysis, and separately how long rendering their tables takes.
+    timings.instrument(hero, [name for name in dir(hero) if name.startswith('analyze_')])
+    extra_tables = []
+    if args.synergies:
+        with timings.stage('synergies'):
+            extra_tables += hero.analyze_synergies(args.synergies)
+    if args.tempo:
+        with timings.stage('tempo'):
+            extra_tables += hero.analyze_tempo()
+    if args.trend:
+        from trends import Trends, load_patches
+        with timings.stage('trends'):
+            trends = Trends(hero.games, args.trend, load_patches(args.patches) if args.patches else None)
+            if args.state:
+                # The state keeps the games as per day partials, rather than the games themselves.
+                trends.add_daily(state)
+            extra_tables += trends.analyze(args.trend_window, args.sample_size)
+    timings.instrument(writers, ['tabulate'])
+    if args.report_file:
+        save_report(args.report_file, hero, args.openings, args.format, extra_tables)
+        print()
+        print('Wrote ' + args.report_file)
+    else:
+        print_report(hero, args.openings, extra_tables)
+    if args.opening:
+        turns = [opening_turn(turn) for turn in args.opening]
+        opening_data = hero.opening_win_rate(*turns)
+        print()
+        print('## Opening Win Rate')
+        print('Openings matching ' + ' then '.join(args.opening) + ': ' + repr(opening_data['games']) + ' games, '
+              + repr(opening_data['wins']) + ' wins, ' + repr(opening_data['losses']) + ' losses, '
+              + format(opening_data['win percentage'], '.1f') + '% win percentage')
+    if cache and cached is None:
+        cache.put(cache_key, (total_games, wins, hero.aggregates.to_dict()))
+
+if feature_cache:
+    with timings.stage('save features'):
+        feature_cache.save()
+
+if profiler:
+    profiler.disable()
+    profiler.dump_stats(args.profile)
+    timings.add_profile(profiler)
+if args.trace_memory:
+    tracemalloc.take_snapshot().dump(args.trace_memory)
+if args.timings:
+    timings.save(args.timings)
     print()
-    print('--- Analyzing '  + analysis_description + ' games ---')
-    hero = Hero(games, args.hero, args.deck, args.sample_size)
-    hero.analyze_cards_by_turn()
-    hero.analyze_cards()
-    hero.analyze_matchups()
-    #hero.analyze_openings()
-    #hero.analyze_mana()
-    hero.analyze_games_by_rank()
+    print('Wrote the timings to ' + args.timings)
 
 
 
@@ -0,0 +1,120 @@
+# Matches whatever was played on a turn in an opening query.
+ANY = None
+
+
+class Including(object):
+    """Matches the turns in an opening query where at least the given cards were played, along with anything else."""
+
+    def __init__(self, cards):
+        self.cards = frozenset(cards)
+
+    def __repr__(self):
+        return 'Including(' + repr(sorted(self.cards)) + ')'
+
+
+class OpeningNode(object):
+    """A node in an OpeningIndex, counting the games and wins for the opening that leads to it."""
+
+    __slots__ = ('games', 'wins', 'children')
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        # Child nodes keyed by the frozenset of cards played on the next turn.
+        self.children = {}
+
+
+def _turn_cards(turn):
+    """Normalize a turn in an opening query: ANY, Including, a card name, or a collection of card names played exactly."""
+    if turn is ANY or isinstance(turn, Including):
+        return turn
+    if isinstance(turn, str):
+        return frozenset((turn,))
+    return frozenset(turn)
+
+
+class OpeningIndex(object):
+    """A prefix tree (trie) of openings, the set of cards a hero played on each of their first turns, up to a depth.
+        Every node counts the games and wins of the opening leading to it, so the win rate of an opening
+        of any length up to the depth is a handful of dictionary lookups, whatever the number of games.
+        Turns where nothing was played are keyed by the empty set, so every game is depth turns deep.
+
+        Queries give the cards played on each turn in order. Fewer turns than the depth is a prefix query,
+        ANY matches whatever was played on a turn, and Including matches turns where at least some cards were played.
+    """
+
+    def __init__(self, games=(), depth=3):
+        """Create an index of openings depth turns deep, optionally adding an iterable of games."""
+        self.depth = depth
+        self.root = OpeningNode()
+        for game in games:
+            self.add_game(game)
+
+    def add_game(self, game):
+        """Add a single game's opening to the index."""
+        cards_by_turn = game.features().cards_by_turn
+        won = game.won()
+        node = self.root
+        node.games += 1
+        node.wins += won
+        for turn in range(1, self.depth + 1):
+            key = cards_by_turn.get(turn, frozenset())
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = OpeningNode()
+            node = child
+            node.games += 1
+            node.wins += won
+
+    def _nodes(self, node, turns):
+        """Generate the nodes matching the query turns, starting from node."""
+        if not turns:
+            yield node
+            return
+
+        turn, rest = turns[0], turns[1:]
+        if turn is ANY:
+            children = node.children.values()
+        elif isinstance(turn, Including):
+            children = [child for cards, child in node.children.items() if turn.cards <= cards]
+        else:
+            child = node.children.get(turn)
+            children = [child] if child is not None else []
+        for child in children:
+            yield from self._nodes(child, rest)
+
+    def query(self, *turns):
+        """Return the win/loss data for the games whose openings match the given turns, starting with turn 1."""
+        turns = [_turn_cards(turn) for turn in turns]
+        if len(turns) > self.depth:
+            raise ValueError('The index only holds openings ' + repr(self.depth) + ' turns deep')
+
+        # Every node already counts all the games below it, so trailing wildcards don't need walking.
+        while turns and turns[-1] is ANY:
+            turns.pop()
+
+        games = 0
+        wins = 0
+        for node in self._nodes(self.root, turns):
+            games += node.games
+            wins += node.wins
+        return {'games': games, 'wins': wins, 'losses': games - wins,
+                'win percentage': (wins / games) * 100 if games else 0}
+
+    def openings(self, depth=None):
+        """Generate an (opening, win/loss data) tuple for every distinct opening depth turns long, defaults to the index depth.
+            Openings are tuples of the frozensets of cards played on each turn.
+        """
+        depth = self.depth if depth is None else depth
+        if depth > self.depth:
+            raise ValueError('The index only holds openings ' + repr(self.depth) + ' turns deep')
+
+        stack = [((), self.root)]
+        while stack:
+            opening, node = stack.pop()
+            if len(opening) == depth:
+                yield opening, {'games': node.games, 'wins': node.wins, 'losses': node.games - node.wins,
+                                'win percentage': (node.wins / node.games) * 100}
+                continue
+            for cards, child in node.children.items():
+                stack.append((opening + (cards,), child))
@@ -0,0 +1,95 @@
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from hero import Hero
+from store import GameStore
+from writers import MarkdownWriter, open_writer
+
+# The file extension of each report format's report files. CSV and Parquet reports are directories of table files.
+REPORT_EXTENSIONS = {'markdown': '.md', 'jsonl': '.jsonl', 'csv': '', 'parquet': ''}
+
+
+def report_tables(hero: Hero, opening_depth=None):
+    """Generate the Tables of the standard set of analyses for a hero, plus the openings that many turns deep
+        if an opening depth is given. Each analysis runs as its tables are needed.
+    """
+    yield from hero.analyze_cards_by_turn()
+    yield from hero.analyze_cards()
+    yield from hero.analyze_matchups()
+    yield from hero.analyze_players()
+    if opening_depth:
+        yield from hero.analyze_openings(opening_depth)
+    #yield from hero.analyze_mana()
+    yield from hero.analyze_games_by_rank()
+
+
+def print_report(hero: Hero, opening_depth=None, tables=(), file=None):
+    """Print the standard set of analyses for a hero as markdown, plus the openings that many turns deep if an opening depth is given,
+        followed by any extra tables, e.g. trends. Prints to stdout unless a file is given.
+    """
+    file = file or sys.stdout
+    analysis_description = hero.hero
+    if hero.deck:
+        analysis_description = hero.deck + ' ' + hero.hero
+    print(file=file)
+    print('--- Analyzing '  + analysis_description + ' games ---', file=file)
+    if not hero.game_count:
+        print("Can't analyze " + hero.hero, file=file)
+    writer = MarkdownWriter(file)
+    writer.write_all(report_tables(hero, opening_depth))
+    writer.write_all(tables)
+
+
+def save_report(path: str, hero: Hero, opening_depth=None, format='markdown', tables=()):
+    """Write the standard report for a hero, and any extra tables, to the given file, or directory for the CSV and Parquet formats."""
+    if format == 'markdown':
+        with open(path, 'w') as fp:
+            print_report(hero, opening_depth, tables, fp)
+    else:
+        with open_writer(format, path) as writer:
+            writer.write_all(report_tables(hero, opening_depth))
+            writer.write_all(tables)
+
+
+def partition(games, by_deck=True):
+    """Partition the games by hero, or by hero and deck.
+        Returns a dictionary keyed by (hero, deck) tuples, the deck is None when not partitioning by deck.
+        The values are lists of games, or GameStores if the games came from a GameStore.
+    """
+    partitions = {}
+    for game in games:
+        partitions.setdefault((game.hero, game.deck if by_deck else None), []).append(game)
+
+    # Views into a big store would drag the whole store along to other processes, so give each partition its own.
+    if isinstance(games, GameStore):
+        for key, partition_games in partitions.items():
+            partitions[key] = games.select([game.index for game in partition_games])
+
+    return partitions
+
+
+def report_file_name(hero: str, deck: str, format='markdown'):
+    """Return a file name for a hero and optional deck report, e.g. Mage.md or Mage-Big_Spell.md"""
+    name = hero if not deck else hero + '-' + deck
+    return re.sub(r'[^\w.-]', '_', name) + REPORT_EXTENSIONS[format]
+
+
+def write_report(path: str, games, hero: str, deck: str, min_sample_size=0, backend='python', format='markdown'):
+    """Write the standard report for a hero and deck to the given file. Returns the path."""
+    save_report(path, Hero(games, hero, deck, min_sample_size, backend), format=format)
+    return path
+
+
+def write_reports(games, directory: str, by_deck=True, min_sample_size=0, backend='python', jobs=None, format='markdown'):
+    """Write a report for every hero, or every hero and deck, found in the games, one file per report.
+        The games are only loaded once, then the reports are run in parallel on a pool of jobs processes,
+        defaults to the number of CPUs. Returns the list of report files written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(write_report, os.path.join(directory, report_file_name(hero, deck, format)), partition_games,
+                                   hero, deck, min_sample_size, backend, format)
+                   for (hero, deck), partition_games in sorted(partition(games, by_deck).items())]
+        return [future.result() for future in futures]
@@ -0,0 +1,251 @@
+import argparse
+import io
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from aggregates import Aggregates
+from archive import Archive, load_games
+from hero import Hero
+from report import print_report
+from store import GameStore, is_packed
+
+# How many hero/deck/opponent slices keep their aggregates in memory, the least recently used are dropped first.
+MAX_CACHED_SLICES = 256
+
+# The query parameters that pick a slice of the games.
+SLICE_PARAMETERS = ('hero', 'deck', 'opponent', 'since', 'until')
+
+
+class AnalysisState(object):
+    """The games and aggregates a server keeps hot between requests.
+        Games are held in a GameStore, indexed by hero. The aggregates for each slice of the games that was queried,
+        e.g. a hero and deck against one opponent, are cached along with its rendered reports. New games are folded
+        into the cached aggregates as they're ingested, so a slice is only ever computed once,
+        only its reports are rendered again.
+        All access goes through a lock, queries take milliseconds so they don't need to run concurrently.
+    """
+
+    def __init__(self, archive=None, trackobot=None):
+        """Create an empty state. Ingested games are appended to the archive, and synced from track-o-bot, if given."""
+        self.archive = archive
+        self.trackobot = trackobot
+        self.store = GameStore()
+        self.ids = set()
+        # Store indices keyed by hero.
+        self.hero_indices = {}
+        # The aggregates for each slice keyed by its slice parameters, along with its reports keyed by sample size.
+        self.slices = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _add(self, game_data: dict):
+        """Add a game to the store unless it's already there. Returns the stored game, or None for a duplicate.
+            A game that can't be stored, e.g. one missing a field, raises and leaves the state unchanged.
+        """
+        if game_data['id'] in self.ids:
+            return None
+        game = self.store.add(game_data)
+        self.ids.add(game.id)
+        self.hero_indices.setdefault(game.hero, []).append(game.index)
+        return game
+
+    def load(self, games):
+        """Load an iterable of Game objects into the state."""
+        with self.lock:
+            for game in games:
+                self._add(game.game_data)
+
+    def load_store(self, store: GameStore):
+        """Load all the games in a GameStore, e.g. one opened from a packed file, without going through json."""
+        with self.lock:
+            self.store = store.select(range(len(store)))
+            self.ids = set(self.store.ids)
+            for game in self.store:
+                self.hero_indices.setdefault(game.hero, []).append(game.index)
+
+    @staticmethod
+    def _matches(game, hero, deck=None, opponent=None, since=None, until=None):
+        return game.matches(hero, deck, since, until) and (not opponent or game.opponent == opponent) and game.had_played_cards()
+
+    def ingest(self, games_json: list, archive=True):
+        """Add a list of track-o-bot game dictionaries, in any order, skipping the games already loaded.
+            The new games are folded into every cached slice they belong to, and appended to the archive unless archive is False.
+            A bad game raises, the games before it, oldest first, are kept and the rest are left out, so the corrected list
+            can be sent again. Returns the number of games added.
+        """
+        with self.lock:
+            games_json = sorted(games_json, key=lambda g: g['added'])
+            added = []
+            try:
+                for game_data in games_json:
+                    game = self._add(game_data)
+                    if game is not None:
+                        added.append(game)
+            finally:
+                for key, (aggregates, reports) in self.slices.items():
+                    for game in added:
+                        if self._matches(game, *key):
+                            aggregates.add_game(game)
+                            reports.clear()
+                if self.archive and archive and added:
+                    new_ids = set(game.id for game in added)
+                    self.archive.append([g for g in games_json if g['id'] in new_ids])
+        return len(added)
+
+    def sync(self):
+        """Fetch the games newer than the archive from track-o-bot, and ingest them. Returns the number of games added."""
+        if not (self.trackobot and self.archive):
+            raise ValueError('The server needs a username, token and archive to sync')
+        # The sync appends the new games to the archive itself.
+        return self.ingest([game.game_data for game in self.trackobot.sync(self.archive)], archive=False)
+
+    def _slice(self, key: tuple):
+        """Return the (aggregates, reports) for a slice of the games, computing the aggregates the first time the slice is asked for.
+            Must be called holding the lock.
+        """
+        cached = self.slices.get(key)
+        if cached is None:
+            aggregates = Aggregates(game for game in (self.store[i] for i in self.hero_indices.get(key[0], ()))
+                                    if self._matches(game, *key))
+            cached = self.slices[key] = (aggregates, {})
+            if len(self.slices) > MAX_CACHED_SLICES:
+                self.slices.popitem(last=False)
+        self.slices.move_to_end(key)
+        return cached
+
+    def report(self, hero, deck=None, opponent=None, since=None, until=None, sample_size=0):
+        """Return the standard report for a slice of the games, as markdown text."""
+        with self.lock:
+            aggregates, reports = self._slice((hero, deck, opponent, since, until))
+            if sample_size not in reports:
+                output = io.StringIO()
+                print_report(Hero([], hero, deck, sample_size, aggregates=aggregates), file=output)
+                reports[sample_size] = output.getvalue()
+            return reports[sample_size]
+
+    def summary(self, hero, deck=None, opponent=None, since=None, until=None):
+        """Return the win/loss counts for a slice of the games, as a json serializable dictionary."""
+        with self.lock:
+            return self._slice((hero, deck, opponent, since, until))[0].to_dict()
+
+    def status(self):
+        with self.lock:
+            return {'games': len(self.store), 'heroes': dict((hero, len(indices)) for hero, indices in self.hero_indices.items()),
+                    'cached slices': len(self.slices)}
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Answers the analysis server's requests:
+        GET /report?hero=Mage[&deck=..&opponent=..&since=..&until=..&sample_size=..] returns the markdown report for a slice.
+        GET /summary with the same slice parameters returns the slice's win/loss counts as json.
+        GET /status returns the number of games loaded.
+        POST /ingest with a json array of track-o-bot games adds the new ones.
+        POST /sync fetches and adds the games newer than the archive from track-o-bot.
+    """
+
+    def _send(self, status: int, body: str, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
+        self.send_header('Content-Length', repr(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, value):
+        self._send(status, json.dumps(value))
+
+    def _slice(self, query: dict):
+        if 'hero' not in query:
+            raise ValueError('A hero is required')
+        return dict((name, query[name][0]) for name in SLICE_PARAMETERS if name in query)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        start = time.perf_counter()
+        try:
+            if url.path == '/report':
+                sample_size = int(query.get('sample_size', ['0'])[0])
+                self._send(200, self.server.state.report(sample_size=sample_size, **self._slice(query)), 'text/markdown')
+            elif url.path == '/summary':
+                summary = self.server.state.summary(**self._slice(query))
+                summary['milliseconds'] = (time.perf_counter() - start) * 1000
+                self._send_json(200, summary)
+            elif url.path == '/status':
+                self._send_json(200, self.server.state.status())
+            else:
+                self._send_json(404, {'error': 'Unknown path ' + url.path})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == '/ingest':
+                games_json = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not isinstance(games_json, list):
+                    raise ValueError('Expected a json array of games')
+                self._send_json(200, {'added': self.server.state.ingest(games_json)})
+            elif url.path == '/sync':
+                self._send_json(200, {'added': self.server.state.sync()})
+            else:
+                self._send_json(404, {'error': 'Unknown path ' + url.path})
+        # A game that doesn't fit the store, see GameStore.add, is a bad request too.
+        except (ValueError, KeyError, TypeError, OverflowError, struct.error) as e:
+            self._send_json(400, {'error': 'Bad request: ' + str(e)})
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """An HTTP server answering analysis queries from an AnalysisState."""
+
+    daemon_threads = True
+
+    def __init__(self, address, state: AnalysisState):
+        super().__init__(address, AnalysisRequestHandler)
+        self.state = state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve hero reports over HTTP, keeping the games and analyses in memory between requests.')
+    parser.add_argument('-i', '--infile', type=str,
+                        help='The name of a file containing the games to serve, a json array, an archive with one game per line, '
+                        + 'or a packed file.')
+    parser.add_argument('-a', '--archive', type=str,
+                        help='The name of an archive file to serve the games from. Games ingested or synced are appended to it.')
+    parser.add_argument('-u', '--username', type=str,
+                        help='Your track-o-bot username, to sync new games into the --archive with POST /sync.')
+    parser.add_argument('-t', '--token', type=str,
+                        help='Your track-o-bot API token.')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='The address to listen on.')
+    parser.add_argument('-p', '--port', type=int, default=8000,
+                        help='The port to listen on.')
+    args = parser.parse_args()
+
+    trackobot = None
+    if args.username and args.token:
+        from trackobot import Trackobot
+        trackobot = Trackobot(args.username, args.token)
+    state = AnalysisState(Archive(args.archive) if args.archive else None, trackobot)
+
+    start = time.perf_counter()
+    if args.infile and is_packed(args.infile):
+        state.load_store(GameStore.open(args.infile))
+    elif args.infile:
+        state.load(load_games(args.infile))
+    if args.archive:
+        state.load(Archive(args.archive).games())
+    print('Loaded ' + repr(len(state.store)) + ' games in ' + format(time.perf_counter() - start, '.1f') + ' seconds.')
+
+    server = AnalysisServer((args.host, args.port), state)
+    print('Serving reports on http://' + args.host + ':' + repr(args.port) + '/report?hero=<hero>')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
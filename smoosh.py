@@ -1,33 +1,49 @@
 import argparse
 import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from archive import merge_runs, write_sorted_run
+from game import Game
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-i', '--infiles', type=str, nargs="*", default=[],
                     help='The names of files containing json data for the games you want to analyze. '
                     + 'Puts all the games in one list, de-duping them based on game id.')
 parser.add_argument('-o', '--outfile', type=str, default='smooshed_games.json',
-                    help='The name of a file to store the json data for the games.')
+                    help='The name of a file to store the json data for the games, newest game first.')
 parser.add_argument('-c', '--hero', type=str,
                     help='The hero class you want to analyze, e.g. Mage. If not specified all games will be analyzed with a simple summary.')
 parser.add_argument('-k', '--deck', type=str,
                     help='The deck name you want to analyze, e.g. Other. If not specified all decks will be analyzed with a simple summary.')
+parser.add_argument('-j', '--jobs', type=int,
+                    help='The number of processes used to read the input files. Defaults to the number of CPUs.')
+parser.add_argument('-v', '--verbose', action='store_true',
+                    help='Print every game as it is added.')
 
-args = parser.parse_args()
-
-# Get the game data to analyze.
-games = []
-seen = set()
+# Worker processes may import this script, only the main process does the smooshing.
+if __name__ == '__main__':
+    args = parser.parse_args()
 
-for infile in args.infiles:
-    with open(infile) as game_data:    
-        for g in json.load(game_data):
-            print(g)
-            if (g['id'] not in seen) and (not args.hero or args.hero == g['hero']) and (not args.deck or args.deck == g['deck']):
-                games.append(g)
-                seen.add(g['id'])
-                print('added game ' + repr(g['id']))
+    with tempfile.TemporaryDirectory() as run_dir:
+        # Read and sort the input files in parallel, each into its own run file, skipping other heroes and decks as they're read.
+        run_paths = [os.path.join(run_dir, repr(i) + '.run') for i in range(len(args.infiles))]
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            list(executor.map(write_sorted_run, args.infiles, run_paths, [args.hero] * len(run_paths), [args.deck] * len(run_paths)))
 
-with open(args.outfile, 'w') as fp:
-    json.dump(games, fp)
+        # Stream the merged games to the output file, rather than holding them all in memory.
+        count = 0
+        with open(args.outfile, 'w') as fp:
+            fp.write('[')
+            for game_json in merge_runs(run_paths):
+                if count:
+                    fp.write(', ')
+                fp.write(game_json)
+                count += 1
+                if args.verbose:
+                    game = Game(json.loads(game_json))
+                    print('added game ' + repr(game.id) + ' ' + str(game))
+            fp.write(']')
 
-print('Wrote ' + repr(len(games)) + ' games to ' + args.outfile)
+    print('Wrote ' + repr(count) + ' games to ' + args.outfile)
@@ -0,0 +1,302 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from game import Game
+
+# Player codes used in the play table.
+PLAYERS = ('me', 'opponent')
+
+# The packed file format: a header, the string table as a json list, then the raw bytes of every column in
+# COLUMNS order. The header holds the magic bytes, the format version, the byte order, the string table
+# size in bytes and the length of each column. Every section starts on an 8 byte boundary.
+PACKED_MAGIC = b'HSGS'
+PACKED_VERSION = 1
+COLUMNS = ('ids', 'heroes', 'decks', 'opponents', 'opponent_decks', 'dates', 'ranked', 'ranks', 'won',
+           'play_offsets', 'play_turns', 'play_players', 'play_cards', 'play_mana')
+# The columns with one entry per game, and the play table columns with one entry per card played.
+GAME_COLUMNS = COLUMNS[:COLUMNS.index('play_offsets')]
+PLAY_COLUMNS = COLUMNS[COLUMNS.index('play_offsets') + 1:]
+# The types of the game columns, to check a game's values fit them before anything is appended.
+_GAME_ROW = struct.Struct('=qiiiiibbb')
+_PACKED_HEADER = struct.Struct('<4sHc1xQ' + 'Q' * len(COLUMNS))
+
+
+def _aligned(position: int):
+    return (position + 7) & ~7
+
+
+def is_packed(path: str):
+    """Test whether a file holds a packed GameStore, as written by GameStore.save()."""
+    with open(path, 'rb') as fp:
+        return fp.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+
+
+class GameStore(object):
+    """A compact, columnar store for track-o-bot games.
+        Every string (hero, deck, card names, dates...) is interned once into a shared string table,
+        and games and card plays are kept as typed array columns instead of one dict per game and
+        per card play. The card plays of all the games live in one flat play table, each game holds
+        an offset into it.
+
+        The store is a sequence of StoredGame views, which behave like Game objects,
+        so it can be handed to Hero in place of a list of games.
+
+        A store can be saved to a packed binary file and opened again with open(), which memory maps the file.
+        The columns of an opened store are views straight into the file, so opening is near-instant
+        whatever the file size, and only the pages holding data that's actually read are loaded.
+    """
+
+    def __init__(self, games=()):
+        """Create a new store, optionally loading an iterable of track-o-bot game dictionaries."""
+        # The string table, strings are referenced everywhere else by their index in this list.
+        self.strings = []
+        self._string_ids = {}
+
+        # Game columns, one entry per game.
+        self.ids = array('q')
+        self.heroes = array('i')
+        self.decks = array('i')
+        self.opponents = array('i')
+        self.opponent_decks = array('i')
+        self.dates = array('i')
+        self.ranked = array('b')
+        self.ranks = array('b')
+        self.won = array('b')
+        # The plays for game i are play_offsets[i]:play_offsets[i + 1] in the play table.
+        self.play_offsets = array('q', [0])
+
+        # Play table columns, one entry per card played.
+        self.play_turns = array('h')
+        self.play_players = array('b')
+        self.play_cards = array('i')
+        self.play_mana = array('h')
+
+        # The memory map backing the columns of a store opened from a packed file, they can't be added to.
+        self._mapped = None
+
+        for game_data in games:
+            self.add(game_data)
+
+    def intern(self, string: str):
+        """Return the string table id for the given string, adding it to the table if needed."""
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._string_ids[string] = string_id
+        return string_id
+
+    def add(self, game_data: dict):
+        """Add a track-o-bot dictionary representing a single game to the store.
+            Returns the StoredGame view for the new game.
+        """
+        if self._mapped is not None:
+            raise ValueError('Games can\'t be added to a store opened from a packed file')
+
+        # Reuse the Game accessors so the stored values follow exactly the same rules.
+        # Every value is read and converted to its column's type before any column is appended to, so a game with
+        # a missing or bad value raises without leaving the columns out of step with each other. Strings interned
+        # before the error stay in the string table, unused.
+        game = Game(game_data)
+        row = (game_data['id'], self.intern(game.hero), self.intern(game.deck), self.intern(game.opponent),
+               self.intern(game.opponent_deck), self.intern(game.date), game.ranked(), game.rank, game.won())
+        history = game_data['card_history']
+        play_values = (array('h', [play['turn'] for play in history]),
+                       array('b', [PLAYERS.index(play['player']) for play in history]),
+                       array('i', [self.intern(play['card']['name']) for play in history]),
+                       array('h', [play['card']['mana'] for play in history]))
+        _GAME_ROW.pack(*row)
+
+        for column, value in zip(GAME_COLUMNS, row):
+            getattr(self, column).append(value)
+        for column, values in zip(PLAY_COLUMNS, play_values):
+            getattr(self, column).extend(values)
+        self.play_offsets.append(len(self.play_turns))
+
+        return StoredGame(self, len(self.ids) - 1)
+
+    def select(self, indices):
+        """Return a new GameStore holding only the games at the given indices, e.g. to send a subset of games to another process."""
+        selected = GameStore()
+        selected.strings = list(self.strings)
+        selected._string_ids = dict(self._string_ids)
+        for column in GAME_COLUMNS:
+            values = getattr(self, column)
+            getattr(selected, column).extend(values[i] for i in indices)
+
+        for i in indices:
+            start, end = self.play_offsets[i], self.play_offsets[i + 1]
+            selected.play_turns.extend(self.play_turns[start:end])
+            selected.play_players.extend(self.play_players[start:end])
+            selected.play_cards.extend(self.play_cards[start:end])
+            selected.play_mana.extend(self.play_mana[start:end])
+            selected.play_offsets.append(len(selected.play_turns))
+
+        return selected
+
+    def save(self, path: str):
+        """Save the store to a packed binary file, which open() loads back without parsing anything but the string table."""
+        strings = json.dumps(self.strings).encode('utf-8')
+        columns = [getattr(self, column) for column in COLUMNS]
+        byte_order = b'<' if sys.byteorder == 'little' else b'>'
+
+        with open(path, 'wb') as fp:
+            fp.write(_PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, byte_order, len(strings), *[len(column) for column in columns]))
+            for section in [strings] + [memoryview(column).cast('B') for column in columns]:
+                fp.write(b'\0' * (_aligned(fp.tell()) - fp.tell()))
+                fp.write(section)
+
+    @classmethod
+    def open(cls, path: str):
+        """Open a store saved with save(), memory mapping the file. The store is read only."""
+        with open(path, 'rb') as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = _PACKED_HEADER.unpack_from(mapped)
+        magic, version, byte_order, strings_size = header[:4]
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError(path + ' is not a packed game store this version can read')
+        if byte_order != (b'<' if sys.byteorder == 'little' else b'>'):
+            raise ValueError(path + ' was packed on a machine with a different byte order')
+
+        store = cls()
+        store._mapped = mapped
+        view = memoryview(mapped)
+        position = _PACKED_HEADER.size
+        store.strings = json.loads(bytes(view[position:position + strings_size]).decode('utf-8'))
+        store._string_ids = dict((string, string_id) for string_id, string in enumerate(store.strings))
+        position += strings_size
+
+        # Each column becomes a typed view into the mapped file, nothing is copied.
+        for column, length in zip(COLUMNS, header[4:]):
+            typecode = getattr(store, column).typecode
+            position = _aligned(position)
+            size = length * array(typecode).itemsize
+            setattr(store, column, view[position:position + size].cast(typecode))
+            position += size
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('game index out of range')
+        return StoredGame(self, index)
+
+    def __iter__(self):
+        return (StoredGame(self, index) for index in range(len(self)))
+
+
+class StoredGame(Game):
+    """A lightweight view of a single game held in a GameStore.
+        Provides the same interface as Game, but reads everything from the store's columns.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: GameStore, index: int):
+        self.store = store
+        self.index = index
+        self._features = None
+
+    @property
+    def id(self):
+        return self.store.ids[self.index]
+
+    @property
+    def hero(self):
+        return self.store.strings[self.store.heroes[self.index]]
+
+    @property
+    def deck(self):
+        return self.store.strings[self.store.decks[self.index]]
+
+    @property
+    def opponent(self):
+        return self.store.strings[self.store.opponents[self.index]]
+
+    @property
+    def opponent_deck(self):
+        return self.store.strings[self.store.opponent_decks[self.index]]
+
+    @property
+    def date(self):
+        return self.store.strings[self.store.dates[self.index]]
+
+    @property
+    def rank(self):
+        return self.store.ranks[self.index]
+
+    # The store doesn't keep the player tags of team games.
+    @property
+    def player(self):
+        return None
+
+    # Only whether a game was ranked is kept, not which of the other modes it was played in.
+    @property
+    def mode(self):
+        return 'ranked' if self.ranked() else None
+
+    # Nor the coin or the game's length.
+    @property
+    def coin(self):
+        return None
+
+    @property
+    def duration(self):
+        return None
+
+    @property
+    def result(self):
+        return 'W' if self.won() else 'L'
+
+    def won(self):
+        return bool(self.store.won[self.index])
+
+    def ranked(self):
+        return bool(self.store.ranked[self.index])
+
+    def _play_range(self):
+        return range(self.store.play_offsets[self.index], self.store.play_offsets[self.index + 1])
+
+    def had_played_cards(self):
+        return bool(self._play_range())
+
+    def card_history(self, player='me'):
+        """Return an iterator for all the cards played by the specified player, in the track-o-bot dictionary format.
+            Only provided for compatibility, the other methods read the play table directly.
+        """
+        store = self.store
+        player_code = PLAYERS.index(player)
+        return ({'player': player, 'turn': store.play_turns[i],
+                 'card': {'name': store.strings[store.play_cards[i]], 'mana': store.play_mana[i]}}
+                for i in self._play_range() if store.play_players[i] == player_code)
+
+    def plays(self):
+        store = self.store
+        return ((store.play_turns[i], PLAYERS[store.play_players[i]], store.strings[store.play_cards[i]], store.play_mana[i])
+                for i in self._play_range())
+
+    def cards(self):
+        store = self.store
+        return set(store.strings[store.play_cards[i]] for i in self._play_range() if store.play_players[i] == 0)
+
+    def cards_on_turn(self, turn: int):
+        store = self.store
+        return frozenset(store.strings[store.play_cards[i]] for i in self._play_range()
+                         if store.play_players[i] == 0 and store.play_turns[i] == turn)
+
+    def last_turn(self):
+        store = self.store
+        return max((store.play_turns[i] for i in self._play_range() if store.play_players[i] == 0), default=0)
+
+    def mana_spent(self, player='me'):
+        store = self.store
+        player_code = PLAYERS.index(player)
+        return sum(store.play_mana[i] for i in self._play_range() if store.play_players[i] == player_code)
@@ -0,0 +1,93 @@
+from itertools import combinations
+
+
+def _bitset(indices: list, size: int):
+    """Build an int bitset with the given bits set, in time linear in the size."""
+    bits = bytearray((size + 7) // 8)
+    for i in indices:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class CardSets(object):
+    """The games each card was played in, as bitsets, for counting the games and wins of any set of cards.
+        The games where a set of cards were all played are the AND of their bitsets, and the count is a popcount.
+    """
+
+    def __init__(self, games):
+        """Index the cards played by the hero in an iterable of games."""
+        indices = {}
+        won = []
+        self.game_count = 0
+        for i, game in enumerate(games):
+            for card in game.cards():
+                indices.setdefault(card, []).append(i)
+            if game.won():
+                won.append(i)
+            self.game_count += 1
+
+        self.won = _bitset(won, self.game_count)
+        # Bitsets keyed by card name.
+        self.cards = dict((card, _bitset(card_indices, self.game_count)) for card, card_indices in indices.items())
+
+    def counts(self, games_bits: int):
+        """Return the (games, wins) for a bitset of games."""
+        return games_bits.bit_count(), (games_bits & self.won).bit_count()
+
+    def frequent(self, min_games=1, max_size=3):
+        """Generate a (cards, games bitset) tuple for every set of up to max_size cards played together in at least
+            min_games games, smallest sets first. The cards are sorted tuples of card names.
+            Sets are grown a card at a time, Apriori style, and only counted when all their subsets are frequent,
+            which prunes most combinations before they're ever counted.
+        """
+        level = {}
+        for card, bits in sorted(self.cards.items()):
+            if bits.bit_count() >= min_games:
+                level[(card,)] = bits
+                yield (card,), bits
+
+        for size in range(2, max_size + 1):
+            next_level = {}
+            sets = sorted(level)
+            for i, cards in enumerate(sets):
+                # Join sets sharing all but their last card, the new set is sorted since the sets are.
+                for other in sets[i + 1:]:
+                    if other[:-1] != cards[:-1]:
+                        break
+                    candidate = cards + other[-1:]
+                    # Only count the candidate if every subset is frequent too.
+                    if size > 2 and any(subset not in level for subset in combinations(candidate, size - 1)):
+                        continue
+                    bits = level[cards] & self.cards[other[-1]]
+                    if bits.bit_count() >= min_games:
+                        next_level[candidate] = bits
+                        yield candidate, bits
+            level = next_level
+            if not level:
+                return
+
+
+def synergies(games, min_games=1, max_size=3):
+    """Find the card sets, from pairs up to max_size cards, played together in at least min_games games.
+        Returns a dictionary keyed by size, holding lists of win/loss data for every set, with its 'cards',
+        its 'best subset win percentage', the best win rate of the sets one card smaller, and its 'synergy',
+        how much higher its win rate is than that. Sorted by synergy, highest first.
+    """
+    card_sets = CardSets(games)
+    # Win percentages of the smaller sets, to compare the bigger sets with.
+    win_percentages = {}
+    results = dict((size, []) for size in range(2, max_size + 1))
+    for cards, bits in card_sets.frequent(min_games, max_size):
+        games_count, wins = card_sets.counts(bits)
+        win_percentage = (wins / games_count) * 100
+        win_percentages[cards] = win_percentage
+        if len(cards) == 1:
+            continue
+        best = max(win_percentages[subset] for subset in combinations(cards, len(cards) - 1))
+        results[len(cards)].append({'cards': list(cards), 'games': games_count, 'wins': wins, 'losses': games_count - wins,
+                                    'win percentage': win_percentage, 'best subset win percentage': best,
+                                    'synergy': win_percentage - best})
+
+    for sets in results.values():
+        sets.sort(key=lambda data: data['synergy'], reverse=True)
+    return results
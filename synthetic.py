@@ -0,0 +1,149 @@
+import argparse
+import datetime
+import json
+import random
+
+# The hero classes, their deck archetypes and their class cards, as (name, mana) tuples.
+HEROES = {
+    'Druid': (('Jade', 'Token', 'Big'),
+              [('Innervate', 0), ('Wild Growth', 2), ('Jade Idol', 1), ('Swipe', 4), ('Nourish', 6), ('Spreading Plague', 6),
+               ('Ultimate Infestation', 10), ('Jade Blossom', 3), ('Aya Blackpaw', 6), ('Malfurion the Pestilent', 7)]),
+    'Hunter': (('Face', 'Midrange', 'Spell'),
+               [('Hunter\'s Mark', 1), ('Alleycat', 1), ('Kindly Grandmother', 2), ('Animal Companion', 3), ('Eaglehorn Bow', 3),
+                ('Unleash the Hounds', 3), ('Houndmaster', 4), ('Savannah Highmane', 6), ('Deathstalker Rexxar', 6), ('Call of the Wild', 8)]),
+    'Mage': (('Tempo', 'Freeze', 'Big'),
+             [('Arcane Missiles', 1), ('Mirror Image', 1), ('Frostbolt', 2), ('Arcane Intellect', 3), ('Ice Block', 3),
+              ('Fireball', 4), ('Polymorph', 4), ('Blizzard', 6), ('Frost Lich Jaina', 9), ('Flamestrike', 7)]),
+    'Paladin': (('Murloc', 'Aggro', 'Control'),
+                [('Righteous Protector', 1), ('Equality', 2), ('Aldor Peacekeeper', 3), ('Truesilver Champion', 4),
+                 ('Consecration', 4), ('Call to Arms', 4), ('Stonehill Defender', 3), ('Tirion Fordring', 8),
+                 ('Uther of the Ebon Blade', 9), ('Lay on Hands', 8)]),
+    'Priest': (('Dragon', 'Highlander', 'Control'),
+               [('Power Word: Shield', 1), ('Northshire Cleric', 1), ('Shadow Word: Pain', 2), ('Shadow Word: Death', 3),
+                ('Potion of Madness', 1), ('Holy Nova', 5), ('Cabal Shadow Priest', 6), ('Lightbomb', 6),
+                ('Shadowreaper Anduin', 8), ('Free From Amber', 8)]),
+    'Rogue': (('Miracle', 'Tempo', 'Kingsbane'),
+              [('Backstab', 0), ('Preparation', 0), ('Cold Blood', 1), ('Eviscerate', 2), ('Sap', 2), ('Fan of Knives', 3),
+               ('SI:7 Agent', 3), ('Edwin VanCleef', 3), ('Vilespine Slayer', 5), ('Valeera the Hollow', 9)]),
+    'Shaman': (('Aggro', 'Elemental', 'Token'),
+               [('Lightning Bolt', 1), ('Tunnel Trogg', 1), ('Flametongue Totem', 2), ('Jade Claws', 2), ('Maelstrom Portal', 2),
+                ('Feral Spirit', 3), ('Hex', 4), ('Fire Elemental', 6), ('Thrall, Deathseer', 5), ('Volcano', 5)]),
+    'Warlock': (('Zoo', 'Handlock', 'Cube'),
+                [('Flame Imp', 1), ('Voidwalker', 1), ('Mortal Coil', 1), ('Dark Pact', 1), ('Hellfire', 4),
+                 ('Possessed Lackey', 6), ('Doomguard', 5), ('Skulking Geist', 6), ('Bloodreaver Gul\'dan', 10), ('Twisting Nether', 8)]),
+    'Warrior': (('Pirate', 'Control', 'Taunt'),
+                [('Execute', 1), ('Shield Slam', 1), ('Fiery War Axe', 3), ('Slam', 2), ('Shield Block', 3), ('Brawl', 5),
+                 ('Arcanite Reaper', 5), ('Grommash Hellscream', 8), ('Scourgelord Garrosh', 8), ('Dead Man\'s Hand', 2)]),
+}
+
+# Neutral cards any hero can play, as (name, mana) tuples.
+NEUTRAL_CARDS = [('Patches the Pirate', 1), ('Fire Fly', 1), ('Acidic Swamp Ooze', 2), ('Bloodmage Thalnos', 2),
+                 ('Dirty Rat', 2), ('Doppelgangster', 5), ('Kazakus', 4), ('Spellbreaker', 4), ('Azure Drake', 5),
+                 ('Bonemare', 7), ('Primordial Drake', 8), ('The Lich King', 8), ('Ragnaros the Firelord', 8)]
+
+# The ladder ranks games are played at, legend is rank 0.
+RANKS = list(range(0, 26))
+
+
+def _deck_cards(rng: random.Random, hero: str):
+    """Build a deck's pool of distinct cards for a hero, a mix of class and neutral cards."""
+    class_cards = HEROES[hero][1]
+    return rng.sample(class_cards, 7) + rng.sample(NEUTRAL_CARDS, 6)
+
+
+def _card_history(rng: random.Random, deck_cards: list, opponent_cards: list, coin: bool, turns: int):
+    """Generate a card history for a game lasting the given number of turns.
+        Each turn both players spend up to their available mana on cards from their pools.
+    """
+    card_history = []
+    for turn in range(1, turns + 1):
+        players = (('opponent', opponent_cards), ('me', deck_cards)) if coin else (('me', deck_cards), ('opponent', opponent_cards))
+        for player, cards in players:
+            mana = min(turn, 10)
+            # Roughly a third of the time nothing fits or the player holds their cards.
+            while rng.random() < 0.7:
+                playable = [card for card in cards if card[1] <= mana]
+                if not playable:
+                    break
+                name, cost = rng.choice(playable)
+                card_history.append({'id': len(card_history) + 1, 'player': player, 'turn': turn,
+                                     'card': {'id': name.upper().replace(' ', '_'), 'name': name, 'mana': cost}})
+                mana -= cost
+    return card_history
+
+
+def generate_game(rng: random.Random, game_id: int, added: datetime.datetime, heroes=None):
+    """Generate a single track-o-bot game dictionary with the given id and date.
+        The heroes played are picked from the given list of hero classes, or from all of them.
+    """
+    hero = rng.choice(heroes or sorted(HEROES))
+    opponent = rng.choice(sorted(HEROES))
+    deck = rng.choice(HEROES[hero][0])
+    opponent_deck = rng.choice(HEROES[opponent][0])
+    coin = rng.random() < 0.5
+    mode = rng.choice(('ranked', 'ranked', 'ranked', 'casual', 'arena'))
+    rank = rng.choice(RANKS) if mode == 'ranked' else None
+
+    # Make the results depend on the matchup, so the analyses have something to find.
+    win_chance = 0.5 + (HEROES[hero][0].index(deck) - HEROES[opponent][0].index(opponent_deck)) * 0.05 + (0.03 if coin else 0)
+    won = rng.random() < win_chance
+
+    # Some games are conceded before any cards are played.
+    turns = 0 if rng.random() < 0.03 else rng.randint(4, 16)
+    card_history = _card_history(rng, _deck_cards(rng, hero), _deck_cards(rng, opponent), coin, turns)
+
+    return {'id': game_id,
+            'mode': mode,
+            'hero': hero,
+            'hero_deck': deck,
+            'opponent': opponent,
+            'opponent_deck': opponent_deck,
+            'coin': coin,
+            'result': 'win' if won else 'loss',
+            'duration': turns * 90 + rng.randint(0, 90),
+            'rank': rank,
+            'legend': rank == 0,
+            'added': added.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'card_history': card_history}
+
+
+def generate_games(count: int, seed=0, start=datetime.datetime(2017, 11, 1), heroes=None):
+    """Generate a list of count track-o-bot game dictionaries, newest first like track-o-bot returns them.
+        The same count and seed always generate the same games, the games are roughly 10 minutes apart from the start date.
+    """
+    rng = random.Random(seed)
+    games = []
+    added = start
+    for game_id in range(1, count + 1):
+        added += datetime.timedelta(minutes=rng.randint(5, 15))
+        games.append(generate_game(rng, game_id, added, heroes))
+    games.reverse()
+    return games
+
+
+def write_games(path: str, games: list, json_lines=False):
+    """Write game dictionaries to a file, either as a json array like track-o-bot returns,
+        or as an archive with one game per line, oldest first.
+    """
+    with open(path, 'w') as fp:
+        if json_lines:
+            for g in reversed(games):
+                fp.write(json.dumps(g) + '\n')
+        else:
+            json.dump(games, fp)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic track-o-bot game data, e.g. for benchmarks.')
+    parser.add_argument('-n', '--games', type=int, default=1000,
+                        help='The number of games to generate.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='The random seed, the same seed always generates the same games.')
+    parser.add_argument('-o', '--outfile', type=str, default='synthetic_games.json',
+                        help='The name of the file to write the games to.')
+    parser.add_argument('--json-lines', action='store_true',
+                        help='Write an archive with one game per line, instead of a json array.')
+    args = parser.parse_args()
+
+    write_games(args.outfile, generate_games(args.games, args.seed), args.json_lines)
+    print('Wrote ' + repr(args.games) + ' games to ' + args.outfile)
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from archive import Archive
+from trackobot import HISTORY_URL, Trackobot
+
+
+class Player(object):
+    """A player on a team roster, with the track-o-bot account their games are synced from."""
+
+    def __init__(self, name: str, username=None, token=None):
+        """Create a new player. Without a username and token the player's archive is analyzed but never synced."""
+        self.name = name
+        self.username = username
+        self.token = token
+
+    def __repr__(self):
+        return 'Player(' + repr(self.name) + ')'
+
+
+def load_roster(path: str):
+    """Load a team roster, a json array of players each with a 'player' name, and the 'username' and 'token' of their
+        track-o-bot account. The name defaults to the username. Returns a list of Players.
+    """
+    with open(path) as fp:
+        roster_json = json.load(fp)
+
+    players = []
+    for entry in roster_json:
+        name = entry.get('player') or entry.get('username')
+        if not name:
+            raise ValueError('Every player in ' + path + ' needs a player name or a username')
+        players.append(Player(name, entry.get('username'), entry.get('token')))
+
+    names = [player.name for player in players]
+    if len(set(names)) != len(names):
+        raise ValueError('The player names in ' + path + ' must be unique')
+    return players
+
+
+class Team(object):
+    """A team of players whose games are analyzed together.
+        Each player's games are kept in their own archive in the team directory, named after the player.
+        Syncing fetches every account at the same time, each with its own connection and rate limit,
+        so a team sync takes about as long as its slowest account rather than all of them added up.
+        The games are tagged with their player's name as they're read, see Game.player.
+    """
+
+    def __init__(self, players: list, directory: str, days=10, rate_limit=None, history_url=HISTORY_URL):
+        """Create a team of players keeping their archives in the given directory.
+            Each account's track-o-bot requests are limited to rate_limit per second, if given.
+        """
+        self.players = players
+        self.directory = directory
+        self.days = days
+        self.rate_limit = rate_limit
+        self.history_url = history_url
+
+    def archive(self, player: Player):
+        """Return the archive holding a player's games."""
+        return Archive(os.path.join(self.directory, re.sub(r'[^\w.-]', '_', player.name) + '.jsonl'))
+
+    def _sync_player(self, player: Player):
+        trackobot = Trackobot(player.username, player.token, self.days, history_url=self.history_url, rate_limit=self.rate_limit)
+        return len(trackobot.sync(self.archive(player)))
+
+    def sync(self, jobs=None):
+        """Sync every player with an account into their archive, jobs accounts at a time, defaults to all of them.
+            One account failing doesn't stop the others.
+            Returns a dictionary keyed by player name, holding the number of new games, or the exception if the sync failed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        players = [player for player in self.players if player.username and player.token]
+        if not players:
+            return {}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=jobs or len(players)) as executor:
+            futures = [(player, executor.submit(self._sync_player, player)) for player in players]
+            for player, future in futures:
+                try:
+                    results[player.name] = future.result()
+                except Exception as e:
+                    results[player.name] = e
+        return results
+
+    def games(self, player=None, **filters):
+        """Return an iterator of Game objects for all the players' games, or just the named player's, tagged with the player.
+            Takes the same filters as Archive.games.
+        """
+        for team_player in self.players:
+            if player and team_player.name != player:
+                continue
+            for game in self.archive(team_player).games(**filters):
+                game.game_data['player'] = team_player.name
+                yield game
@@ -0,0 +1,97 @@
+import vectorized
+from vectorized import np, require_numpy
+
+# The most mana crystals a player can have.
+MAX_MANA = 10
+
+# The upper bounds of the first 4 mana gap buckets, a gap is the hero's mana spent so far minus the opponent's.
+MANA_GAP_BOUNDS = [-4, -1, 2, 5]
+MANA_GAP_KEYS = ['-5 or less', '-4 to -2', '-1 to 1', '2 to 4', '5 or more']
+
+# The upper bounds of the first 4 curve efficiency buckets, the percentage of the mana available that was spent.
+CURVE_EFFICIENCY_BOUNDS = [50, 70, 85, 100]
+CURVE_EFFICIENCY_KEYS = ['under 50%', '50% to 70%', '70% to 85%', '85% to 100%', '100% or more']
+
+
+def available_mana(turns):
+    """Return the total mana a player had to spend by the end of each of the turns, gaining a mana crystal
+        every turn up to MAX_MANA. The coin and other mana effects aren't counted.
+    """
+    turns = np.asarray(turns, dtype=np.int64)
+    ramp = np.minimum(turns, MAX_MANA)
+    return ramp * (ramp + 1) // 2 + np.maximum(turns - MAX_MANA, 0) * MAX_MANA
+
+
+def _average(totals, counts):
+    """Vectorized totals / counts, 0 where there are no counts."""
+    result = np.zeros(np.shape(counts), dtype=float)
+    np.divide(totals, counts, out=result, where=counts != 0)
+    return result
+
+
+class Tempo(object):
+    """The mana gaps of a list of games, turn by turn, as a turn x game matrix, and each game's curve efficiency,
+        the mana the hero spent as a percentage of the mana they had.
+        The plays are summed into the matrix with one np.bincount, so bucketing and counting the gaps are
+        whole matrix operations rather than per game python sums.
+    """
+
+    def __init__(self, games: list, max_turn=10):
+        """Compute the mana gaps for the first max_turn turns of a list of games. Requires numpy."""
+        require_numpy('The tempo analysis')
+
+        arrays = vectorized.encode(games)
+        game_count = len(arrays)
+        self.game_count = game_count
+        self.max_turn = max_turn
+        self.won = arrays.won
+
+        # A game reached every turn up to the last one either player played a card on.
+        self.last_turns = np.zeros(game_count, dtype=np.int64)
+        np.maximum.at(self.last_turns, arrays.games, arrays.turns)
+
+        # Row t holds the mana gap after turn t, row 0 is the start of the game.
+        signed_mana = np.where(arrays.players == 0, arrays.mana, -arrays.mana)
+        early = arrays.turns <= max_turn
+        spent = np.bincount(arrays.turns[early] * game_count + arrays.games[early], weights=signed_mana[early],
+                            minlength=(max_turn + 1) * game_count)
+        self.gaps = np.cumsum(spent.reshape(max_turn + 1, game_count), axis=0)
+
+        mine = arrays.players == 0
+        hero_last_turns = np.zeros(game_count, dtype=np.int64)
+        np.maximum.at(hero_last_turns, arrays.games[mine], arrays.turns[mine])
+        hero_mana = np.bincount(arrays.games[mine], weights=arrays.mana[mine], minlength=game_count)
+        # Games where the hero never played a card have no curve to measure.
+        self.hero_played = hero_last_turns > 0
+        self.curve_efficiencies = _average(hero_mana * 100, available_mana(hero_last_turns))
+
+    def _reached(self):
+        """A turn x game mask of the turns each game reached, leaving out the start of the game."""
+        turns = np.arange(self.max_turn + 1)[:, None]
+        return (turns >= 1) & (turns <= self.last_turns[None, :])
+
+    def mana_gaps(self):
+        """Count the games and wins in each mana gap bucket after each turn.
+            Returns turn x bucket matrices of the games and wins, and per turn arrays of the games reaching the turn
+            and the average gap in the games won and in the games lost. Row 0 is the start of the game, it's always empty.
+        """
+        reached = self._reached()
+        won = reached & self.won[None, :]
+        lost = reached & ~self.won[None, :]
+        buckets = np.searchsorted(MANA_GAP_BOUNDS, self.gaps, side='right')
+        cells = np.arange(self.max_turn + 1)[:, None] * len(MANA_GAP_KEYS) + buckets
+        shape = (self.max_turn + 1, len(MANA_GAP_KEYS))
+        games = np.bincount(cells[reached], minlength=shape[0] * shape[1]).reshape(shape)
+        wins = np.bincount(cells[won], minlength=shape[0] * shape[1]).reshape(shape)
+
+        win_gaps = np.where(won, self.gaps, 0).sum(axis=1)
+        loss_gaps = np.where(lost, self.gaps, 0).sum(axis=1)
+        return games, wins, reached.sum(axis=1), _average(win_gaps, won.sum(axis=1)), _average(loss_gaps, lost.sum(axis=1))
+
+    def curve_efficiency(self):
+        """Count the games and wins in each curve efficiency bucket, of the games where the hero played cards.
+            Returns arrays of the games and wins.
+        """
+        buckets = np.searchsorted(CURVE_EFFICIENCY_BOUNDS, self.curve_efficiencies[self.hero_played], side='right')
+        return (np.bincount(buckets, minlength=len(CURVE_EFFICIENCY_KEYS)),
+                np.bincount(buckets[self.won[self.hero_played]], minlength=len(CURVE_EFFICIENCY_KEYS)))
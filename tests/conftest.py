@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to hs-deck-analyzer.py.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+def game_json(game_id: int, hero='Mage', opponent='Warrior', result='win', added='2017-11-20T20:00:00.000Z', plays=None):
+    """Build a track-o-bot game dictionary. plays is a list of (turn, player, card name, mana) tuples."""
+    if plays is None:
+        plays = [(1, 'me', 'Mana Wyrm', 1), (1, 'opponent', 'Fiery War Axe', 3), (2, 'me', 'Arcanologist', 2)]
+    return {'id': game_id, 'mode': 'ranked', 'hero': hero, 'hero_deck': 'Tempo', 'opponent': opponent, 'opponent_deck': 'Pirate',
+            'coin': False, 'result': result, 'duration': 300, 'rank': 10, 'legend': None, 'added': added,
+            'card_history': [{'id': i, 'player': player, 'turn': turn, 'card': {'id': card, 'name': card, 'mana': mana}}
+                             for i, (turn, player, card, mana) in enumerate(plays)]}
+
+
+@pytest.fixture
+def make_game():
+    """A factory for track-o-bot game dictionaries, see game_json."""
+    return game_json
+
+
+@pytest.fixture
+def synthetic_games():
+    """A factory for lists of synthetic Games, oldest first, see synthetic.generate_games."""
+    from game import Game
+    from synthetic import generate_games
+
+    def make_games(count: int, seed=0, heroes=None):
+        return [Game(game_json) for game_json in reversed(generate_games(count, seed, heroes=heroes))]
+    return make_games
@@ -0,0 +1,57 @@
+import json
+
+from aggregates import Aggregates, DailyAggregates
+
+
+def counts(aggregates: Aggregates):
+    """The aggregates' to_dict(), with the openings sorted since their order depends on the order games were added."""
+    data = aggregates.to_dict()
+    data['openings'] = sorted(data['openings'])
+    return data
+
+
+def played(games):
+    return [game for game in games if game.had_played_cards()]
+
+
+def test_merged_aggregates_match_a_single_pass(synthetic_games):
+    games = played(synthetic_games(600, seed=1))
+    merged = Aggregates(games[:150]).merge(Aggregates(games[150:400])).merge(Aggregates(games[400:]))
+    assert counts(merged) == counts(Aggregates(games))
+    assert merged.newest == max(game.date for game in games)
+
+
+def test_subtracted_aggregates_match_a_single_pass(synthetic_games):
+    games = played(synthetic_games(600, seed=2))
+    # Taking games back out drops the entries only they had, e.g. cards played in none of the other games.
+    assert counts(Aggregates(games).subtract(Aggregates(games[:200]))) == counts(Aggregates(games[200:]))
+    # The newest date is left alone.
+    assert counts(Aggregates(games).subtract(Aggregates(games))) == dict(counts(Aggregates()), newest=games[-1].date)
+
+
+def test_dictionaries_round_trip_through_json(synthetic_games):
+    aggregates = Aggregates(played(synthetic_games(300, seed=3)))
+    loaded = Aggregates.from_dict(json.loads(json.dumps(aggregates.to_dict())))
+    assert loaded.to_dict() == aggregates.to_dict()
+    assert loaded.newest == aggregates.newest
+
+    # Games can still be added to the loaded aggregates.
+    more = played(synthetic_games(50, seed=4))
+    for game in more:
+        loaded.add_game(game)
+        aggregates.add_game(game)
+    assert counts(loaded) == counts(aggregates)
+
+
+def test_daily_aggregates_expire_to_the_games_in_the_window(synthetic_games, tmp_path):
+    games = played(synthetic_games(400, seed=5))
+    daily = DailyAggregates()
+    for game in games:
+        daily.add_game(game)
+    path = str(tmp_path / 'state.json')
+    daily.save(path)
+    daily = DailyAggregates.load(path)
+
+    before = sorted(daily.days)[len(daily.days) // 2]
+    daily.expire(before)
+    assert counts(daily.total) == counts(Aggregates(game for game in games if game.date[:10] >= before))
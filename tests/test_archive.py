@@ -0,0 +1,31 @@
+import json
+
+import archive
+from archive import merge_runs, write_sorted_run
+
+
+def write_lines(path, games_json):
+    with open(path, 'w') as fp:
+        for game_json in games_json:
+            fp.write(json.dumps(game_json) + '\n')
+
+
+def test_runs_drop_copies_of_a_game_with_a_different_date(make_game, tmp_path, monkeypatch):
+    # Sort a couple of games at a time, so the copies end up in different chunks of a run.
+    monkeypatch.setattr(archive, 'RUN_SIZE', 2)
+    first = str(tmp_path / 'first.jsonl')
+    second = str(tmp_path / 'second.jsonl')
+    write_lines(first, [make_game(1, added='2017-11-20T20:00:00.000Z'), make_game(2, added='2017-11-21T20:00:00.000Z'),
+                        make_game(1, added='2017-11-22T20:00:00.000Z'), make_game(3, added='2017-11-19T20:00:00.000Z'),
+                        make_game(3, added='2017-11-19T20:00:00.000Z')])
+    write_lines(second, [make_game(2, added='2017-11-23T20:00:00.000Z'), make_game(4, added='2017-11-18T20:00:00.000Z')])
+
+    run_paths = [str(tmp_path / 'first.run'), str(tmp_path / 'second.run')]
+    assert write_sorted_run(first, run_paths[0]) == 3
+    assert write_sorted_run(second, run_paths[1]) == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['first.jsonl', 'first.run', 'second.jsonl', 'second.run']
+
+    games = [json.loads(game_json) for game_json in merge_runs(run_paths)]
+    # The newest copy of each game is kept.
+    assert [(game['id'], game['added'][:10]) for game in games] == [(2, '2017-11-23'), (1, '2017-11-22'),
+                                                                     (3, '2017-11-19'), (4, '2017-11-18')]
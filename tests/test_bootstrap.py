@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import bootstrap
+from aggregates import Aggregates
+
+
+def test_big_incidences_sum_the_same_as_dense_ones(monkeypatch, synthetic_games):
+    games = [game for game in synthetic_games(300, heroes=['Mage']) if game.had_played_cards()]
+    dense = bootstrap.bootstrap(games, 100, seed=3)
+
+    # Gather and sum every incidence, a few games' draw counts at a time.
+    monkeypatch.setattr(bootstrap, 'MAX_DENSE', 0)
+    monkeypatch.setattr(bootstrap, 'MAX_GATHERED', 500)
+    assert bootstrap.bootstrap(games, 100, seed=3) == dense
+
+
+def test_intervals_contain_the_point_estimates(synthetic_games):
+    games = [game for game in synthetic_games(1000, seed=11, heroes=['Mage']) if game.had_played_cards()]
+    intervals = bootstrap.bootstrap(games, 500, seed=7)
+    # The threads only split the replicates, the seed alone decides the intervals.
+    assert bootstrap.bootstrap(games, 500, seed=7, jobs=3) == intervals
+
+    aggregates = Aggregates(games)
+    game_count, wins = aggregates.game_count, aggregates.wins
+    checked = 0
+    for card, data in aggregates.cards.items():
+        # Small samples can have lopsided intervals, only the well sampled cards are checked.
+        if min(data['games'], game_count - data['games']) < 50:
+            continue
+        win_percentage = (data['wins'] / data['games']) * 100
+        delta = win_percentage - ((wins - data['wins']) / (game_count - data['games'])) * 100
+        interval = intervals['cards'][card]
+        assert interval['low'] <= win_percentage <= interval['high']
+        assert interval['delta low'] <= delta <= interval['delta high']
+        assert interval['low'] < interval['high'] and interval['delta low'] < interval['delta high']
+        checked += 1
+    assert checked
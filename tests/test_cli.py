@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+SCRIPT = os.path.join(REPO_DIR, 'hs-deck-analyzer.py')
+
+# The most seconds the script's imports can take, the same budget benchmark.py checks its startup against.
+STARTUP_BUDGET = 0.25
+
+# The modules with heavy dependencies, which are only imported on the code paths that need them.
+HEAVY_MODULES = ['requests', 'tabulate', 'numpy', 'sqlite3']
+
+
+def run(*args):
+    return subprocess.run([sys.executable, SCRIPT] + list(args), capture_output=True, text=True)
+
+
+def test_reports_when_no_games_match(make_game, tmp_path):
+    infile = str(tmp_path / 'games.json')
+    with open(infile, 'w') as fp:
+        json.dump([make_game(1), make_game(2, result='loss')], fp)
+
+    state = str(tmp_path / 'state.json')
+    for args in (['--since', '2030-01-01'], ['-c', 'Mage', '--only-hero', '--since', '2030-01-01'], ['-c', 'Rogue', '--state', state]):
+        result = run('-i', infile, *args)
+        assert result.returncode == 0, result.stderr
+        assert 'No games match.' in result.stdout
+
+
+def test_watch_tails_one_source(make_game, tmp_path):
+    infile = str(tmp_path / 'games.jsonl')
+    with open(infile, 'w') as fp:
+        fp.write(json.dumps(make_game(1)) + '\n')
+
+    result = run('-i', infile, '-a', str(tmp_path / 'archive.jsonl'), '-u', 'user', '-t', 'token',
+                 '-c', 'Mage', '--watch', '60')
+    assert result.returncode == 2
+    assert 'not both' in result.stderr
+
+
+def test_starts_without_the_heavy_modules():
+    result = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT, '--help'], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    # -X importtime logs 'import time: self [us] | cumulative | package', a module's imports are listed before it,
+    # indented. The modules up to site are the interpreter's own startup, the rest are the script's imports.
+    # How long starting takes is checked by benchmark.py --startup-budget, timings are too noisy for a test.
+    imports = [(len(indent), int(cumulative), name) for cumulative, indent, name
+               in re.findall(r'^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$', result.stderr, re.MULTILINE)]
+    site = imports.index(next(module for module in imports if module[0] == 1 and module[2] == 'site'))
+    script_imports = imports[site + 1:]
+    assert not [name for _, _, name in script_imports if name.split('.')[0] in HEAVY_MODULES]
+    # Only the script's own imports count, their nested imports are already in their cumulative time.
+    assert sum(cumulative for indent, cumulative, _ in script_imports if indent == 1) / 1e6 < STARTUP_BUDGET
+
+
+def test_timings_report_the_stages_and_the_profile(synthetic_games, tmp_path):
+    infile = str(tmp_path / 'games.json')
+    with open(infile, 'w') as fp:
+        json.dump([game.game_data for game in synthetic_games(200, heroes=['Mage'])], fp)
+
+    timings_path = str(tmp_path / 'timings.json')
+    result = run('-i', infile, '-c', 'Mage', '--timings', timings_path, '--profile', str(tmp_path / 'run.prof'))
+    assert result.returncode == 0, result.stderr
+    with open(timings_path) as fp:
+        report = json.load(fp)
+    assert {'load', 'summary', 'aggregate', 'analyze_cards', 'analyze_matchups', 'tabulate'} <= set(report['stages'])
+    # Every game was loaded one at a time, plus one call to find the end.
+    assert report['stages']['load']['calls'] == 201
+    assert any(function['function'].endswith('(print_report)') for function in report['functions'])
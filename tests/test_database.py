@@ -0,0 +1,59 @@
+import sqlite3
+
+from aggregates import Aggregates
+from database import GameDatabase
+from game import Game
+from store import GameStore
+
+
+def games_json(make_game):
+    return [make_game(1, added='2017-11-20T20:00:00.000Z'),
+            make_game(2, opponent='Priest', result='loss', added='2017-11-21T20:00:00.000Z'),
+            make_game(3, hero='Rogue', added='2017-11-22T20:00:00.000Z'),
+            make_game(4, added='2017-11-23T20:00:00.000Z', plays=[])]
+
+
+def test_ingests_the_games_of_a_store(make_game, tmp_path):
+    database = GameDatabase(str(tmp_path / 'games.db'))
+    assert database.ingest(GameStore(games_json(make_game))) == 4
+    assert database.ingest(GameStore(games_json(make_game))) == 0
+
+    assert database.count(hero='Mage') == (3, 2)
+    games = list(database.games(hero='Mage'))
+    assert [(game.id, game.won(), game.ranked(), game.coin) for game in games] == [(1, True, True, None), (2, False, True, None), (4, True, True, None)]
+    assert [list(game.plays()) for game in games] == [list(Game(game_json).plays()) for game_json in games_json(make_game) if game_json['hero'] == 'Mage']
+
+
+def test_aggregates_match_the_games_and_know_the_newest_one(make_game, tmp_path):
+    database = GameDatabase(str(tmp_path / 'games.db'))
+    database.ingest(Game(game_json) for game_json in games_json(make_game))
+
+    aggregates = database.aggregates(hero='Mage')
+    expected = Aggregates(game for game in database.games(hero='Mage') if game.had_played_cards())
+    # The newest Mage game had no plays, so it isn't counted.
+    assert aggregates.newest == '2017-11-21T20:00:00.000Z'
+    assert aggregates.to_dict() == expected.to_dict()
+
+
+def test_keeps_team_players(make_game, tmp_path):
+    database = GameDatabase(str(tmp_path / 'games.db'))
+    games = [Game(game_json) for game_json in games_json(make_game)]
+    for game, player in zip(games, ['Ann', 'Bo', 'Ann', 'Bo']):
+        game.game_data['player'] = player
+    database.ingest(games)
+
+    assert [game.id for game in database.games(player='Ann')] == [1, 3]
+    assert [game.player for game in database.games()] == ['Ann', 'Bo', 'Ann', 'Bo']
+
+
+def test_adds_the_player_column_to_older_databases(make_game, tmp_path):
+    path = str(tmp_path / 'games.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE games (id INTEGER PRIMARY KEY, mode TEXT, hero TEXT NOT NULL, deck TEXT NOT NULL, '
+                       + 'opponent TEXT NOT NULL, opponent_deck TEXT NOT NULL, result TEXT, rank INTEGER, coin INTEGER, '
+                       + 'duration INTEGER, added TEXT NOT NULL)')
+    connection.close()
+
+    database = GameDatabase(path)
+    database.ingest([Game(make_game(1))])
+    assert [game.id for game in database.games()] == [1]
@@ -0,0 +1,49 @@
+from collections import Counter
+
+from openings import ANY, Including, OpeningIndex
+
+
+def matches(game, turns):
+    """Whether a game's opening matches the query turns, checked turn by turn without the index."""
+    cards_by_turn = game.features().cards_by_turn
+    for turn, query in enumerate(turns, 1):
+        cards = cards_by_turn.get(turn, frozenset())
+        if isinstance(query, Including):
+            if not query.cards <= cards:
+                return False
+        elif query is not ANY and cards != query:
+            return False
+    return True
+
+
+def scan(games, turns):
+    matched = [game for game in games if matches(game, turns)]
+    wins = sum(game.won() for game in matched)
+    return {'games': len(matched), 'wins': wins, 'losses': len(matched) - wins,
+            'win percentage': (wins / len(matched)) * 100 if matched else 0}
+
+
+def test_queries_match_a_scan_of_the_games(synthetic_games):
+    games = [game for game in synthetic_games(800, seed=6, heroes=['Mage']) if game.had_played_cards()]
+    index = OpeningIndex(games, depth=3)
+
+    # The most common openings, so the queries match games, and one that no game has.
+    common = [opening for opening, _ in Counter(tuple(game.features().cards_by_turn.get(turn, frozenset()) for turn in (1, 2, 3))
+                                                  for game in games).most_common(5)]
+    queries = [(), (frozenset(['No Such Card']),)]
+    for turn_1, turn_2, turn_3 in common:
+        card = sorted(turn_2 or turn_3 or ['No Such Card'])[0]
+        queries += [(turn_1,), (turn_1, turn_2), (turn_1, turn_2, turn_3), (ANY, turn_2), (turn_1, ANY, turn_3),
+                    (ANY, ANY, turn_3), (turn_1, ANY), (ANY, Including([card])), (Including([card]), ANY, Including([]))]
+    for turns in queries:
+        assert index.query(*turns) == scan(games, turns), turns
+
+
+def test_openings_cover_every_game(synthetic_games):
+    games = [game for game in synthetic_games(300, seed=7, heroes=['Mage']) if game.had_played_cards()]
+    index = OpeningIndex(games, depth=3)
+    for depth in (1, 2, 3):
+        openings = list(index.openings(depth))
+        assert sum(data['games'] for _, data in openings) == len(games)
+        for opening, data in openings:
+            assert data == scan(games, opening)
@@ -0,0 +1,78 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import report
+from archive import Archive
+from server import AnalysisServer, AnalysisState
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Serve an AnalysisState archiving to a temporary file on a local port. Yields the state and the server's url."""
+    state = AnalysisState(Archive(str(tmp_path / 'games.jsonl')))
+    server = AnalysisServer(('127.0.0.1', 0), state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield state, 'http://127.0.0.1:' + repr(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def request(url: str, games_json=None):
+    """GET the url, or POST the games to it. Returns the status and the json response."""
+    data = None if games_json is None else json.dumps(games_json).encode('utf-8')
+    try:
+        with urlopen(Request(url, data)) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_a_bad_game_can_be_resent_once_corrected(server, make_game):
+    state, url = server
+    assert request(url + '/summary?hero=Mage')[1]['wins'] == 0
+
+    bad = make_game(2, added='2017-11-21T20:00:00.000Z')
+    del bad['opponent']
+    status, response = request(url + '/ingest', [make_game(1), bad])
+    assert status == 400
+    # The game before the bad one is kept, and folded into the cached slice.
+    assert request(url + '/status')[1]['games'] == 1
+    assert request(url + '/summary?hero=Mage')[1]['wins'] == 1
+
+    assert request(url + '/ingest', [make_game(1), make_game(2, added='2017-11-21T20:00:00.000Z')]) == (200, {'added': 1})
+    assert request(url + '/status')[1]['games'] == 2
+    assert request(url + '/summary?hero=Mage')[1]['wins'] == 2
+    assert [game.id for game in state.archive.games()] == [1, 2]
+    assert [game.opponent for game in state.store] == ['Warrior', 'Warrior']
+
+
+def test_a_game_that_does_not_fit_the_store_is_a_bad_request(server, make_game):
+    state, url = server
+    bad = make_game(1)
+    bad['rank'] = 1000
+    assert request(url + '/ingest', [bad])[0] == 400
+    assert request(url + '/ingest', ['not a game'])[0] == 400
+    assert request(url + '/status')[1]['games'] == 0
+
+
+def test_reports_only_hold_the_report(monkeypatch, make_game, capsys):
+    state = AnalysisState()
+    state.ingest([make_game(1)])
+    report_tables = report.report_tables
+
+    def printing_tables(*args):
+        # Another thread, e.g. a sync, prints while the report is being rendered.
+        thread = threading.Thread(target=print, args=('Added game 2',))
+        thread.start()
+        thread.join()
+        yield from report_tables(*args)
+
+    monkeypatch.setattr(report, 'report_tables', printing_tables)
+    text = state.report('Mage')
+    assert 'Mage' in text and 'Added game 2' not in text
+    assert capsys.readouterr().out == 'Added game 2\n'
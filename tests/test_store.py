@@ -0,0 +1,43 @@
+import struct
+
+import pytest
+
+from store import COLUMNS, GameStore
+
+
+def column_lengths(store: GameStore):
+    return dict((column, len(getattr(store, column))) for column in COLUMNS)
+
+
+@pytest.mark.parametrize('field', ['opponent', 'card_history'])
+def test_add_leaves_store_unchanged_when_a_field_is_missing(make_game, field):
+    store = GameStore([make_game(1)])
+    before = column_lengths(store)
+
+    bad = make_game(2)
+    del bad[field]
+    with pytest.raises(KeyError):
+        store.add(bad)
+    assert column_lengths(store) == before
+
+
+def test_add_leaves_store_unchanged_when_a_play_is_malformed(make_game):
+    store = GameStore([make_game(1)])
+    before = column_lengths(store)
+
+    bad = make_game(2)
+    del bad['card_history'][-1]['card']['mana']
+    with pytest.raises(KeyError):
+        store.add(bad)
+    # A value that doesn't fit its column fails before anything is appended too.
+    with pytest.raises(OverflowError):
+        store.add(make_game(3, plays=[(1, 'me', 'Mana Wyrm', 1), (100000, 'me', 'Arcanologist', 2)]))
+    bad = make_game(4)
+    bad['rank'] = 1000
+    with pytest.raises(struct.error):
+        store.add(bad)
+    assert column_lengths(store) == before
+
+    good = store.add(make_game(5, opponent='Priest'))
+    assert good.opponent == 'Priest'
+    assert list(good.plays()) == [(1, 'me', 'Mana Wyrm', 1), (1, 'opponent', 'Fiery War Axe', 3), (2, 'me', 'Arcanologist', 2)]
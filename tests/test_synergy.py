@@ -0,0 +1,39 @@
+from collections import Counter
+from itertools import combinations
+
+from synergy import CardSets, synergies
+
+
+def brute_force(games, min_games, max_size):
+    """Count the games and wins of every set of cards played together, by listing every game's sets."""
+    games_counts = Counter()
+    wins = Counter()
+    for game in games:
+        cards = sorted(set(game.cards()))
+        for size in range(1, max_size + 1):
+            for cards_set in combinations(cards, size):
+                games_counts[cards_set] += 1
+                wins[cards_set] += game.won()
+    return dict((cards_set, (count, wins[cards_set])) for cards_set, count in games_counts.items() if count >= min_games)
+
+
+def test_frequent_sets_match_a_brute_force_count(synthetic_games):
+    games = [game for game in synthetic_games(300, seed=9, heroes=['Mage']) if game.had_played_cards()]
+    card_sets = CardSets(games)
+    for min_games in (1, 10, 40):
+        frequent = dict((cards, card_sets.counts(bits)) for cards, bits in card_sets.frequent(min_games, 3))
+        assert frequent == brute_force(games, min_games, 3)
+
+
+def test_synergies_count_the_pairs_and_triples(synthetic_games):
+    games = [game for game in synthetic_games(300, seed=10, heroes=['Mage']) if game.had_played_cards()]
+    expected = brute_force(games, 15, 3)
+    results = synergies(games, min_games=15, max_size=3)
+    for size in (2, 3):
+        found = dict((tuple(data['cards']), (data['games'], data['wins'])) for data in results[size])
+        assert found == dict((cards, data) for cards, data in expected.items() if len(cards) == size)
+        assert found
+        for data in results[size]:
+            best = max(expected[subset][1] / expected[subset][0] for subset in combinations(data['cards'], size - 1)) * 100
+            assert data['best subset win percentage'] == best
+            assert data['synergy'] == data['win percentage'] - best
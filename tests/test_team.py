@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from team import Player, Team, load_roster
+from test_trackobot import StubHistory, recent_games
+
+
+@pytest.fixture
+def accounts():
+    """Serve a StubHistory per track-o-bot username on a local port, unknown usernames are refused.
+        Yields the dictionary of histories keyed by username and the history url.
+    """
+    histories = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            history = histories.get(query['username'][0])
+            if history is None:
+                self.send_response(401)
+                self.end_headers()
+                return
+            body = json.dumps(history.page(int(query['page'][0]))).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', repr(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield histories, 'http://127.0.0.1:' + repr(server.server_address[1]) + '/history.json'
+    server.shutdown()
+    server.server_close()
+
+
+def test_syncs_every_account_into_its_players_archive(accounts, make_game, tmp_path):
+    histories, url = accounts
+    histories['ann'] = StubHistory(recent_games(make_game, range(6, 0, -1)))
+    histories['bo'] = StubHistory(recent_games(make_game, range(14, 10, -1)))
+    players = [Player('Ann', 'ann', 'token'), Player('Bo', 'bo', 'token'), Player('Broken', 'nobody', 'token'), Player('Offline')]
+    (tmp_path / 'team').mkdir()
+    team = Team(players, str(tmp_path / 'team'), history_url=url)
+
+    # Ann's oldest games are already archived, the offline player's archive is only ever read.
+    team.archive(players[0]).append(list(reversed(histories['ann'].games_json[3:])))
+    team.archive(players[3]).append([make_game(21), make_game(22)])
+
+    results = team.sync()
+    assert [name for name in results] == ['Ann', 'Bo', 'Broken']
+    assert (results['Ann'], results['Bo']) == (3, 4)
+    assert isinstance(results['Broken'], requests.HTTPError)
+
+    assert [(game.player, game.id) for game in team.games()] == ([('Ann', game_id) for game_id in range(1, 7)]
+                                                                 + [('Bo', game_id) for game_id in range(11, 15)]
+                                                                 + [('Offline', 21), ('Offline', 22)])
+    assert [game.id for game in team.games(player='Bo')] == list(range(11, 15))
+
+    # Syncing again finds nothing new.
+    assert dict((name, count) for name, count in team.sync().items() if name != 'Broken') == {'Ann': 0, 'Bo': 0}
+    assert len(list(team.games())) == 12
+
+
+def test_roster_names_default_to_the_username(tmp_path):
+    path = str(tmp_path / 'roster.json')
+    with open(path, 'w') as fp:
+        json.dump([{'player': 'Ann', 'username': 'ann', 'token': 't'}, {'username': 'bo', 'token': 't'}, {'player': 'Offline'}], fp)
+    assert [(player.name, player.username) for player in load_roster(path)] == [('Ann', 'ann'), ('bo', 'bo'), ('Offline', None)]
+
+    with open(path, 'w') as fp:
+        json.dump([{'player': 'Ann'}, {'player': 'Ann', 'username': 'ann', 'token': 't'}], fp)
+    with pytest.raises(ValueError):
+        load_roster(path)
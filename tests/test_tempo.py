@@ -0,0 +1,38 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import tempo
+from game import Game
+
+
+def test_mana_gaps_are_bucketed_at_the_boundaries(make_game):
+    # A turn 1 play each, the hero's mana minus the opponent's is the gap after turn 1.
+    gaps = [-5, -4, -2, -1, 0, 1, 2, 4, 5, 8]
+    games = [Game(make_game(i, result='win' if i % 2 else 'loss', plays=[(1, 'me', 'Mine', 10 + gap), (1, 'opponent', 'Theirs', 10)]))
+             for i, gap in enumerate(gaps)]
+    games_tempo = tempo.Tempo(games, max_turn=2)
+    assert games_tempo.gaps[1].tolist() == gaps
+
+    games_count, wins, turn_games, win_gaps, loss_gaps = games_tempo.mana_gaps()
+    # '-5 or less', '-4 to -2', '-1 to 1', '2 to 4', '5 or more'
+    assert games_count[1].tolist() == [1, 2, 3, 2, 2]
+    assert wins[1].tolist() == [0, 1, 2, 1, 1]
+    # No game reached turn 2, and nothing is counted at the start of the game.
+    assert games_count[0].tolist() == games_count[2].tolist() == [0] * 5
+    assert turn_games.tolist() == [0, len(gaps), 0]
+    assert win_gaps[1] == np.mean(gaps[1::2]) and loss_gaps[1] == np.mean(gaps[::2])
+
+
+def test_curve_efficiency_is_bucketed_at_the_boundaries(make_game):
+    # The hero's last play is on turn 4, with 1 + 2 + 3 + 4 = 10 mana available.
+    spent = [4, 5, 6, 7, 9, 10, 11]
+    games = [Game(make_game(i, plays=[(1, 'opponent', 'Theirs', 1), (4, 'me', 'Mine', mana)])) for i, mana in enumerate(spent)]
+    games.append(Game(make_game(len(spent), plays=[(1, 'opponent', 'Theirs', 1)])))
+    games_tempo = tempo.Tempo(games)
+    assert tempo.available_mana([1, 4, 10, 12]).tolist() == [1, 10, 55, 75]
+
+    games_count, wins = games_tempo.curve_efficiency()
+    # 'under 50%', '50% to 70%', '70% to 85%', '85% to 100%', '100% or more', the game without hero plays isn't counted.
+    assert games_count.tolist() == [1, 2, 1, 1, 2]
+    assert wins.tolist() == games_count.tolist()
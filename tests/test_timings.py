@@ -0,0 +1,56 @@
+import cProfile
+import json
+import types
+
+from timings import Timings
+
+
+def test_stages_nest_and_count_their_calls():
+    timings = Timings()
+    with timings.stage('outer'):
+        for _ in range(3):
+            with timings.stage('inner'):
+                sum(range(1000))
+    assert list(timings.iterate('load', ['a', 'b'])) == ['a', 'b']
+
+    stages = timings.report()['stages']
+    assert [(name, data['calls']) for name, data in stages.items()] == [('outer', 1), ('inner', 3), ('load', 3)]
+    assert stages['outer']['seconds'] >= stages['inner']['seconds'] > 0
+
+
+def test_instrumented_functions_and_the_profile_are_in_the_report(tmp_path):
+    def analyze_cards(count):
+        return sorted(range(count))
+
+    target = types.SimpleNamespace(analyze_cards=analyze_cards)
+    timings = Timings(trace_memory=True)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    target.analyze_cards(1000)
+    target.analyze_cards(10)
+    profiler.disable()
+    timings.add_profile(profiler)
+
+    path = str(tmp_path / 'timings.json')
+    timings.save(path)
+    with open(path) as fp:
+        report = json.load(fp)
+    assert report['stages'] == {}
+    assert 'peak MB' in report
+
+    timings.instrument(target, ['analyze_cards'], prefix='hero.')
+    assert target.analyze_cards(5) == [0, 1, 2, 3, 4]
+    report = timings.report()
+    assert report['stages']['hero.analyze_cards']['calls'] == 1
+    assert set(report['stages']['hero.analyze_cards']) == {'seconds', 'calls', 'allocated MB', 'peak MB'}
+    assert [function['calls'] for function in report['functions'] if function['function'].endswith('(analyze_cards)')] == [2]
+
+
+def test_disabled_timings_record_nothing():
+    timings = Timings(enabled=False)
+    target = types.SimpleNamespace(analyze_cards=sorted)
+    timings.instrument(target, ['analyze_cards'])
+    with timings.stage('load'):
+        pass
+    assert target.analyze_cards is sorted
+    assert timings.report()['stages'] == {}
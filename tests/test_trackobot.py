@@ -0,0 +1,124 @@
+import datetime
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from archive import Archive
+from trackobot import Trackobot
+
+PER_PAGE = 5
+
+
+class StubHistory(object):
+    """A stand in for track-o-bot's history api, serving a list of games newest first, PER_PAGE games a page."""
+
+    def __init__(self, games_json: list):
+        self.games_json = games_json
+        self.requested = []
+        # Pages that fail with a server error the next time they're requested.
+        self.failing = set()
+
+    def page(self, page: int):
+        total_pages = max((len(self.games_json) + PER_PAGE - 1) // PER_PAGE, 1)
+        return {'history': self.games_json[(page - 1) * PER_PAGE:page * PER_PAGE], 'meta': {'current_page': page, 'total_pages': total_pages}}
+
+
+@pytest.fixture
+def stub():
+    """Serve a StubHistory on a local port. Yields the stub and its history url."""
+    history = StubHistory([])
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            page = int(parse_qs(urlparse(self.path).query)['page'][0])
+            history.requested.append(page)
+            if page in history.failing:
+                history.failing.discard(page)
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps(history.page(page)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', repr(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield history, 'http://127.0.0.1:' + repr(server.server_address[1]) + '/history.json'
+    server.shutdown()
+    server.server_close()
+
+
+def recent_games(make_game, ids):
+    """Track-o-bot games with the given ids, newest first, an hour apart, all within the last 10 days."""
+    now = datetime.datetime.now()
+    newest = max(ids)
+    return [make_game(game_id, added=(now - datetime.timedelta(hours=newest - game_id + 1)).isoformat()) for game_id in ids]
+
+
+def fetched_ids(trackobot: Trackobot, tmp_path):
+    return [game.id for game in trackobot.get_game_history(str(tmp_path / 'out.json'))]
+
+
+def test_fetches_every_page_in_order(stub, make_game, tmp_path):
+    history, url = stub
+    history.games_json = recent_games(make_game, range(23, 0, -1))
+
+    trackobot = Trackobot('user', 'token', history_url=url, workers=3)
+    assert fetched_ids(trackobot, tmp_path) == list(range(23, 0, -1))
+    assert sorted(history.requested) == [1, 2, 3, 4, 5]
+
+
+def test_resumes_an_interrupted_fetch_from_its_checkpoints(stub, make_game, tmp_path):
+    history, url = stub
+    history.games_json = recent_games(make_game, range(23, 0, -1))
+    checkpoint_dir = str(tmp_path / 'checkpoints')
+
+    history.failing = {3}
+    with pytest.raises(requests.HTTPError):
+        fetched_ids(Trackobot('user', 'token', history_url=url, checkpoint_dir=checkpoint_dir), tmp_path)
+
+    history.requested = []
+    assert fetched_ids(Trackobot('user', 'token', history_url=url, checkpoint_dir=checkpoint_dir), tmp_path) == list(range(23, 0, -1))
+    # The first page is always fetched to check for new games, page 2 came from its checkpoint.
+    assert history.requested == [1, 3, 4, 5]
+    assert os.listdir(checkpoint_dir) == []
+
+
+def test_new_games_make_the_checkpoints_stale(stub, make_game, tmp_path):
+    history, url = stub
+    history.games_json = recent_games(make_game, range(23, 0, -1))
+    checkpoint_dir = str(tmp_path / 'checkpoints')
+
+    history.failing = {3}
+    with pytest.raises(requests.HTTPError):
+        fetched_ids(Trackobot('user', 'token', history_url=url, checkpoint_dir=checkpoint_dir), tmp_path)
+
+    # Three new games push every game three places down the pages, the saved page 2 no longer lines up.
+    history.games_json = recent_games(make_game, range(26, 0, -1))
+    history.requested = []
+    assert fetched_ids(Trackobot('user', 'token', history_url=url, checkpoint_dir=checkpoint_dir), tmp_path) == list(range(26, 0, -1))
+    assert history.requested == [1, 2, 3, 4, 5, 6]
+
+
+def test_sync_only_fetches_games_newer_than_the_archive(stub, make_game, tmp_path):
+    history, url = stub
+    history.games_json = recent_games(make_game, range(12, 0, -1))
+    archive = Archive(str(tmp_path / 'games.jsonl'))
+    archive.append(list(reversed(history.games_json[8:])))
+
+    new_games = Trackobot('user', 'token', history_url=url).sync(archive)
+    assert [game.id for game in new_games] == list(range(5, 13))
+    assert [game.id for game in archive.games()] == list(range(1, 13))
+    assert history.requested == [1, 2]
@@ -0,0 +1,30 @@
+import pytest
+
+from aggregates import Aggregates
+from trends import Trends
+
+PATCHES = [('2017-11-02', '9.4'), ('2017-11-03', '10.0')]
+
+
+def counts(aggregates: Aggregates):
+    """The aggregates' to_dict(), with the openings sorted since their order depends on the order games were added."""
+    data = aggregates.to_dict()
+    data['openings'] = sorted(data['openings'])
+    return data
+
+
+@pytest.mark.parametrize('period', ['day', 'patch'])
+@pytest.mark.parametrize('size', [1, 2, 3, 10])
+def test_sliding_windows_match_recomputing_each_window(synthetic_games, period, size):
+    games = [game for game in synthetic_games(600, seed=8, heroes=['Mage']) if game.had_played_cards()]
+    trends = Trends(games, period, PATCHES)
+    buckets = sorted(trends.buckets)
+    assert len(buckets) > 2
+
+    windows = [(label, counts(window)) for label, window in trends.windows(size)]
+    expected = []
+    for i in range(min(size, len(buckets)) - 1, len(buckets)):
+        window_buckets = buckets[max(i - size + 1, 0):i + 1]
+        label = window_buckets[0][1] + ('' if len(window_buckets) == 1 else ' to ' + window_buckets[-1][1])
+        expected.append((label, counts(Aggregates(game for game in games if trends.bucket(game.date[:10]) in window_buckets))))
+    assert windows == expected
@@ -0,0 +1,24 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import vectorized
+from aggregates import Aggregates
+from store import GameStore
+
+
+def hero_games(games, hero='Mage'):
+    return [game for game in games if game.hero == hero and game.had_played_cards()]
+
+
+def test_matches_the_python_backend(synthetic_games):
+    games = hero_games(synthetic_games(500, seed=4))
+    aggregates = vectorized.aggregate(games)
+    assert aggregates.newest == max(game.date for game in games)
+    assert aggregates.to_dict() == Aggregates(games).to_dict()
+
+
+def test_matches_the_python_backend_on_a_store(synthetic_games):
+    store = GameStore(game.game_data for game in synthetic_games(500, seed=5))
+    games = hero_games(store)
+    assert vectorized.aggregate(games).to_dict() == Aggregates(games).to_dict()
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from aggregates import Aggregates
+from game import Game
+from watch import ArchiveTail, Watcher
+
+
+def append_lines(path, lines):
+    with open(path, 'a') as fp:
+        for line in lines:
+            fp.write(line + '\n')
+
+
+def test_skips_corrupt_lines_and_keeps_watching(make_game, tmp_path, capsys):
+    path = str(tmp_path / 'games.jsonl')
+    append_lines(path, [json.dumps(make_game(1)), '{"id": 2, "hero": "Ma', '[1, 2]'])
+    watcher = Watcher([ArchiveTail(path)], 'Mage', interval=0)
+
+    updates = []
+    watcher.run(updates.append, polls=1)
+    assert updates == [1]
+    assert capsys.readouterr().out.count('Skipping the bad line') == 2
+
+    # The bad lines aren't read again, the games after them are.
+    append_lines(path, [json.dumps(make_game(3, result='loss'))])
+    watcher.run(updates.append, polls=2)
+    assert updates == [1, 1]
+    assert (watcher.aggregates.wins, watcher.aggregates.losses) == (1, 1)
+    assert 'Skipping' not in capsys.readouterr().out
+
+
+def test_reads_a_line_once_it_is_complete(make_game, tmp_path):
+    path = str(tmp_path / 'games.jsonl')
+    line = json.dumps(make_game(1))
+    with open(path, 'w') as fp:
+        fp.write(line[:20])
+    tail = ArchiveTail(path, 'Ann')
+    assert list(tail.games()) == []
+
+    with open(path, 'a') as fp:
+        fp.write(line[20:] + '\n')
+    assert [(game.id, game.player) for game in tail.games()] == [(1, 'Ann')]
+
+
+@pytest.mark.parametrize('field', ['hero', 'card_history', 'rank', 'result'])
+def test_skips_games_missing_a_field(make_game, tmp_path, capsys, field):
+    path = str(tmp_path / 'games.jsonl')
+    bad = make_game(2)
+    del bad[field]
+    append_lines(path, [json.dumps(make_game(1)), json.dumps(bad), json.dumps(make_game(3, result='loss'))])
+    watcher = Watcher([ArchiveTail(path)], 'Mage', interval=0)
+
+    updates = []
+    watcher.run(updates.append, polls=1)
+    assert updates == [2]
+    assert (watcher.aggregates.wins, watcher.aggregates.losses) == (1, 1)
+    assert watcher.aggregates.to_dict() == Aggregates([Game(make_game(1)), Game(make_game(3, result='loss'))]).to_dict()
+    assert 'Skipping the bad line' in capsys.readouterr().out
+
+
+def test_skips_plays_missing_a_field(make_game, tmp_path, capsys):
+    path = str(tmp_path / 'games.jsonl')
+    bad = make_game(1)
+    del bad['card_history'][-1]['card']['mana']
+    append_lines(path, [json.dumps(bad)])
+    assert list(ArchiveTail(path).games()) == []
+    assert 'Skipping the bad line' in capsys.readouterr().out
+
+
+def test_add_game_leaves_the_aggregates_unchanged_when_a_field_is_missing(make_game):
+    aggregates = Aggregates([Game(make_game(1))])
+    before = aggregates.to_dict()
+    bad = make_game(2)
+    del bad['card_history']
+    with pytest.raises(KeyError):
+        aggregates.add_game(Game(bad))
+    assert aggregates.to_dict() == before
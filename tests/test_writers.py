@@ -0,0 +1,23 @@
+import pytest
+
+import writers
+from writers import Interval, ParquetWriter, Table
+
+
+def test_table_types_come_from_the_column_names():
+    table = Table('matchup trends', ['window', 'games', 'win percentage', 'Mage', 'turn 1'], [], types={'turn 1': 'strings'})
+    assert table.types == ['string', 'int', 'float', 'float', 'strings']
+
+
+def test_parquet_keeps_the_column_types_when_the_first_batch_is_empty(monkeypatch, tmp_path):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(writers, 'PARQUET_BATCH_SIZE', 2)
+    columns = ['card', 'games', 'win percentage', 'Mage', 'win percentage interval']
+    rows = [['Mana Wyrm', 1, 100.0, None, None], ['Arcanologist', 2, 50.0, None, None],
+            ['Frostbolt', 3, 0.0, 50, Interval(10.0, 90.0)]]
+
+    ParquetWriter(str(tmp_path)).write(Table('cards', columns, rows))
+    data = pyarrow_parquet.read_table(str(tmp_path / 'cards.parquet'))
+    assert [str(field.type) for field in data.schema] == ['string', 'int64', 'double', 'double', 'list<element: double>']
+    assert data.column('Mage').to_pylist() == [None, None, 50.0]
+    assert data.column('win percentage interval').to_pylist() == [None, None, [10.0, 90.0]]
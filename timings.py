@@ -0,0 +1,130 @@
+import contextlib
+import functools
+import json
+import time
+import tracemalloc
+
+MEGABYTE = 1024 * 1024
+
+
+class Timings(object):
+    """Records the wall time, call count and memory allocations of named stages of a run, e.g. loading the games
+        or each of the Hero analyses, and writes them out as a json timing report.
+        Stages can nest, a stage's time includes the time of any stages run inside it.
+        Allocations are only recorded when tracing memory, since tracemalloc slows everything down.
+        A disabled Timings does nothing, so the stages can be left in place at no cost.
+    """
+
+    def __init__(self, enabled=True, trace_memory=False):
+        """Create a new set of timings, optionally tracing memory allocations with tracemalloc."""
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = {}
+        self.functions = []
+        # The stages that are currently running, innermost last.
+        self._running = []
+        self._peak = 0.0
+        self._start = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.start()
+
+    def _stage_data(self, name: str):
+        data = self.stages.get(name)
+        if data is None:
+            data = self.stages[name] = {'seconds': 0.0, 'calls': 0}
+            if self.trace_memory:
+                data.update({'allocated MB': 0.0, 'peak MB': 0.0})
+        return data
+
+    def _update_peaks(self):
+        """Fold the peak memory since the last update into all the running stages, then start a new peak."""
+        peak = tracemalloc.get_traced_memory()[1] / MEGABYTE
+        self._peak = max(self._peak, peak)
+        for data in self._running:
+            data['peak MB'] = max(data['peak MB'], peak)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time the code run inside the with block as the named stage.
+            Running a stage again adds to its time and call count.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        data = self._stage_data(name)
+        if self.trace_memory:
+            self._update_peaks()
+            allocated = tracemalloc.get_traced_memory()[0]
+        self._running.append(data)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            data['seconds'] += time.perf_counter() - start
+            data['calls'] += 1
+            if self.trace_memory:
+                self._update_peaks()
+                data['allocated MB'] += (tracemalloc.get_traced_memory()[0] - allocated) / MEGABYTE
+            self._running.pop()
+
+    def iterate(self, name: str, iterable):
+        """Return an iterator over iterable that times getting each item as the named stage,
+            e.g. to time streaming the games out of a file. The call count is the number of items, plus one for reaching the end.
+        """
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iter(iterable))
+
+    def _iterate(self, name: str, iterator):
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def instrument(self, target, names, prefix=''):
+        """Time every call to the named functions of target, e.g. a Hero's analyze methods or a module's functions,
+            as a stage named after the function. Replaces the functions on the target.
+        """
+        if not self.enabled:
+            return
+
+        for name in names:
+            function = getattr(target, name)
+
+            @functools.wraps(function)
+            def timed(*args, _name=prefix + name, _function=function, **kwargs):
+                with self.stage(_name):
+                    return _function(*args, **kwargs)
+            setattr(target, name, timed)
+
+    def add_profile(self, profiler, limit=25):
+        """Add the functions that took the most cumulative time in a cProfile profile to the report, with their call counts."""
+        import pstats
+        stats = pstats.Stats(profiler)
+        functions = sorted(stats.stats.items(), key=lambda k_v: k_v[1][3], reverse=True)
+        self.functions = [{'function': '{}:{}({})'.format(*function),
+                           'calls': calls,
+                           'seconds': total_time,
+                           'cumulative seconds': cumulative_time}
+                          for function, (primitive_calls, calls, total_time, cumulative_time, callers) in functions[:limit]]
+
+    def report(self):
+        """Return the timing report as a json serializable dictionary."""
+        report = {'seconds': time.perf_counter() - self._start,
+                  'stages': self.stages}
+        if self.trace_memory:
+            self._update_peaks()
+            report['peak MB'] = self._peak
+        if self.functions:
+            report['functions'] = self.functions
+        return report
+
+    def save(self, path: str):
+        """Write the timing report to a json file."""
+        with open(path, 'w') as fp:
+            json.dump(self.report(), fp, indent=2)
@@ -1,9 +1,17 @@
 import requests
 import datetime
 import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 from game import Game
 
+HISTORY_URL = 'https://trackobot.com/profile/history.json'
+
 class Trackobot(object):
     """A facade class for interacting with track-o-bot.
         Note: There is an existing python library for interacting with track-o-bot,
@@ -15,49 +23,194 @@ class Trackobot(object):
 
     """
 
-    def __init__(self, user: str, token: str, days=10):
+    def __init__(self, user: str, token: str, days=10, history_url=HISTORY_URL, workers=1, checkpoint_dir=None, rate_limit=None):
         """Create a new track-o-bot interface for the given user, API token and number of days.
             Track-o-bot only stores card history for 10 days, so only retrieves a max of 10 days of data.
+            The history url can be pointed at a local server serving canned history pages, e.g. for testing.
+            With more than 1 worker, that many history pages are fetched ahead concurrently.
+            If a checkpoint directory is specified, every fetched page is saved there so an interrupted
+            fetch resumes where it left off. The checkpoints are removed once a fetch completes.
+            Pages shift when new games are played, so checkpoints are only reused while the newest game is the same
+            as when they were saved, see _start_run.
+            A rate limit spaces the page requests out to at most that many per second, however many workers there are.
         """
         self.user = user
         self.token = token
         self.days = days if days <= 10 else 10
+        self.history_url = history_url
+        self.workers = max(workers, 1)
+        self.checkpoint_dir = checkpoint_dir
+        # The id of the newest game when the current fetch started, the checkpoints are kept per newest game.
+        self.newest_id = None
+
+        # The earliest time the next page request can be sent, shared by all the workers.
+        self.request_interval = 1 / rate_limit if rate_limit else 0
+        self._next_request = 0.0
+        self._rate_lock = threading.Lock()
+
+        # Reuse pooled connections across all the page requests, one per worker.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _wait_for_rate_limit(self):
+        """Sleep until this account's rate limit allows another request."""
+        if not self.request_interval:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.request_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _checkpoint_file(self, page):
+        return os.path.join(self.checkpoint_dir, self.user + '-' + str(self.newest_id) + '-page-' + str(page) + '.json')
+
+    def _checkpoint_files(self):
+        """Return the paths of all this user's checkpoints, from any fetch."""
+        pattern = re.compile(re.escape(self.user) + r'-\w+-page-\d+\.json')
+        return [os.path.join(self.checkpoint_dir, name) for name in os.listdir(self.checkpoint_dir) if pattern.fullmatch(name)] \
+            if self.checkpoint_dir and os.path.isdir(self.checkpoint_dir) else []
+
+    def _request_page(self, page: int):
+        self._wait_for_rate_limit()
+        r = self.session.get(self.history_url, params={'username': self.user, 'token': self.token, 'page': page})
+        r.raise_for_status()
+        return r.json()
+
+    def _save_checkpoint(self, page: int, page_json: dict):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        # Write then rename so an interrupted run never leaves a partial checkpoint behind.
+        with open(self._checkpoint_file(page) + '.tmp', 'w') as fp:
+            json.dump(page_json, fp)
+        os.replace(self._checkpoint_file(page) + '.tmp', self._checkpoint_file(page))
+
+    def get_page(self, page: int):
+        """Get a single page of the game history, the first page is 1.
+            Returns the decoded json, with the list of game dictionaries under 'history'.
+            Pages already fetched by the current fetch, or an interrupted one it resumes, are read from their checkpoints.
+        """
+        if self.checkpoint_dir and os.path.exists(self._checkpoint_file(page)):
+            with open(self._checkpoint_file(page)) as fp:
+                return json.load(fp)
+
+        page_json = self._request_page(page)
+        if self.checkpoint_dir:
+            self._save_checkpoint(page, page_json)
+        return page_json
+
+    def _start_run(self):
+        """Start a fetch. The first page is always fetched fresh, its newest game identifies the fetch.
+            An interrupted fetch with the same newest game saw the same pages, so its checkpoints are reused.
+            Checkpoints from before newer games were played are out of date, the pages have shifted since,
+            so they're removed. Returns the first page.
+        """
+        page_json = self._request_page(1)
+        history = page_json['history']
+        self.newest_id = history[0]['id'] if history else 'empty'
+
+        if self.checkpoint_dir:
+            prefix = os.path.join(self.checkpoint_dir, self.user + '-' + str(self.newest_id) + '-page-')
+            for checkpoint_file in self._checkpoint_files():
+                if not checkpoint_file.startswith(prefix):
+                    os.remove(checkpoint_file)
+            self._save_checkpoint(1, page_json)
+        return page_json
+
+    def _pages(self, workers: int):
+        """Generate the history pages in order, fetching up to the given number of pages ahead."""
+        page_json = self._start_run()
+        total_pages = page_json.get('meta', {}).get('total_pages')
+        yield page_json
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = []
+        next_page = 2
+        try:
+            while True:
+                while len(pending) < workers and (total_pages is None or next_page <= total_pages):
+                    pending.append(executor.submit(self.get_page, next_page))
+                    next_page += 1
+                if not pending:
+                    return
+
+                page_json = pending.pop(0).result()
+                total_pages = page_json.get('meta', {}).get('total_pages', total_pages)
+                yield page_json
+        finally:
+            # Don't bother fetching pages past the cutoff, only wait for the ones already in flight.
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _history(self, workers: int):
+        """Generate the game dictionaries from the history pages, newest game first."""
+        for page_json in self._pages(workers):
+            # Running out of history means we're done.
+            if not page_json['history']:
+                return
+            yield from page_json['history']
+
+    def _clear_checkpoints(self):
+        """A fetch completed, so the next run should start from scratch."""
+        for checkpoint_file in self._checkpoint_files():
+            os.remove(checkpoint_file)
 
     def get_game_history(self, outfile: str):
         """Get the last 10 days of game data from Track-o-bot.
             Saves the json version of the game data to the specified output file.
             Returns a list of game dictionaries.
         """
-        history_url = 'https://trackobot.com/profile/history.json'
-        parameters = {'username': self.user, 'token': self.token, 'page': 0}
-
         # Get all the pertinent track-o-bot games.
         # Track-o-bot only has per card data from the last 10 days.
         ten_days_ago = datetime.datetime.now() - datetime.timedelta(days=self.days)
-        found_last_game = False
         games_json = []
         games = []
 
-        while not found_last_game:
-            # First page is 1.
-            parameters['page'] += 1
-            r = requests.get(history_url, params=parameters)
-            r.raise_for_status()
-
-            for g in r.json()['history']:
-                game = Game(g)
-                print(game)
-                if game.date < ten_days_ago.isoformat():
-                    print('Done getting games from the last ' + repr(self.days) + ' days.')
-                    found_last_game = True
-                    break
-                else:
-                    games.append(game)
-                    games_json.append(g)
+        for g in self._history(self.workers):
+            game = Game(g)
+            print(game)
+            if game.date < ten_days_ago.isoformat():
+                print('Done getting games from the last ' + repr(self.days) + ' days.')
+                break
+            else:
+                games.append(game)
+                games_json.append(g)
 
         # Always save the trackobot data, making it easy to re-run without having to re-fetch.
         with open(outfile, 'w') as fp:
             json.dump(games_json, fp)
 
+        self._clear_checkpoints()
         return games
 
+    def sync(self, archive):
+        """Fetch only the games that are newer than the newest game already stored in the archive,
+            and append them to it. Stops fetching pages as soon as a known game is reached,
+            so a daily sync usually only costs a page or two.
+            Still never fetches more than the last 10 days, since older games don't have card data.
+            Returns a list of the new games, oldest first.
+        """
+        ten_days_ago = datetime.datetime.now() - datetime.timedelta(days=self.days)
+        newest = archive.newest()
+        games_json = []
+
+        # Pages are fetched one at a time since we expect to stop early.
+        for g in self._history(1):
+            game = Game(g)
+            if newest and (game.id == newest['id'] or game.date < newest['added']):
+                print('Caught up with the archive at the game added ' + newest['added'] + '.')
+                break
+            if game.date < ten_days_ago.isoformat():
+                print('Done getting games from the last ' + repr(self.days) + ' days.')
+                break
+            print(game)
+            games_json.append(g)
+
+        # Track-o-bot returns the newest games first, the archive stores them oldest first.
+        games_json.reverse()
+        archive.append(games_json)
+        print('Added ' + repr(len(games_json)) + ' new games to ' + archive.path)
+
+        self._clear_checkpoints()
+        return [Game(g) for g in games_json]
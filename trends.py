@@ -0,0 +1,150 @@
+import bisect
+import datetime
+import json
+
+from aggregates import Aggregates
+from writers import Table
+
+# The periods games can be bucketed by. Patches are read from a patches file, see load_patches.
+PERIODS = ('day', 'week', 'patch')
+
+
+def load_patches(path: str):
+    """Load a json array of the patches to bucket games by, each with a 'patch' name and the ISO 'date' it came out,
+        e.g. [{"patch": "10.0", "date": "2017-12-07"}]. Returns a list of (date, name) tuples, oldest first.
+    """
+    with open(path) as fp:
+        patches_json = json.load(fp)
+    return sorted((patch['date'][:10], patch['patch']) for patch in patches_json)
+
+
+class Trends(object):
+    """Win rates over time. Games are bucketed by day, week or patch, each bucket keeping its own Aggregates.
+        Trends are read off windows of consecutive buckets, e.g. 4 weeks at a time, sliding one bucket along
+        at a time. Each window is the previous one with the next bucket merged in and the oldest bucket subtracted
+        out, so a year of weekly trends costs one pass over the games plus a merge and subtract per week,
+        rather than re-analyzing the games of every window.
+    """
+
+    def __init__(self, games=(), period='week', patches=None):
+        """Create trends bucketing games by a period, 'day', 'week' or 'patch', optionally adding an iterable of games.
+            Bucketing by patch needs the list of (date, name) patches from load_patches.
+        """
+        if period not in PERIODS:
+            raise ValueError('Unknown trend period: ' + period)
+        if period == 'patch' and not patches:
+            raise ValueError('Trends by patch need a list of patches')
+        self.period = period
+        self.patches = patches
+        self._patch_dates = [date for date, name in patches] if patches else []
+        # Aggregates keyed by bucket, a (start date, label) tuple so they sort by date.
+        self.buckets = {}
+        # The bucket of each day seen, so the dates are only parsed once per day.
+        self._day_buckets = {}
+
+        for game in games:
+            self.add_game(game)
+
+    def bucket(self, day: str):
+        """Return the bucket for an ISO date, a (start date, label) tuple."""
+        bucket = self._day_buckets.get(day)
+        if bucket is not None:
+            return bucket
+
+        if self.period == 'day':
+            bucket = (day, day)
+        elif self.period == 'week':
+            # Weeks start on Monday.
+            date = datetime.date.fromisoformat(day)
+            start = (date - datetime.timedelta(days=date.weekday())).isoformat()
+            bucket = (start, 'week of ' + start)
+        else:
+            index = bisect.bisect_right(self._patch_dates, day) - 1
+            bucket = self.patches[index] if index >= 0 else ('', 'before ' + self.patches[0][1])
+
+        self._day_buckets[day] = bucket
+        return bucket
+
+    def _aggregates(self, day: str):
+        bucket = self.bucket(day)
+        aggregates = self.buckets.get(bucket)
+        if aggregates is None:
+            aggregates = self.buckets[bucket] = Aggregates()
+        return aggregates
+
+    def add_game(self, game):
+        """Fold a single game into its bucket."""
+        self._aggregates(game.date[:10]).add_game(game)
+
+    def add_daily(self, daily):
+        """Fold the per day partials of a DailyAggregates into their buckets, e.g. a saved --state, no games needed."""
+        for day, aggregates in daily.days.items():
+            self._aggregates(day).merge(aggregates)
+
+    def total(self):
+        """Return the Aggregates of all the buckets together."""
+        total = Aggregates()
+        for aggregates in self.buckets.values():
+            total.merge(aggregates)
+        return total
+
+    def windows(self, size=1):
+        """Generate a (label, Aggregates) tuple for every window of size consecutive buckets, oldest first.
+            Buckets without games are skipped rather than counted, so a window always spans size buckets that have games.
+            The same Aggregates are updated in place as the window slides, use each window before asking for the next.
+        """
+        buckets = sorted(self.buckets)
+        window = Aggregates()
+        for i, bucket in enumerate(buckets):
+            window.merge(self.buckets[bucket])
+            if i >= size:
+                window.subtract(self.buckets[buckets[i - size]])
+            if i >= size - 1 or i == len(buckets) - 1:
+                first = buckets[max(i - size + 1, 0)]
+                yield (first[1] if first == bucket else first[1] + ' to ' + bucket[1]), window
+
+    def analyze(self, size=1, min_sample_size=0):
+        """Analyze how the matchup and card win rates moved from window to window.
+            Card win rates are only shown for windows where the card was played at least min sample size times,
+            and only for cards played that often overall. Returns a list of Tables.
+        """
+        if not self.buckets:
+            return []
+
+        total = self.total()
+        total.calculate_win_rates()
+        opponents = [opponent for opponent, data in sorted(total.opponents.items(), key=lambda k_v: k_v[1]['games'], reverse=True)]
+        cards = [card for card, data in sorted(total.cards.items(), key=lambda k_v: k_v[1]['win percentage'], reverse=True)
+                 if data['games'] >= max(min_sample_size, 1)]
+
+        # Each window is read as it slides past, the matchups as a row per window, the cards as a column per window.
+        matchup_table = []
+        card_columns = []
+        for label, window in self.windows(size):
+            row = [label, window.game_count, window.wins, window.losses,
+                   (window.wins / window.game_count) * 100 if window.game_count else None]
+            for opponent in opponents:
+                data = window.opponents.get(opponent)
+                row.append((data['wins'] / data['games']) * 100 if data else None)
+            matchup_table.append(row)
+
+            column = {}
+            for card in cards:
+                data = window.cards.get(card)
+                if data and data['games'] >= min_sample_size:
+                    column[card] = (data['wins'] / data['games']) * 100
+            card_columns.append((label, column))
+
+        window_description = 'Each row is ' + repr(size) + ' ' + self.period + ('s' if size != 1 else '') + ' of games.'
+        tables = [Table('matchup trends', ['window', 'games', 'wins', 'losses', 'win percentage'] + opponents, matchup_table,
+                        ['window', 'games', 'wins', 'losses', 'win %'] + opponents, 'Matchup Win Rate Trends', [
+            'How the win rate against each opponent moved over time, opponents are ordered by frequency.',
+            window_description])]
+
+        card_table = [[card] + [column.get(card) for label, column in card_columns] for card in cards]
+        tables.append(Table('card trends', ['card'] + [label for label, column in card_columns], card_table, None,
+                            'Card Win Rate Trends', [
+            'How the win rate of each card moved over time, cards are ordered by their overall win rate.',
+            window_description.replace('row', 'column'),
+            "Note that data is only shown when a card is played in a window at least " + repr(min_sample_size) + " times."]))
+        return tables
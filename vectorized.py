@@ -0,0 +1,280 @@
+from array import array
+
+# NumPy is optional, the modules that need it import it from here and call require_numpy() before using it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from aggregates import Aggregates, MANA_DIFFERENTIAL_KEYS
+from store import PLAYERS
+
+# The upper bounds of the first 4 mana differential buckets, see aggregates.mana_differential_key.
+MANA_DIFFERENTIAL_BOUNDS = [-7, -2, 2, 8]
+
+
+def require_numpy(feature: str):
+    """Raise an ImportError if numpy isn't installed. The feature, e.g. 'The numpy backend', starts the message."""
+    if np is None:
+        raise ImportError(feature + ' requires numpy, install it with: pip install numpy')
+
+
+class GameArrays(object):
+    """Games encoded as integer index arrays.
+        Per game arrays: won, opponents (ids into opponent_names) and ranks.
+        Per play arrays: games (index into the per game arrays), turns, players (0 is the hero), cards (ids into card_names) and mana.
+    """
+
+    def __init__(self, won, opponents, opponent_names, ranks, games, turns, players, cards, card_names, mana):
+        self.won = won
+        self.opponents = opponents
+        self.opponent_names = opponent_names
+        self.ranks = ranks
+        self.games = games
+        self.turns = turns
+        self.players = players
+        self.cards = cards
+        self.card_names = card_names
+        self.mana = mana
+
+    def __len__(self):
+        return len(self.won)
+
+
+def _column(column):
+    """Return a zero-copy NumPy view of a GameStore column, an array or a memoryview into a packed file."""
+    return np.frombuffer(column, dtype=column.typecode if isinstance(column, array) else column.format)
+
+
+def _local_ids(ids, strings):
+    """Map string table ids onto dense 0..n ids, returning the dense ids and their strings."""
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    return inverse.reshape(-1), [strings[i] for i in unique_ids.tolist()]
+
+
+def _encode_store(store, indices):
+    """Encode the games at the given indices of a GameStore, reading the store's columns directly."""
+    indices = np.asarray(indices, dtype=np.int64)
+    offsets = _column(store.play_offsets)
+    starts = offsets[indices]
+    lengths = offsets[indices + 1] - starts
+
+    # The play table rows for each selected game, in game order.
+    plays = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+
+    opponents, opponent_names = _local_ids(_column(store.opponents)[indices], store.strings)
+    cards, card_names = _local_ids(_column(store.play_cards)[plays], store.strings)
+    return GameArrays(won=_column(store.won)[indices].astype(bool),
+                      opponents=opponents,
+                      opponent_names=opponent_names,
+                      ranks=_column(store.ranks)[indices].astype(np.int64),
+                      games=np.repeat(np.arange(len(indices)), lengths),
+                      turns=_column(store.play_turns)[plays].astype(np.int64),
+                      players=_column(store.play_players)[plays],
+                      cards=cards,
+                      card_names=card_names,
+                      mana=_column(store.play_mana)[plays].astype(np.int64))
+
+
+def encode(games: list):
+    """Encode a list of games as a GameArrays.
+        Games held in a single GameStore are encoded straight from its columns, other games are
+        encoded with one walk over their card histories.
+    """
+    stores = set(map(lambda x: getattr(x, 'store', None), games))
+    if len(stores) == 1 and None not in stores:
+        return _encode_store(stores.pop(), [game.index for game in games])
+
+    opponent_ids = {}
+    card_ids = {}
+    won, opponents, ranks = [], [], []
+    play_games, turns, players, cards, mana = [], [], [], [], []
+    for i, game in enumerate(games):
+        won.append(game.won())
+        opponents.append(opponent_ids.setdefault(game.opponent, len(opponent_ids)))
+        ranks.append(game.rank)
+        for turn, player, card, card_mana in game.plays():
+            play_games.append(i)
+            turns.append(turn)
+            players.append(PLAYERS.index(player))
+            cards.append(card_ids.setdefault(card, len(card_ids)))
+            mana.append(card_mana)
+
+    return GameArrays(won=np.array(won, dtype=bool),
+                      opponents=np.array(opponents, dtype=np.int64),
+                      opponent_names=list(opponent_ids),
+                      ranks=np.array(ranks, dtype=np.int64),
+                      games=np.array(play_games, dtype=np.int64),
+                      turns=np.array(turns, dtype=np.int64),
+                      players=np.array(players, dtype=np.int8),
+                      cards=np.array(cards, dtype=np.int64),
+                      card_names=list(card_ids),
+                      mana=np.array(mana, dtype=np.int64))
+
+
+def _first_seen(keys, positions, size):
+    """Return the distinct keys ordered by the smallest position they were seen at.
+        Keeps the dictionaries in the same order the python backend would build them.
+    """
+    first = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, keys, positions)
+    seen = np.flatnonzero(first != np.iinfo(np.int64).max)
+    return seen[np.argsort(first[seen], kind='stable')].tolist()
+
+
+def _percentage(wins, games):
+    """Vectorized (wins / games) * 100, 0 where there are no games."""
+    result = np.zeros(np.shape(games), dtype=float)
+    np.divide(wins, games, out=result, where=games != 0)
+    return result * 100
+
+
+def _win_loss(games, wins):
+    return {'games': games, 'wins': wins, 'losses': games - wins}
+
+
+def aggregate(games: list):
+    """Build the Aggregates for a list of games using batch NumPy operations, the numpy backend for Hero.
+        The games are encoded once and every count is a np.bincount into dense card x opponent and turn x card matrices.
+        Returns a regular Aggregates object, so the reports work unchanged.
+    """
+    require_numpy('The numpy backend')
+
+    arrays = encode(games)
+    aggregates = Aggregates()
+    game_count = len(arrays)
+    if not game_count:
+        return aggregates
+
+    aggregates.newest = max(game.date for game in games)
+    won = arrays.won
+    aggregates.wins = int(won.sum())
+    aggregates.losses = game_count - aggregates.wins
+
+    # Matchups.
+    opponent_count = len(arrays.opponent_names)
+    opponent_games = np.bincount(arrays.opponents, minlength=opponent_count)
+    opponent_wins = np.bincount(arrays.opponents[won], minlength=opponent_count)
+    opponent_games_list, opponent_wins_list = opponent_games.tolist(), opponent_wins.tolist()
+    for o in _first_seen(arrays.opponents, np.arange(game_count), opponent_count):
+        aggregates.opponents[arrays.opponent_names[o]] = _win_loss(opponent_games_list[o], opponent_wins_list[o])
+
+    # Ranks.
+    rank_games = np.bincount(arrays.ranks)
+    rank_wins = np.bincount(arrays.ranks[won], minlength=len(rank_games))
+    for rank in _first_seen(arrays.ranks, np.arange(game_count), len(rank_games)):
+        aggregates.ranks[rank] = _win_loss(int(rank_games[rank]), int(rank_wins[rank]))
+
+    mine = arrays.players == 0
+    play_games = arrays.games[mine]
+    play_turns = arrays.turns[mine]
+    play_cards = arrays.cards[mine]
+    card_count = len(arrays.card_names)
+
+    # Mana differentials, bucketed the same way as aggregates.mana_differential_key.
+    signed_mana = np.where(mine, arrays.mana, -arrays.mana)
+    mana_differentials = np.bincount(arrays.games, weights=signed_mana, minlength=game_count)
+    buckets = np.searchsorted(MANA_DIFFERENTIAL_BOUNDS, mana_differentials, side='right')
+    bucket_games = np.bincount(buckets, minlength=len(MANA_DIFFERENTIAL_KEYS))
+    bucket_wins = np.bincount(buckets[won], minlength=len(MANA_DIFFERENTIAL_KEYS))
+    for bucket, key in enumerate(MANA_DIFFERENTIAL_KEYS):
+        if bucket_games[bucket]:
+            aggregates.mana_differentials[key] = _win_loss(int(bucket_games[bucket]), int(bucket_wins[bucket]))
+
+    # Cards vs. opponents. A card counts once per game no matter how many times it was played.
+    pairs = np.unique(play_games * card_count + play_cards)
+    pair_games, pair_cards = np.divmod(pairs, card_count)
+    pair_won = won[pair_games]
+    card_games = np.bincount(pair_cards, minlength=card_count)
+    card_wins = np.bincount(pair_cards[pair_won], minlength=card_count)
+    cells = pair_cards * opponent_count + arrays.opponents[pair_games]
+    cell_games = np.bincount(cells, minlength=card_count * opponent_count).reshape(card_count, opponent_count)
+    cell_wins = np.bincount(cells[pair_won], minlength=card_count * opponent_count).reshape(card_count, opponent_count)
+
+    card_unplayed_wins = aggregates.wins - card_wins
+    card_unplayed_losses = aggregates.losses - (card_games - card_wins)
+    cell_unplayed_wins = opponent_wins - cell_wins
+    cell_unplayed_losses = (opponent_games - opponent_wins) - (cell_games - cell_wins)
+
+    card_columns = [x.tolist() for x in (card_games, card_wins, _percentage(card_wins, card_games),
+                                         card_unplayed_wins, card_unplayed_losses,
+                                         _percentage(card_unplayed_wins, card_unplayed_wins + card_unplayed_losses))]
+    cell_columns = [x.tolist() for x in (cell_games, cell_wins, _percentage(cell_wins, cell_games),
+                                         cell_unplayed_wins, cell_unplayed_losses,
+                                         _percentage(cell_unplayed_wins, cell_unplayed_wins + cell_unplayed_losses))]
+    opponent_order = list(aggregates.opponents)
+    opponent_ids = dict((name, o) for o, name in enumerate(arrays.opponent_names))
+
+    for c in _first_seen(pair_cards, pair_games, card_count):
+        games, wins, win_percentage, unplayed_wins, unplayed_losses, unplayed_percentage = (x[c] for x in card_columns)
+        card_data = _win_loss(games, wins)
+        card_data['opponents'] = {}
+        card_data['win percentage'] = win_percentage
+        card_data['unplayed wins'] = unplayed_wins
+        card_data['unplayed losses'] = unplayed_losses
+        card_data['unplayed percentage'] = unplayed_percentage
+
+        for opponent in opponent_order:
+            o = opponent_ids[opponent]
+            games, wins, win_percentage, unplayed_wins, unplayed_losses, unplayed_percentage = (x[c][o] for x in cell_columns)
+            if not games:
+                continue
+            opponent_data = _win_loss(games, wins)
+            opponent_data['win percentage'] = win_percentage
+            opponent_data['unplayed wins'] = unplayed_wins
+            opponent_data['unplayed losses'] = unplayed_losses
+            opponent_data['unplayed percentage'] = unplayed_percentage
+            card_data['opponents'][opponent] = opponent_data
+
+        aggregates.cards[arrays.card_names[c]] = card_data
+
+    # Turns x cards. The last turn is left out since the game ended during it,
+    # turns in between where nothing was played count as a 'pass'.
+    last_turns = np.zeros(game_count, dtype=np.int64)
+    np.maximum.at(last_turns, play_games, play_turns)
+    turn_limit = int(last_turns.max()) + 1
+    counted = (play_turns >= 1) & (play_turns < last_turns[play_games])
+    triples = np.unique((play_games[counted] * turn_limit + play_turns[counted]) * card_count + play_cards[counted])
+    game_turns, triple_cards = np.divmod(triples, card_count)
+
+    turn_lengths = np.maximum(last_turns - 1, 0)
+    all_game_turns = np.repeat(np.arange(game_count) * turn_limit, turn_lengths) + \
+        np.arange(turn_lengths.sum()) - np.repeat(np.cumsum(turn_lengths) - turn_lengths, turn_lengths) + 1
+    pass_game_turns = all_game_turns[~np.isin(all_game_turns, game_turns)]
+
+    # The pass column goes after the real cards.
+    game_turns = np.concatenate([game_turns, pass_game_turns])
+    turn_cards = np.concatenate([triple_cards, np.full(len(pass_game_turns), card_count, dtype=np.int64)])
+    turn_games, turns = np.divmod(game_turns, turn_limit)
+    turn_won = won[turn_games]
+    card_names = arrays.card_names + ['pass']
+
+    cells = turns * (card_count + 1) + turn_cards
+    cell_count = turn_limit * (card_count + 1)
+    cell_games = np.bincount(cells, minlength=cell_count)
+    cell_wins = np.bincount(cells[turn_won], minlength=cell_count)
+    cell_games_list, cell_wins_list = cell_games.tolist(), cell_wins.tolist()
+    cell_percentages = _percentage(cell_wins, cell_games).tolist()
+    for cell in _first_seen(cells, turns * (game_count + 1) + turn_games, cell_count):
+        turn, card = divmod(cell, card_count + 1)
+        card_data = _win_loss(cell_games_list[cell], cell_wins_list[cell])
+        card_data['win percentage'] = cell_percentages[cell]
+        aggregates.turns.setdefault(turn, {'cards': {}})['cards'][card_names[card]] = card_data
+
+    # Openings are keyed by sets of cards, so they're grouped in python, but only the first 2 turns are visited.
+    first_turns = np.flatnonzero((play_turns == 1) | (play_turns == 2))
+    won_list = won.tolist()
+    opening_cards = [(set(), set()) for _ in range(game_count)]
+    for g, turn, card in zip(play_games[first_turns].tolist(), play_turns[first_turns].tolist(), play_cards[first_turns].tolist()):
+        opening_cards[g][turn - 1].add(arrays.card_names[card])
+    for g, (turn_1, turn_2) in enumerate(opening_cards):
+        opening = (frozenset(turn_1), frozenset(turn_2))
+        opening_data = aggregates.openings.setdefault(opening, {'games': 0, 'wins': 0, 'losses': 0})
+        opening_data['games'] += 1
+        if won_list[g]:
+            opening_data['wins'] += 1
+        else:
+            opening_data['losses'] += 1
+
+    aggregates.win_rates_calculated = True
+    return aggregates
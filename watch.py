@@ -0,0 +1,111 @@
+import json
+import os
+import time
+
+from aggregates import Aggregates
+from game import Game
+
+# How many times the poll interval the wait between polls can back off to when nothing is happening.
+MAX_BACKOFF = 16
+
+
+class ArchiveTail(object):
+    """Reads the games appended to a JSON Lines archive since it was last read."""
+
+    def __init__(self, path: str, player=None):
+        """Tail the archive at path, from the start. Games are tagged with the player's name, if given, see Game.player."""
+        self.path = path
+        self.player = player
+        # The byte offset of the first line not read yet.
+        self.offset = 0
+
+    def games(self):
+        """Generate Game objects for the complete lines added since the last read.
+            A last line without its newline yet is still being written, it's read next time.
+            Lines that aren't a json game, or a game missing a field the analyses read, are reported and skipped.
+        """
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < self.offset:
+            raise ValueError(self.path + ' is smaller than when it was last read, archives can only grow.')
+
+        with open(self.path, 'rb') as fp:
+            if not self.offset and fp.read(1) == b'[':
+                raise ValueError(self.path + ' is a json array, only JSON Lines archives can be watched.')
+            fp.seek(self.offset)
+            for line in fp:
+                if not line.endswith(b'\n'):
+                    break
+                offset = self.offset
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    game_data = json.loads(line)
+                    if not isinstance(game_data, dict):
+                        raise ValueError('Expected a json object, not ' + type(game_data).__name__)
+                    game = Game(game_data)
+                    # Read everything the watcher does up front, building the features checks the card history.
+                    game.hero, game.deck, game.date, game.opponent, game.rank, game.won(), game.features()
+                except (ValueError, KeyError, TypeError) as e:
+                    # A corrupt line would fail every poll if it was retried, it's left behind instead.
+                    print('Skipping the bad line at byte ' + repr(offset) + ' of ' + self.path + ': ' + repr(e))
+                    continue
+                if self.player:
+                    game_data['player'] = self.player
+                yield game
+
+
+class Watcher(object):
+    """Folds the games added to a set of archives into a hero's aggregates, polling them on an interval, so a poll only
+        costs the games added since the last one and the report is rendered from aggregates that don't grow with the games.
+        The wait between polls doubles after every poll that finds no new games or fails, up to MAX_BACKOFF times
+        the interval, and goes back to the interval as soon as a poll finds games.
+    """
+
+    def __init__(self, tails: list, hero: str, deck=None, since=None, until=None, sync=None, interval=60):
+        """Watch the ArchiveTails for the games of a hero and optional deck, added on or after since and before until.
+            sync is called before each poll to add any new games to the archives, e.g. from track-o-bot.
+        """
+        self.tails = tails
+        self.hero = hero
+        self.deck = deck
+        self.since = since
+        self.until = until
+        self.sync = sync
+        self.interval = interval
+        self.delay = interval
+        self.aggregates = Aggregates()
+
+    def poll(self, sync=True):
+        """Sync, unless sync is False, then fold the new games into the aggregates. Returns how many were the hero's."""
+        if sync and self.sync:
+            self.sync()
+        added = 0
+        for tail in self.tails:
+            for game in tail.games():
+                # The same games the Hero analyses count.
+                if game.matches(self.hero, self.deck, self.since, self.until) and game.had_played_cards():
+                    self.aggregates.add_game(game)
+                    added += 1
+        return added
+
+    def run(self, update, polls=None):
+        """Poll until interrupted, or polls times, calling update with the number of new games after the first poll
+            and every poll that finds any. The first poll reads the archives from the start, without syncing,
+            the archives are expected to have just been synced. Failed polls, e.g. track-o-bot being down, are reported
+            and retried.
+        """
+        count = 0
+        while polls is None or count < polls:
+            try:
+                added = self.poll(sync=count > 0)
+            except OSError as e:
+                print('Poll failed: ' + str(e))
+                added = 0
+            if added or not count:
+                update(added)
+            self.delay = self.interval if added else min(self.delay * 2, self.interval * MAX_BACKOFF)
+            count += 1
+            if polls is None or count < polls:
+                time.sleep(self.delay)
@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+import re
+from collections import namedtuple
+
+from tabulate import tabulate
+
+FLOAT_FORMAT = '.1f'
+
+# How many rows the Parquet writer holds in memory before writing them out as a row group.
+PARQUET_BATCH_SIZE = 4096
+
+# The type of the cells in each of the analyses' columns, for the formats that declare their columns' types up front.
+# The types are 'string', 'int', 'float', 'strings' for lists of card names and 'interval' for confidence intervals.
+# Columns that aren't listed, e.g. the opponents of the card summary or the windows of the trends, hold win percentages.
+COLUMN_TYPES = {'opponent': 'string', 'player': 'string', 'most common opponent': 'string', 'card': 'string', 'play': 'string',
+                'window': 'string', 'mana differential': 'string', 'curve efficiency': 'string', 'cards': 'strings',
+                'turn': 'int', 'ladder rank': 'int', 'games': 'int', 'wins': 'int', 'losses': 'int',
+                'win percentage interval': 'interval', 'unplayed delta interval': 'interval'}
+DEFAULT_COLUMN_TYPE = 'float'
+
+
+class Interval(namedtuple('Interval', ['low', 'high'])):
+    """A confidence interval table cell. Markdown shows it as [low, high], the other formats keep the two numbers."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '[{:.1f}, {:.1f}]'.format(*self)
+
+
+class DeltaInterval(Interval):
+    """A confidence interval for a difference in win rates, shown with signs."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '[{:+.1f}, {:+.1f}]'.format(*self)
+
+
+class Table(object):
+    """The results of an analysis as a table.
+        The name identifies the table in the machine readable formats, and the columns name each row's cells.
+        The markdown report shows the headers instead of the columns when there are any, under the title and description lines.
+        Rows can be any iterable, including a generator, which is consumed when the table is written.
+        Each column's type is looked up in COLUMN_TYPES, types overrides them for columns the lookup gets wrong.
+    """
+
+    def __init__(self, name: str, columns: list, rows, headers=None, title=None, description=(), types=None):
+        self.name = name
+        self.columns = columns
+        self.types = [(types or {}).get(column) or COLUMN_TYPES.get(column, DEFAULT_COLUMN_TYPE) for column in columns]
+        self.rows = rows
+        self.headers = headers or columns
+        self.title = title
+        self.description = list(description)
+
+
+class TableWriter(object):
+    """Writes tables out as a report. Use it as a context manager, or call close() when done.
+        The machine readable writers stream the rows out as they're generated, only markdown needs all of a table's rows
+        at once to size the columns.
+    """
+
+    def write(self, table: Table):
+        raise NotImplementedError
+
+    def write_all(self, tables):
+        for table in tables:
+            self.write(table)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MarkdownWriter(TableWriter):
+    """Writes the tables as reddit markdown to a file handle, the report hs-deck-analyzer.py prints."""
+
+    def __init__(self, fp, close=False):
+        """Write to the open file handle fp, closing it when the writer is closed if close is True."""
+        self.fp = fp
+        self._close = close
+
+    def write(self, table: Table):
+        self.fp.write('\n')
+        if table.title or table.description:
+            if table.title:
+                self.fp.write('## ' + table.title + '\n')
+            for line in table.description:
+                self.fp.write(line + '\n')
+            self.fp.write('\n')
+        self.fp.write(tabulate(list(table.rows), headers=table.headers, floatfmt=FLOAT_FORMAT, tablefmt='pipe') + '\n')
+
+    def close(self):
+        if self._close:
+            self.fp.close()
+
+
+class JsonLinesWriter(TableWriter):
+    """Writes every row of every table as a json object on its own line, keyed by the table's columns,
+        plus 'table' for the table's name. Confidence intervals are [low, high] lists.
+    """
+
+    def __init__(self, fp, close=False):
+        """Write to the open file handle fp, closing it when the writer is closed if close is True."""
+        self.fp = fp
+        self._close = close
+
+    def write(self, table: Table):
+        for row in table.rows:
+            record = {'table': table.name}
+            record.update(zip(table.columns, row))
+            self.fp.write(json.dumps(record) + '\n')
+
+    def close(self):
+        if self._close:
+            self.fp.close()
+
+
+def table_file_name(name: str, extension: str):
+    """Return a file name for a table, e.g. cards_vs_Mage.csv"""
+    return re.sub(r'[^\w-]+', '_', name) + extension
+
+
+def _csv_cell(cell):
+    """Lists, e.g. the cards played on a turn, and confidence intervals are written as json arrays."""
+    if isinstance(cell, (list, tuple)):
+        return json.dumps(list(cell))
+    return cell
+
+
+class CsvWriter(TableWriter):
+    """Writes each table to its own CSV file in a directory, with a header row of the table's columns."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def write(self, table: Table):
+        with open(os.path.join(self.directory, table_file_name(table.name, '.csv')), 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(table.columns)
+            for row in table.rows:
+                writer.writerow([_csv_cell(cell) for cell in row])
+
+
+class ParquetWriter(TableWriter):
+    """Writes each table to its own Parquet file in a directory, a columnar format that data tools read directly.
+        Rows are written in batches, under a schema declared from the table's column types, see Table.types,
+        so a column that's empty in the first batch doesn't change type. Requires pyarrow.
+    """
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Writing Parquet requires pyarrow, install it with: pip install pyarrow')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    @staticmethod
+    def schema(table: Table):
+        """Return the pyarrow schema for a table's columns."""
+        import pyarrow
+        types = {'string': pyarrow.string(), 'int': pyarrow.int64(), 'float': pyarrow.float64(),
+                 'strings': pyarrow.list_(pyarrow.string()), 'interval': pyarrow.list_(pyarrow.float64())}
+        return pyarrow.schema([(column, types[column_type]) for column, column_type in zip(table.columns, table.types)])
+
+    def write(self, table: Table):
+        import pyarrow.parquet
+        path = os.path.join(self.directory, table_file_name(table.name, '.parquet'))
+        schema = self.schema(table)
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            batch = []
+            rows = iter(table.rows)
+            while True:
+                row = next(rows, None)
+                if row is not None:
+                    batch.append(dict(zip(table.columns, [list(cell) if isinstance(cell, tuple) else cell for cell in row])))
+                if batch and (row is None or len(batch) == PARQUET_BATCH_SIZE):
+                    writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                    batch = []
+                if row is None:
+                    break
+
+
+# The report formats. Markdown and JSON Lines write to a file, CSV and Parquet to a directory.
+FORMATS = ('markdown', 'jsonl', 'csv', 'parquet')
+
+
+def open_writer(format: str, path: str):
+    """Create a writer for the named format, writing to the file or directory at path."""
+    if format == 'markdown':
+        return MarkdownWriter(open(path, 'w'), close=True)
+    elif format == 'jsonl':
+        return JsonLinesWriter(open(path, 'w'), close=True)
+    elif format == 'csv':
+        return CsvWriter(path)
+    elif format == 'parquet':
+        return ParquetWriter(path)
+    raise ValueError('Unknown report format: ' + format)